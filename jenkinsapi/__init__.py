@@ -52,16 +52,16 @@ from jenkinsapi import (
     utils,
 
     # Files
-    api, artifact, build, config, constants, custom_exceptions, fingerprint,
-    jenkins, jenkinsbase, job, node, result_set, result, view,
+    api, artifact, build, config, console, constants, custom_exceptions, fingerprint,
+    jenkins, jenkinsbase, job, node, result_set, result, snapshot, view,
 )
 
 from jenkinsapi.version import __version__
 
 __all__ = [
     "command_line", "utils",
-    "api", "artifact", "build", "config", "constants", "custom_exceptions", "fingerprint",
-    "jenkins", "jenkinsbase", "job", "node", "result_set", "result", "view",
+    "api", "artifact", "build", "config", "console", "constants", "custom_exceptions", "fingerprint",
+    "jenkins", "jenkinsbase", "job", "node", "result_set", "result", "snapshot", "view",
     "__version__",
 ]
 __docformat__ = "epytext"
@@ -0,0 +1,33 @@
+"""
+Asynchronous access to Jenkins.
+
+The classes in this package mirror Jenkins, Job, Build, Queue and Nodes and
+reuse all of their parsing and accessors. Objects are lazy, and the calls which
+talk to the server have variants returning futures, which run on a bounded pool
+of worker threads shared by everything created from one aio.Jenkins. This lets
+one process poll thousands of jobs concurrently:
+
+    from jenkinsapi import aio
+
+    J = aio.Jenkins('http://localhost:8080', max_workers=32)
+    for future in aio.as_completed(J.fetch_jobs()):
+        job = future.result()
+        print job.name, job.is_enabled()
+    J.close()
+
+The package is built on threads rather than asyncio, which is not available
+on the python versions supported by jenkinsapi.
+"""
+
+from jenkinsapi.utils.executor import Executor, Future, CancelledError, as_completed, gather
+from jenkinsapi.aio.base import AsyncMixin
+from jenkinsapi.aio.build import Build
+from jenkinsapi.aio.job import Job
+from jenkinsapi.aio.queue import Queue
+from jenkinsapi.aio.nodes import Nodes
+from jenkinsapi.aio.jenkins import Jenkins
+
+__all__ = [
+    "Jenkins", "Job", "Build", "Queue", "Nodes", "AsyncMixin",
+    "Executor", "Future", "CancelledError", "as_completed", "gather",
+]
@@ -0,0 +1,39 @@
+"""
+Module for the AsyncMixin class
+"""
+
+
+def poll_object(obj, tree=None):
+    """
+    Poll a Jenkins object and return it, for use as an executor task.
+    """
+    obj.poll(tree=tree)
+    return obj
+
+
+class AsyncMixin(object):
+    """
+    A mixin for Jenkins objects which adds future-returning variants of their
+    blocking calls. The work runs on the executor of the aio.Jenkins object.
+    """
+
+    def get_executor(self):
+        return self.get_jenkins_obj().executor
+
+    def submit(self, method_name, *args, **kwargs):
+        """
+        Call a method of this object on the executor.
+
+        :param method_name: name of the method to call, str
+        :return: Future for the value returned by the method
+        """
+        return self.get_executor().submit(getattr(self, method_name), *args, **kwargs)
+
+    def fetch(self, tree=None):
+        """
+        Poll this object on the executor.
+
+        :param tree: only fetch the fields of this tree expression, str
+        :return: Future resolving to this object
+        """
+        return self.get_executor().submit(poll_object, self, tree)
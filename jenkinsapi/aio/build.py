@@ -0,0 +1,27 @@
+"""
+Module for the asynchronous Build
+"""
+
+from jenkinsapi import build
+from jenkinsapi.aio.base import AsyncMixin
+
+
+class Build(AsyncMixin, build.Build):
+    """
+    A Build whose polling can run in the background, see AsyncMixin.
+    """
+
+    def follow_console(self, callback, start=0, delay=1):
+        """
+        Follow the console output in the background.
+
+        :param callback: called with every new chunk of output, on an executor thread
+        :return: Future resolving to the byte offset reached once the build is over
+        """
+        return self.get_executor().submit(self._follow_console, self.stream_console(start, delay), callback)
+
+    @staticmethod
+    def _follow_console(stream, callback):
+        for chunk in stream:
+            callback(chunk)
+        return stream.offset
@@ -0,0 +1,95 @@
+"""
+Module for the asynchronous Jenkins object
+"""
+
+from jenkinsapi import jenkins
+from jenkinsapi.aio.base import AsyncMixin, poll_object
+from jenkinsapi.aio.job import Job
+from jenkinsapi.aio.nodes import Nodes
+from jenkinsapi.aio.queue import Queue
+from jenkinsapi.utils.executor import Executor
+from jenkinsapi.utils.limiter import get_limiter
+from jenkinsapi.custom_exceptions import UnknownJob
+
+
+class Jenkins(AsyncMixin, jenkins.Jenkins):
+    """
+    A lazy Jenkins object which can talk to the server from a pool of worker
+    threads. Every object created from it shares its requester and executor.
+    """
+
+    def __init__(self, baseurl, username=None, password=None, requester=None, request_args=None,
+                 max_workers=16, executor=None, adaptive=False):
+        """
+        :param max_workers: maximum number of concurrent requests, int
+        :param executor: share the worker threads of another Executor
+        :param adaptive: keep fewer requests in flight while the master shows
+                         signs of overload, with the limiter shared by every
+                         client of the master, see jenkinsapi.utils.limiter, bool
+        For the other parameters see jenkinsapi.jenkins.Jenkins
+        """
+        request_args = dict(request_args or {})
+        # Keep a pooled connection for every worker
+        request_args.setdefault('pool_maxsize', max_workers)
+        if adaptive:
+            request_args.setdefault('limiter', get_limiter(baseurl, maximum=max_workers))
+        self.executor = executor or Executor(max_workers, name='jenkinsapi-aio')
+        jenkins.Jenkins.__init__(self, baseurl, username=username, password=password,
+                                 requester=requester, request_args=request_args, lazy=True)
+
+    def _clone(self):
+        return Jenkins(self.baseurl, username=self.username, password=self.password,
+                       requester=self.requester, executor=self.executor)
+
+    def get_jenkins_obj_from_url(self, url):
+        return Jenkins(url, self.username, self.password, requester=self.requester,
+                       executor=self.executor)
+
+    def get_jobs(self):
+        for info in self._data["jobs"]:
+            yield info["name"], Job(info["url"], info["name"], jenkins_obj=self)
+
+    def get_job(self, jobname):
+        return self[jobname]
+
+    def __getitem__(self, jobname):
+        for info in self._data["jobs"]:
+            if info["name"] == jobname:
+                return Job(info["url"], info["name"], jenkins_obj=self)
+        raise UnknownJob(jobname)
+
+    def fetch_job(self, jobname, tree=None):
+        """
+        :return: Future resolving to the polled Job
+        """
+        return self.executor.submit(self._fetch_job, jobname, tree)
+
+    def _fetch_job(self, jobname, tree):
+        return poll_object(self[jobname], tree)
+
+    def fetch_jobs(self, jobnames=None, tree=None):
+        """
+        Poll many jobs concurrently. This polls the Jenkins object first if
+        it has not been polled yet.
+
+        :param jobnames: names of the jobs to poll, all jobs if None
+        :param tree: only fetch the fields of this tree expression, str
+        :return: list of Futures, each resolving to a polled Job
+        """
+        jobs = self.get_jobs()
+        if jobnames is not None:
+            wanted = set(jobnames)
+            jobs = ((name, job) for name, job in jobs if name in wanted)
+        return [self.executor.submit(poll_object, job, tree) for _, job in jobs]
+
+    def get_queue(self, fields=None):
+        return Queue(self.get_queue_url(), self, fields=fields)
+
+    def get_nodes(self):
+        return Nodes(self.get_nodes_url(), self)
+
+    def close(self):
+        """
+        Stop the worker threads once the outstanding work is done.
+        """
+        self.executor.shutdown()
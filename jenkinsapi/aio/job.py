@@ -0,0 +1,41 @@
+"""
+Module for the asynchronous Job
+"""
+
+from jenkinsapi import job
+from jenkinsapi.aio.base import AsyncMixin, poll_object
+from jenkinsapi.aio.build import Build
+
+
+class Job(AsyncMixin, job.Job):
+    """
+    A Job whose polling, and the fetching of its builds, can run in the background.
+    """
+
+    def _new_build(self, url, buildnumber, poll=True):
+        return Build(url, buildnumber, job=self, poll=poll)
+
+    def fetch_build(self, buildnumber, tree=None):
+        """
+        :param buildnumber: number of the build, int
+        :param tree: only fetch the fields of this tree expression, str
+        :return: Future resolving to a polled Build
+        """
+        return self.get_executor().submit(self._fetch_build, self.get_build, buildnumber, tree)
+
+    def fetch_last_build(self, tree=None):
+        """
+        :return: Future resolving to the polled last Build of this job
+        """
+        return self.get_executor().submit(self._fetch_build, self.get_last_build, None, tree)
+
+    def fetch_last_good_build(self, tree=None):
+        """
+        :return: Future resolving to the polled last successful Build of this job
+        """
+        return self.get_executor().submit(self._fetch_build, self.get_last_good_build, None, tree)
+
+    @staticmethod
+    def _fetch_build(get_build, buildnumber, tree):
+        build = get_build(buildnumber) if buildnumber is not None else get_build()
+        return poll_object(build, tree)
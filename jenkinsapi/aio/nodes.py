@@ -0,0 +1,21 @@
+"""
+Module for the asynchronous Nodes
+"""
+
+from jenkinsapi import nodes
+from jenkinsapi.aio.base import AsyncMixin, poll_object
+
+
+class Nodes(AsyncMixin, nodes.Nodes):
+    """
+    The nodes of a Jenkins server, whose polling can run in the background.
+    """
+
+    def fetch_nodes(self):
+        """
+        Poll every node concurrently.
+
+        :return: list of Futures, each resolving to a polled Node
+        """
+        return [self.get_executor().submit(poll_object, node)
+                for _, node in self.iteritems()]
@@ -0,0 +1,13 @@
+"""
+Module for the asynchronous Queue
+"""
+
+from jenkinsapi import queue
+from jenkinsapi.aio.base import AsyncMixin
+
+
+class Queue(AsyncMixin, queue.Queue):
+    """
+    The Jenkins queue, whose polling can run in the background.
+    """
+    pass
@@ -3,17 +3,22 @@ This module is a collection of helpful, high-level functions for automating comm
 Many of these functions were designed to be exposed to the command-line, hence the have simple string arguments.
 """
 import os
-import time
 import logging
 
 from urllib2 import urlparse
-from jenkinsapi import constants
+from jenkinsapi import config, constants
 from jenkinsapi.jenkins import Jenkins
 from jenkinsapi.artifact import Artifact
-from jenkinsapi.custom_exceptions import ArtifactsMissing, TimeOut, BadURL
+from jenkinsapi.utils.executor import Executor, gather
+from jenkinsapi.utils.wait import Backoff, WaitScheduler
+from jenkinsapi.utils.artifact_index import get_default_index as get_default_artifact_index
+from jenkinsapi.custom_exceptions import ArtifactsMissing, TimeOut, BadURL, JenkinsAPIException
 
 log = logging.getLogger(__name__)
 
+# The build fields needed to scan the artifacts of a job
+ARTIFACTS_SUMMARY = 'number,url,artifacts[fileName,relativePath]'
+
 
 def job_by_jobname(jenkinsurl, jobname, **kwargs):
     jenkinsci = Jenkins(jenkinsurl, **kwargs)
@@ -74,25 +79,66 @@ def get_artifacts(jenkinsurl, jobid=None, build_no=None, proxyhost=None,
     return artifacts
 
 
-def search_artifacts(jenkinsurl, jobid, artifact_ids=None, **kwargs):
+def search_artifacts(jenkinsurl, jobid, artifact_ids=None, index=None, **kwargs):
     """
     Search the entire history of a jenkins job for a list of artifact names. If same_build
     is true then ensure that all artifacts come from the same build of the job
+
+    Given an ArtifactIndex, or a file for one in config.ARTIFACT_INDEX, the
+    history is searched in the index, which is first updated with the builds
+    which ran since its last update. Otherwise the builds are scanned newest
+    first, and the scan stops at the first match.
     """
-    if len(artifact_ids) == 0 or artifact_ids is None:
+    if artifact_ids is None or len(artifact_ids) == 0:
         return []
 
     job = job_by_jobid(jenkinsurl, jobid, **kwargs)
-    for build in job.build_iter():
-        artifacts = build.get_artifact_dict()
-        if set(artifact_ids).issubset(set(artifacts.keys())):
+    if index is None and not config.ARTIFACT_INDEX:
+        # Indexing the whole history would cost more than it saves in a
+        # process which throws the index away
+        return _scan_artifacts(job, artifact_ids)
+    index = index or get_default_artifact_index()
+    index.update(job)
+    for build_no in index.builds_with(job.baseurl, artifact_ids):
+        artifacts = _get_indexed_artifacts(job, index, build_no, artifact_ids)
+        if artifacts is not None:
+            return artifacts
+    found = set(artifact.filename for artifact in index.find(job.baseurl, names=artifact_ids))
+    raise ArtifactsMissing(set(artifact_ids) - found or set(artifact_ids))
+
+
+def _scan_artifacts(job, artifact_ids):
+    """
+    Find the newest build with all of the artifacts named, scanning the
+    artifact names of the builds in pages; only the build found is polled.
+    """
+    missing_artifacts = set(artifact_ids)
+    for summary in job.iter_builds_summary(fields=ARTIFACTS_SUMMARY):
+        names = set(artifact["fileName"] for artifact in summary.artifacts)
+        if set(artifact_ids).issubset(names):
+            artifacts = summary.get_build().get_artifact_dict()
             return dict((a, artifacts[a]) for a in artifact_ids)
-        missing_artifacts = set(artifact_ids) - set(artifacts.keys())
-        log.debug(msg="Artifacts %s missing from %s #%i" % (", ".join(missing_artifacts), jobid, build.buildno))
-    #noinspection PyUnboundLocalVariable
+        missing_artifacts = set(artifact_ids) - names
+        log.debug(msg="Artifacts %s missing from %s #%i" % (", ".join(missing_artifacts), job.name, summary.number))
     raise ArtifactsMissing(missing_artifacts)
 
 
+def _get_indexed_artifacts(job, index, build_no, artifact_ids):
+    """
+    Return the artifacts named of a build found in the index, or None if the
+    index was out of date, e.g. the build was deleted since.
+    """
+    try:
+        artifacts = job.get_build(build_no).get_artifact_dict()
+    except (KeyError, JenkinsAPIException):
+        artifacts = {}
+    if not set(artifact_ids).issubset(artifacts):
+        log.info(msg="%s #%i changed since it was indexed" % (job.name, build_no))
+        index.discard(job.baseurl, build_no)
+        return None
+    return dict((a, artifacts[a]) for a in artifact_ids)
+
+
 def grab_artifact(jenkinsurl, jobid, artifactid, targetdir):
     """
     Convenience method to find the latest good version of an artifact and save it
@@ -102,7 +148,7 @@ def grab_artifact(jenkinsurl, jobid, artifactid, targetdir):
     artifact = artifacts[artifactid]
     if not os.path.exists(targetdir):
         os.makedirs(targetdir)
-    artifact.savetodir(targetdir)
+    return artifact.save_to_dir(targetdir)
 
 
 def block_until_complete(jenkinsurl, jobs, maxwait=12000, interval=30, raise_on_timeout=True):
@@ -115,15 +161,15 @@ def block_until_complete(jenkinsurl, jobs, maxwait=12000, interval=30, raise_on_
 
     obj_jenkins = Jenkins(jenkinsurl)
     obj_jobs = [obj_jenkins[jid] for jid in jobs]
-    for time_left in xrange(maxwait, 0, -interval):
-        still_running = [j for j in obj_jobs if j.is_queued_or_running()]
-        if not still_running:
-            return
+    # All jobs are checked with one request per round
+    scheduler = WaitScheduler(Backoff.up_to(interval))
+    futures = [scheduler.add_job(job, maxwait) for job in obj_jobs]
+    log.info("Waiting for jobs %s to complete. Will wait up to %is",
+             ", ".join('"%s"' % str(job) for job in obj_jobs), maxwait)
+    scheduler.run(futures)
+    still_running = [job for job, future in zip(obj_jobs, futures) if isinstance(future.exception(), TimeOut)]
+    if still_running and raise_on_timeout:
         str_still_running = ", ".join('"%s"' % str(a) for a in still_running)
-        log.warn(msg="Waiting for jobs %s to complete. Will wait another %is" % (str_still_running, time_left))
-        time.sleep(interval)
-    if raise_on_timeout:
-        #noinspection PyUnboundLocalVariable
         raise TimeOut("Waited too long for these jobs to complete: %s" % str_still_running)
 
 
@@ -150,12 +196,15 @@ def get_nested_view_from_url(url, **kwargs):
     return jenkinsci.get_view_by_url(url)
 
 
-def install_artifacts(artifacts, dirstruct, installdir, basestaticurl):
+def install_artifacts(artifacts, dirstruct, installdir, basestaticurl, workers=4):
     """
     Install the artifacts.
+
+    :param workers: number of concurrent downloads, int
     """
     assert basestaticurl.endswith("/"), "Basestaticurl should end with /"
     installed = []
+    downloads = []
     for reldir, artifactnames in dirstruct.items():
         destdir = os.path.join(installdir, reldir)
         if not os.path.exists(destdir):
@@ -172,12 +221,14 @@ def install_artifacts(artifacts, dirstruct, installdir, basestaticurl):
                 # It's probably a static file, we can get it from the static collection
                 staticurl = urlparse.urljoin(basestaticurl, artifactname)
                 theartifact = Artifact(artifactname, staticurl)
-            theartifact.save(destpath)
+            downloads.append((theartifact, destpath))
             installed.append(destpath)
+    with Executor(max_workers=workers, name='install') as executor:
+        gather([executor.submit(theartifact.save, destpath) for theartifact, destpath in downloads])
     return installed
 
 
-def search_artifact_by_regexp(jenkinsurl, jobid, artifactRegExp, **kwargs):
+def search_artifact_by_regexp(jenkinsurl, jobid, artifactRegExp, index=None, **kwargs):
     '''
     Search the entire history of a hudson job for a build which has an artifact whose
     name matches a supplied regular expression. Return only that artifact.
@@ -185,16 +236,24 @@ def search_artifact_by_regexp(jenkinsurl, jobid, artifactRegExp, **kwargs):
     @param jenkinsurl: The base URL of the jenkins server
     @param jobid: The name of the job we are to search through
     @param artifactRegExp: A compiled regular expression object (not a re-string)
+    @param index: The ArtifactIndex to search, default the one stored in config.ARTIFACT_INDEX,
+                  if any; otherwise the builds are scanned newest first
     '''
     job = job_by_jobid(jenkinsurl, jobid, **kwargs)
-
-    for build in job.build_iter():
-        artifacts = build.get_artifact_dict()
-
-        for name, art in artifacts.iteritems():
-            md_match = artifactRegExp.search(name)
-
-            if md_match:
-                return art
+    if index is None and not config.ARTIFACT_INDEX:
+        # See search_artifacts
+        for summary in job.iter_builds_summary(fields=ARTIFACTS_SUMMARY):
+            for artifact in summary.artifacts:
+                if artifactRegExp.search(artifact["fileName"]):
+                    return summary.get_build().get_artifact_dict()[artifact["fileName"]]
+        raise ArtifactsMissing()
+
+    index = index or get_default_artifact_index()
+    index.update(job)
+
+    for artifact in index.find(job.baseurl, regexp=artifactRegExp):
+        artifacts = _get_indexed_artifacts(job, index, artifact.number, [artifact.filename])
+        if artifacts is not None:
+            return artifacts[artifact.filename]
 
     raise ArtifactsMissing()
@@ -8,33 +8,67 @@ This module provides a class called Artifact which allows you to download object
 and also access them as a stream.
 """
 import os
+import re
 import logging
+import fnmatch
 import hashlib
+import email.utils
 
 from jenkinsapi.fingerprint import Fingerprint
-from jenkinsapi.custom_exceptions import ArtifactBroken
+from jenkinsapi.utils import hashing
+from jenkinsapi.custom_exceptions import ArtifactBroken, JenkinsAPIException
 
 log = logging.getLogger(__name__)
 
 
+def move_into_place(partpath, fspath):
+    """
+    Rename a completely downloaded file to its final path.
+    """
+    if os.name == 'nt' and os.path.exists(fspath):
+        # rename cannot replace a file on Windows
+        os.remove(fspath)
+    os.rename(partpath, fspath)
+
+
 class Artifact(object):
     """
     Represents a single Jenkins artifact, usually some kind of file
     generated as a by-product of executing a Jenkins build.
+
+    Downloads are streamed to a ".part" file next to the destination, hashed as
+    they are written and renamed into place once complete. An interrupted
+    download is resumed from its ".part" file with an HTTP Range request,
+    guarded by If-Range so that a changed artifact is downloaded afresh.
     """
 
-    def __init__(self, filename, url, build):
+    CHUNK_SIZE = 2 ** 20
+    PART_SUFFIX = '.part'
+    # Next to a ".part" file, the ETag or Last-Modified of what it holds
+    VALIDATOR_SUFFIX = '.validator'
+
+    def __init__(self, filename, url, build, relative_path=None):
         self.filename = filename
         self.url = url
         self.build = build
+        self.relative_path = relative_path or filename
+
+    def matches(self, pattern):
+        """
+        True if the file name or the path of the artifact within the build match a glob pattern.
+        """
+        return fnmatch.fnmatch(self.filename, pattern) or fnmatch.fnmatch(self.relative_path, pattern)
 
-    def save(self, fspath):
+    def save(self, fspath, chunk_size=None, resume=True):
         """
         Save the artifact to an explicit path. The containing directory must exist.
         Returns a reference to the file which has just been writen to.
 
         :param fspath: full pathname including the filename, str
+        :param chunk_size: bytes read from the network at a time, int, default CHUNK_SIZE
+        :param resume: continue an interrupted download of this file, bool
         :return: filepath
+        :raises ArtifactBroken: if Jenkins does not vouch for the downloaded file
         """
         log.info(msg="Saving artifact @ %s to %s" % (self.url, fspath))
         if not fspath.endswith(self.filename):
@@ -42,7 +76,7 @@ class Artifact(object):
         if os.path.exists(fspath):
             if self.build:
                 try:
-                    if self._verify_download(fspath):
+                    if self._is_up_to_date(fspath):
                         log.info(msg="Local copy of %s is already up to date." % self.filename)
                         return fspath
                 except ArtifactBroken:
@@ -51,11 +85,18 @@ class Artifact(object):
                 log.info("This file did not originate from Jenkins, so cannot check.")
         else:
             log.info("Local file is missing, downloading new.")
-        filepath = self._do_download(fspath)
+        partpath = fspath + self.PART_SUFFIX
+        local_md5 = self._download_part(partpath, chunk_size, resume)
         try:
-            self._verify_download(filepath)
+            verified = self._verify_download(fspath, local_md5)
         except ArtifactBroken:
-            log.warning("fingerprint of the downloaded artifact could not be verified")
+            verified = False
+        if not verified:
+            # Never let a download Jenkins disowns replace the local copy
+            self._discard_part(partpath)
+            raise ArtifactBroken("Fingerprint %s of the download of %s does not match build %s" %
+                                 (local_md5, self.url, self.build))
+        self._move_into_place(partpath, fspath)
         return fspath
 
     def get_jenkins_obj(self):
@@ -68,37 +109,164 @@ class Artifact(object):
         response = self.get_jenkins_obj().requester.get_and_confirm_status(self.url)
         return response.content
 
-    def _do_download(self, fspath):
+    def _do_download(self, fspath, chunk_size=None, resume=True):
         """
-        Download the the artifact to a path.
+        Stream the artifact to a path, without holding it in memory.
+
+        :return: the MD5 hex digest of the downloaded file
         """
-        with open(fspath, "wb") as out:
-            out.write(self.get_data())
-        return fspath
+        partpath = fspath + self.PART_SUFFIX
+        local_md5 = self._download_part(partpath, chunk_size, resume)
+        self._move_into_place(partpath, fspath)
+        return local_md5
+
+    def _download_part(self, partpath, chunk_size=None, resume=True):
+        """
+        Stream the artifact to a ".part" file, resuming it if it was left by a
+        download of the same version of the artifact.
+
+        :return: the MD5 hex digest of the downloaded file
+        """
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        md5 = hashlib.md5()
+        validator = self._read_validator(partpath) if resume and os.path.exists(partpath) else None
+        # Without a validator there is no telling whether the part is stale
+        offset = os.path.getsize(partpath) if validator else 0
+        headers = None
+        if offset:
+            headers = {'Range': 'bytes=%i-' % offset, 'If-Range': validator}
+        requester = self.get_jenkins_obj().requester
+        response = requester.get_url(self.url, headers=headers, stream=True)
+        try:
+            if offset and response.status_code != 200 and not self._resumes_at(response, offset):
+                # Nothing after the offset (416): the part was complete but not
+                # renamed, or the artifact shrank. Or a range we did not ask
+                # for. Only a fresh download can tell.
+                response.close()
+                offset = 0
+                response = requester.get_url(self.url, stream=True)
+            if response.status_code == 206 and offset:
+                log.info("Resuming download of %s at byte %i", self.filename, offset)
+                self._hash_file(partpath, md5, chunk_size)
+                mode = 'ab'
+            elif response.status_code == 200:
+                # Also the answer to If-Range when the artifact changed
+                mode = 'wb'
+                self._write_validator(partpath, response)
+            else:
+                raise JenkinsAPIException('Operation failed. url={0}, headers={1}, status={2}'.format(
+                    self.url, headers, response.status_code))
+            with open(partpath, mode) as out:
+                for chunk in response.iter_content(chunk_size):
+                    out.write(chunk)
+                    md5.update(chunk)
+        finally:
+            response.close()
+        return md5.hexdigest()
+
+    RE_CONTENT_RANGE = re.compile(r'^bytes (\d+)-')
+
+    @classmethod
+    def _resumes_at(cls, response, offset):
+        """
+        True if response carries the artifact from offset on.
+        """
+        match = cls.RE_CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+        return response.status_code == 206 and match is not None and int(match.group(1)) == offset
+
+    @staticmethod
+    def _validator(response):
+        """
+        Return what identifies the version of the artifact a response
+        carries, for If-Range: a strong ETag or else Last-Modified, or None.
+        """
+        etag = response.headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('Last-Modified')
+
+    def _read_validator(self, partpath):
+        try:
+            with open(partpath + self.VALIDATOR_SUFFIX) as f:
+                return f.read().strip() or None
+        except IOError:
+            return None
+
+    def _write_validator(self, partpath, response):
+        validator = self._validator(response)
+        if validator is None:
+            self._remove(partpath + self.VALIDATOR_SUFFIX)
+            return
+        with open(partpath + self.VALIDATOR_SUFFIX, 'w') as f:
+            f.write(validator)
+
+    def _move_into_place(self, partpath, fspath):
+        move_into_place(partpath, fspath)
+        self._remove(partpath + self.VALIDATOR_SUFFIX)
+
+    def _discard_part(self, partpath):
+        self._remove(partpath)
+        self._remove(partpath + self.VALIDATOR_SUFFIX)
 
-    def _verify_download(self, fspath):
+    @staticmethod
+    def _remove(fspath):
+        if os.path.exists(fspath):
+            os.remove(fspath)
+
+    def _verify_download(self, fspath, local_md5=None):
         """
         Verify that a downloaded object has a valid fingerprint.
+
+        :param local_md5: MD5 hex digest of the file if already known, str
         """
-        local_md5 = self._md5sum(fspath)
+        return self._validate_fingerprint(fspath, local_md5)[0]
+
+    def _validate_fingerprint(self, fspath, local_md5=None):
+        """
+        Return whether the fingerprint of a file is valid for the build, and
+        whether Jenkins knows it at all.
+        """
+        local_md5 = local_md5 or self._md5sum(fspath)
         fp = Fingerprint(self.build.job.jenkins.baseurl, local_md5, self.build.job.jenkins)
-        return fp.validate_for_build(os.path.basename(fspath), self.build.job.name, self.build.buildno)
+        valid = fp.validate_for_build(os.path.basename(fspath), self.build.job.name, self.build.buildno)
+        return valid, not fp.unknown
 
-    def _md5sum(self, fspath, chunksize=2 ** 20):
+    def _is_up_to_date(self, fspath):
+        """
+        Tell whether a local copy is the artifact. Jenkins does not know the
+        fingerprints of jobs which do not record them, nor of a corrupt copy:
+        the copy must then match what Jenkins serves in size and be no older.
+        """
+        valid, known = self._validate_fingerprint(fspath)
+        if known or not valid:
+            return valid
+        response = self.get_jenkins_obj().requester.head_url(self.url)
+        response.close()
+        if response.status_code != 200:
+            return False
+        length = response.headers.get('Content-Length')
+        if length is None or int(length) != os.path.getsize(fspath):
+            return False
+        last_modified = response.headers.get('Last-Modified')
+        if last_modified:
+            parsed = email.utils.parsedate_tz(last_modified)
+            if parsed is None or email.utils.mktime_tz(parsed) > os.path.getmtime(fspath):
+                return False
+        return True
+
+    @staticmethod
+    def _md5sum(fspath, chunksize=2 ** 20):
         """
         A MD5 hashing function intended to produce the same results as that used by
-        Jenkins.
+        Jenkins. Digests of unchanged files come from hashing.get_default_cache().
         """
-        md5 = hashlib.md5()
-        try:
-            with open(fspath, 'rb') as f:
-                for chunk in iter(lambda: f.read(chunksize), ''):
-                    md5.update(chunk)
-        except:
-            raise
-        return md5.hexdigest()
+        return hashing.md5sum(fspath, chunk_size=chunksize)
+
+    @staticmethod
+    def _hash_file(fspath, md5, chunksize):
+        hashing.update_md5(md5, fspath, chunksize)
 
-    def save_to_dir(self, dirpath):
+    def save_to_dir(self, dirpath, chunk_size=None, resume=True):
         """
         Save the artifact to a folder. The containing directory must be exist, but use the artifact's
         default filename.
@@ -106,10 +274,38 @@ class Artifact(object):
         assert os.path.exists(dirpath)
         assert os.path.isdir(dirpath)
         outputfilepath = os.path.join(dirpath, self.filename)
-        return self.save(outputfilepath)
+        return self.save(outputfilepath, chunk_size, resume)
 
     def __repr__(self):
         """
         Produce a handy repr-string.
         """
         return """<%s.%s %s>""" % (self.__class__.__module__, self.__class__.__name__, self.url)
+
+
+class DownloadReport(object):
+    """
+    The outcome of downloading many artifacts, see Build.download_artifacts.
+    """
+
+    def __init__(self):
+        self.downloaded = []
+        self.skipped = []
+        self.failed = {}
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def add(self, fspath, size):
+        self.downloaded.append(fspath)
+        self.bytes += size
+
+    def throughput(self):
+        """
+        Aggregate download speed in bytes per second.
+        """
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return "Downloaded %i files (%.1f MB) in %.1fs at %.1f MB/s, %i up to date, %i failed" % (
+            len(self.downloaded), self.bytes / 1048576.0, self.seconds,
+            self.throughput() / 1048576.0, len(self.skipped), len(self.failed))
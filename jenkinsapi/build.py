@@ -2,17 +2,24 @@
 Build API methods
 """
 
+import os
 import time
 import pytz
+import hashlib
+import fnmatch
+import zipfile
 import datetime
-from jenkinsapi.artifact import Artifact
+from jenkinsapi.artifact import Artifact, DownloadReport, move_into_place
+from jenkinsapi.console import ConsoleStream
 from jenkinsapi import config
 from jenkinsapi.jenkinsbase import JenkinsBase
-from jenkinsapi.custom_exceptions import NoResults
+from jenkinsapi.custom_exceptions import ArtifactBroken, JenkinsAPIException, NoResults
+from jenkinsapi.utils.executor import Executor, as_completed
+from jenkinsapi.utils.wait import Backoff, WaitScheduler
+from jenkinsapi.utils.zipstream import iter_zip
 from jenkinsapi.constants import STATUS_SUCCESS
 from jenkinsapi.result_set import ResultSet
 
-from time import sleep
 import logging
 
 log = logging.getLogger(__name__)
@@ -26,45 +33,68 @@ class Build(JenkinsBase):
     STR_TOTALCOUNT = "totalCount"
     STR_TPL_NOTESTS_ERR = "%s has status %s, and does not have any test results"
 
-    def __init__(self, url, buildno, job):
+    TREES = {
+        'name': 'fullDisplayName',
+        'number': 'number',
+        'status': 'result',
+        'running': 'building,result',
+        'duration': 'duration',
+        'timestamp': 'timestamp',
+        'artifacts': 'artifacts[fileName,relativePath]',
+        'fingerprints': 'fingerprint[fileName,hash]',
+        'revision': 'changeSet[kind,revisions[revision]],actions[lastBuiltRevision[SHA1],mercurialNodeName]',
+    }
+
+    def __init__(self, url, buildno, job, poll=True):
         assert type(buildno) == int
         self.buildno = buildno
         self.job = job
-        JenkinsBase.__init__(self, url)
+        JenkinsBase.__init__(self, url, poll=poll)
 
-    def _poll(self):
+    def _poll(self, tree=None):
+        if tree:
+            return JenkinsBase._poll(self, tree=tree)
         #For build's we need more information for downstream and upstream builds
         #so we override the poll to get at the extra data for build objects
         url = self.python_api_url(self.baseurl) + '?depth=2'
         return self.get_data(url)
 
     def __str__(self):
-        return self._data['fullDisplayName']
+        return self._get_fields('name')['fullDisplayName']
 
     @property
     def name(self):
         return str(self)
 
     def get_number(self):
-        return self._data["number"]
+        return self._get_fields('number')["number"]
 
     def get_status(self):
-        return self._data["result"]
+        return self._get_fields('status')["result"]
 
     def get_revision(self):
-        vcs = self._data['changeSet']['kind'] or 'git'
-        return getattr(self, '_get_%s_rev' % vcs, lambda: None)()
+        return self.revision_of(self._get_fields('revision'))
 
-    def _get_svn_rev(self):
+    @classmethod
+    def revision_of(cls, data):
+        """
+        Return the revision built, found in data holding the fields of TREES['revision'].
+        """
+        vcs = data['changeSet']['kind'] or 'git'
+        return getattr(cls, '_get_%s_rev' % vcs, lambda _: None)(data)
+
+    @staticmethod
+    def _get_svn_rev(data):
         maxRevision = 0
-        for repoPathSet in self._data["changeSet"]["revisions"]:
+        for repoPathSet in data["changeSet"]["revisions"]:
             maxRevision = max(repoPathSet["revision"], maxRevision)
         return maxRevision
 
-    def _get_git_rev(self):
+    @staticmethod
+    def _get_git_rev(data):
         # Sometimes we have None as part of actions. Filter those actions
         # which have lastBuiltRevision in them
-        _actions = [x for x in self._data['actions']
+        _actions = [x for x in data['actions']
                     if x and "lastBuiltRevision" in x]
         # FIXME So this code returns the first item found in the filtered
         # list. Why not just:
@@ -73,16 +103,18 @@ class Build(JenkinsBase):
             revision = item["lastBuiltRevision"]["SHA1"]
             return revision
 
-    def _get_hg_rev(self):
-        return [x['mercurialNodeName'] for x in self._data['actions'] if 'mercurialNodeName' in x][0]
+    @staticmethod
+    def _get_hg_rev(data):
+        return [x['mercurialNodeName'] for x in data['actions']
+                if x and 'mercurialNodeName' in x][0]
 
     def get_duration(self):
-        return datetime.timedelta(milliseconds=self._data["duration"])
+        return datetime.timedelta(milliseconds=self._get_fields('duration')["duration"])
 
     def get_artifacts(self):
-        for afinfo in self._data["artifacts"]:
+        for afinfo in self._get_fields('artifacts')["artifacts"]:
             url = "%s/artifact/%s" % (self.baseurl, afinfo["relativePath"])
-            af = Artifact(afinfo["fileName"], url, self)
+            af = Artifact(afinfo["fileName"], url, self, afinfo["relativePath"])
             yield af
 
     def get_artifact_dict(self):
@@ -90,6 +122,207 @@ class Build(JenkinsBase):
             (af.filename, af) for af in self.get_artifacts()
         )
 
+    def get_fingerprint_dict(self):
+        """
+        Return a dict of file name -> MD5 for the files fingerprinted by this build.
+        """
+        return dict((fp["fileName"], fp["hash"])
+                    for fp in self._get_fields('fingerprints')["fingerprint"])
+
+    def _get_fingerprint_hashes(self):
+        """
+        Return a dict of file name -> set of MD5s fingerprinted by this build.
+        Jenkins records only the name of a file, which artifacts in different
+        folders may share.
+        """
+        hashes = {}
+        for fp in self._get_fields('fingerprints')["fingerprint"]:
+            hashes.setdefault(fp["fileName"], set()).add(fp["hash"])
+        return hashes
+
+    @staticmethod
+    def _local_path(target_dir, relative_path):
+        """
+        Return where an artifact goes in target_dir, keeping its folders.
+
+        :raises ValueError: if relative_path would leave target_dir
+        """
+        root = os.path.abspath(target_dir)
+        fspath = os.path.normpath(os.path.join(root, relative_path))
+        if not fspath.startswith(root + os.sep):
+            raise ValueError("Artifact path %s leaves %s" % (relative_path, target_dir))
+        return fspath
+
+    def download_artifacts(self, target_dir, workers=4, include=None, retries=2, chunk_size=None,
+                           archive=False):
+        """
+        Download the artifacts of this build to a directory, several at a time,
+        keeping the folders of their paths within the build. Local files whose
+        MD5 matches the fingerprint Jenkins recorded for them are not
+        downloaded again.
+
+        With archive=True all artifacts are fetched in a single request for the
+        zip archive Jenkins builds of them, which is extracted while it is
+        downloaded. This is much faster for builds with many small artifacts.
+
+        :param target_dir: directory to save the artifacts in, created if missing, str
+        :param workers: number of concurrent downloads, int
+        :param include: only download artifacts whose name or path match this glob, str
+        :param retries: number of times to retry a failed download, int
+        :param chunk_size: see Artifact.save
+        :param archive: fetch the zip archive of all artifacts, bool
+        :return: DownloadReport
+        """
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+        if archive:
+            return self._download_archive(target_dir, include, chunk_size)
+        artifacts = [af for af in self.get_artifacts() if include is None or af.matches(include)]
+        # One request for the fingerprints of all files, rather than one per file
+        fingerprints = self._get_fingerprint_hashes() if artifacts else {}
+
+        report = DownloadReport()
+        start = time.time()
+        with Executor(max_workers=workers, name='artifacts') as executor:
+            futures = {}
+            for af in artifacts:
+                try:
+                    fspath = self._local_path(target_dir, af.relative_path)
+                except ValueError as err:
+                    report.failed[af.relative_path] = err
+                    continue
+                future = executor.submit(self._fetch_artifact, af, fspath,
+                                         fingerprints.get(af.filename), retries, chunk_size)
+                futures[future] = fspath
+            for future in as_completed(futures):
+                fspath = futures[future]
+                try:
+                    size = future.result()
+                except Exception as err:
+                    log.error("Could not download %s: %s", fspath, err)
+                    report.failed[fspath] = err
+                    continue
+                if size is None:
+                    report.skipped.append(fspath)
+                else:
+                    report.add(fspath, size)
+        report.seconds = time.time() - start
+        log.info("%s: %s", self, report)
+        return report
+
+    def get_archive_url(self):
+        return "%s/artifact/*zip*/archive.zip" % self.baseurl
+
+    def _download_archive(self, target_dir, include, chunk_size):
+        """
+        Extract the artifacts from the zip archive of the build as it streams in.
+        """
+        fingerprints = self._get_fingerprint_hashes()
+        report = DownloadReport()
+        start = time.time()
+        archive_url = self.get_archive_url()
+        response = self.get_jenkins_obj().requester.get_url(archive_url, stream=True)
+        try:
+            if response.status_code != 200:
+                raise JenkinsAPIException('Operation failed. url={0}, status={1}'.format(
+                    archive_url, response.status_code))
+            response.raw.decode_content = True
+            for entry in iter_zip(response.raw, chunk_size or Artifact.CHUNK_SIZE):
+                # Jenkins puts the artifacts in an "archive" folder
+                relative_path = entry.name.split('/', 1)[-1]
+                filename = os.path.basename(relative_path)
+                if entry.is_dir() or not (include is None or fnmatch.fnmatch(filename, include) or
+                                          fnmatch.fnmatch(relative_path, include)):
+                    continue
+                try:
+                    fspath = self._local_path(target_dir, relative_path)
+                except ValueError as err:
+                    report.failed[relative_path] = err
+                    continue
+                expected_md5s = fingerprints.get(filename)
+                if expected_md5s and os.path.exists(fspath) and Artifact._md5sum(fspath) in expected_md5s:
+                    report.skipped.append(fspath)
+                    continue
+                try:
+                    local_md5 = self._extract_entry(entry, fspath)
+                except zipfile.BadZipfile as err:
+                    # A bad CRC is only found at the end of the entry, the
+                    # next one can still be read
+                    log.error("Could not extract %s: %s", fspath, err)
+                    report.failed[fspath] = err
+                    continue
+                if expected_md5s and local_md5 not in expected_md5s:
+                    report.failed[fspath] = ArtifactBroken("MD5 of %s is %s, Jenkins recorded %s" %
+                                                           (fspath, local_md5, ', '.join(sorted(expected_md5s))))
+                else:
+                    report.add(fspath, entry.file_size)
+        except zipfile.BadZipfile as err:
+            # The stream itself is broken, the remaining entries are lost
+            log.error("Could not read %s: %s", archive_url, err)
+            report.failed[archive_url] = err
+        finally:
+            response.close()
+        report.seconds = time.time() - start
+        log.info("%s: %s", self, report)
+        return report
+
+    @staticmethod
+    def _extract_entry(entry, fspath):
+        """
+        Write a zip entry to a path, see Artifact._do_download. The file is
+        only put in place if the CRC of the entry is right.
+
+        :return: the MD5 hex digest of the file
+        """
+        if not os.path.isdir(os.path.dirname(fspath)):
+            os.makedirs(os.path.dirname(fspath))
+        md5 = hashlib.md5()
+        partpath = fspath + Artifact.PART_SUFFIX
+        try:
+            with open(partpath, 'wb') as out:
+                for chunk in entry.iter_content():
+                    out.write(chunk)
+                    md5.update(chunk)
+        except Exception:
+            os.remove(partpath)
+            raise
+        move_into_place(partpath, fspath)
+        return md5.hexdigest()
+
+    @staticmethod
+    def _fetch_artifact(artifact, fspath, expected_md5s, retries, chunk_size):
+        """
+        Download an artifact unless fspath already holds it.
+
+        :param expected_md5s: MD5s Jenkins fingerprinted under the name of
+                              the artifact, a set or None
+        :return: the size of the downloaded file, or None if it was up to date
+        """
+        if expected_md5s and os.path.exists(fspath) and artifact._md5sum(fspath) in expected_md5s:
+            return None
+        if not os.path.isdir(os.path.dirname(fspath)):
+            try:
+                os.makedirs(os.path.dirname(fspath))
+            except OSError:
+                # Created meanwhile for another artifact of the folder
+                if not os.path.isdir(os.path.dirname(fspath)):
+                    raise
+        partpath = fspath + Artifact.PART_SUFFIX
+        for attempt in xrange(retries + 1):
+            try:
+                local_md5 = artifact._download_part(partpath, chunk_size)
+                if expected_md5s and local_md5 not in expected_md5s:
+                    # A retry must not resume the bad file
+                    artifact._discard_part(partpath)
+                    raise ArtifactBroken("MD5 of %s is %s, Jenkins recorded %s" %
+                                         (fspath, local_md5, ', '.join(sorted(expected_md5s))))
+                artifact._move_into_place(partpath, fspath)
+                return os.path.getsize(fspath)
+            except Exception:
+                if attempt == retries:
+                    raise
+                log.warning("Download of %s failed, retrying", artifact.url, exc_info=True)
+
     def get_upstream_job_name(self):
         """
         Get the upstream job name if it exist, None otherwise
@@ -263,28 +496,36 @@ class Build(JenkinsBase):
         """
         Return a bool if running.
         """
-        self.poll()
-        return self._data["building"]
+        return self._get_fields('running', refresh=True)["building"]
 
-    def block(self):
-        while self.is_running():
-            time.sleep(1)
+    def block(self, timeout=None):
+        """
+        Wait until the build is complete, checking about every second.
+        """
+        self.block_until_complete(delay=1, timeout=timeout)
 
     def is_good(self):
         """
         Return a bool, true if the build was good.
         If the build is still running, return False.
         """
-        return (not self.is_running()) and self._data["result"] == STATUS_SUCCESS
+        return (not self.is_running()) and self._get_fields('running')["result"] == STATUS_SUCCESS
 
-    def block_until_complete(self, delay=15):
-        assert isinstance(delay, int)
-        count = 0
-        while self.is_running():
-            total_wait = delay * count
-            log.info(msg="Waited %is for %s #%s to complete" % (total_wait, self.job.name, self.name))
-            sleep(delay)
-            count += 1
+    def block_until_complete(self, delay=15, timeout=None):
+        """
+        Wait until the build is complete. Checks start after a second and
+        back off to one every delay seconds.
+
+        :param delay: longest time between two checks in seconds, float
+        :param timeout: seconds after which TimeOut is raised, float
+        :return: the result of the build, e.g. "SUCCESS"
+        """
+        assert isinstance(delay, (int, float))
+        log.info("Waiting for %s #%s to complete", self.job.name, self.name)
+        scheduler = WaitScheduler(Backoff.up_to(delay))
+        future = scheduler.add_build(self, timeout)
+        scheduler.run([future])
+        return future.result()
 
     def get_jenkins_obj(self):
         return self.job.get_jenkins_obj()
@@ -328,7 +569,8 @@ class Build(JenkinsBase):
         Returns build timestamp in UTC
         '''
         # Java timestamps are given in miliseconds since the epoch start!
-        naive_timestamp = datetime.datetime(*time.gmtime(self._data['timestamp'] / 1000.0)[:6])
+        timestamp = self._get_fields('timestamp')['timestamp']
+        naive_timestamp = datetime.datetime(*time.gmtime(timestamp / 1000.0)[:6])
         return pytz.utc.localize(naive_timestamp)
 
     def get_console(self):
@@ -338,6 +580,23 @@ class Build(JenkinsBase):
         url = "%s/consoleText" % self.baseurl
         return self.job.jenkins.requester.get_url(url).content
 
+    def stream_console(self, start=0, delay=1, chunk_size=2 ** 16):
+        """
+        Follow the console output as it is written, fetching only new output.
+        Iterating over the result yields chunks of text and ends with the build.
+
+        :param start: byte offset to start at, int
+        :param delay: seconds to wait between polls while there is no new output, float
+        :return: ConsoleStream
+        """
+        return ConsoleStream(self, start, delay, chunk_size)
+
+    def iter_console_lines(self, start=0, delay=1, max_line_length=2 ** 16):
+        """
+        Follow the console output line by line, see stream_console.
+        """
+        return self.stream_console(start, delay).lines(max_line_length)
+
     def stop(self):
         """
         Stops the build execution if it's running
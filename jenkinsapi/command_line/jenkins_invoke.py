@@ -63,7 +63,7 @@ class JenkinsInvoke(object):
     def invokejob(self, jobname, block, token):
         assert type(block) == bool
         assert type(jobname) == str
-        assert token is None or isinstance(token, str)
+        assert token is None or isinstance(token, basestring)
         job = self.api.get_job(jobname)
         job.invoke(securitytoken=token, block=block)
 
@@ -3,6 +3,25 @@ Jenkins configuration
 """
 
 
-JENKINS_API = r"api/python"
+JENKINS_API = r"api/json"
+
+# Name of the decoder used for JENKINS_API responses, see jenkinsapi.utils.decoders.
+# None picks the fastest one installed.
+JSON_DECODER = None
 
 LOAD_TIMEOUT = 30
+
+# File of the SQLite database in which Job.get_buildnumber_for_revision keeps
+# the revisions of builds, e.g. "~/.jenkinsapi/revisions.db". None keeps them
+# in memory until the process exits.
+REVISION_INDEX = None
+
+# File of the SQLite database in which api.search_artifacts keeps the
+# artifacts of builds. None scans the builds of a job newest first instead.
+ARTIFACT_INDEX = None
+
+# File of the SQLite database in which the MD5 digests of local files are
+# kept by path, size and modification time, so that unchanged files are not
+# hashed again, e.g. "~/.jenkinsapi/digests.db". None keeps them in memory
+# until the process exits.
+DIGEST_CACHE = None
@@ -0,0 +1,120 @@
+"""
+Module for following the console output of a build as it grows
+"""
+
+import time
+import logging
+import tempfile
+
+from jenkinsapi.custom_exceptions import JenkinsAPIException
+
+log = logging.getLogger(__name__)
+
+
+class ConsoleStream(object):
+    """
+    Iterates over the console output of a build in chunks, as Jenkins
+    produces it. Only the bytes after offset are fetched on each request, and
+    the iteration ends once Jenkins reports that no more data will come, i.e.
+    when the build is complete.
+
+    offset holds the position reached, so that a later stream can resume there.
+
+    Each response is read to its end, into memory or, past SPOOL_SIZE, a
+    temporary file, and closed before any of it is yielded: while open it
+    holds a slot of the limiter of the requester, which a caller making a
+    request between two chunks, e.g. build.is_running(), would wait for.
+    """
+
+    # Bytes of a response kept in memory before it is spooled to disk
+    SPOOL_SIZE = 2 ** 20
+
+    def __init__(self, build, start=0, delay=1, chunk_size=2 ** 16):
+        """
+        :param build: Build obj
+        :param start: byte offset to start at, int
+        :param delay: seconds to wait before asking again when there was no new output, float
+        :param chunk_size: maximum size of the chunks yielded, int
+        """
+        self.build = build
+        self.offset = start
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.more_data = True
+        self._closed = False
+
+    def get_url(self):
+        return "%s/logText/progressiveText" % self.build.baseurl
+
+    def close(self):
+        """
+        Stop the iteration after the current chunk.
+        """
+        self._closed = True
+
+    def __iter__(self):
+        requester = self.build.get_jenkins_obj().requester
+        while self.more_data and not self._closed:
+            text, next_offset = self._fetch(requester)
+            received = 0
+            try:
+                for chunk in iter(lambda: text.read(self.chunk_size), ''):
+                    received += len(chunk)
+                    yield chunk
+                    if self._closed:
+                        self.offset += received
+                        return
+            finally:
+                text.close()
+            self.offset = max(next_offset, self.offset + received)
+            if self.more_data and not received:
+                time.sleep(self.delay)
+
+    def _fetch(self, requester):
+        """
+        Fetch the output after offset. Returns a file positioned at its start
+        and the offset to ask for next time.
+        """
+        response = requester.get_url(self.get_url(), params={'start': self.offset}, stream=True)
+        text = tempfile.SpooledTemporaryFile(self.SPOOL_SIZE)
+        try:
+            if response.status_code != 200:
+                raise JenkinsAPIException('Operation failed. url={0}, status={1}'.format(
+                    self.get_url(), response.status_code))
+            # X-Text-Size is the offset to ask for next time, which is
+            # where the text sent in this response ends
+            next_offset = int(response.headers.get('X-Text-Size', self.offset))
+            self.more_data = response.headers.get('X-More-Data') == 'true'
+            for chunk in response.iter_content(self.chunk_size):
+                text.write(chunk)
+        except Exception:
+            text.close()
+            raise
+        finally:
+            response.close()
+        text.seek(0)
+        return text, next_offset
+
+    def lines(self, max_line_length=2 ** 16):
+        """
+        Iterate over the lines of the console, without their line ending.
+        Memory use is bounded: lines longer than max_line_length are split in
+        pieces of that length.
+        """
+        pending = ''
+        for chunk in self:
+            pending += chunk
+            pos = 0
+            while True:
+                end = pending.find('\n', pos, pos + max_line_length + 1)
+                if end != -1:
+                    yield pending[pos:end].rstrip('\r')
+                    pos = end + 1
+                elif len(pending) - pos > max_line_length:
+                    yield pending[pos:pos + max_line_length]
+                    pos += max_line_length
+                else:
+                    break
+            pending = pending[pos:]
+        if pending:
+            yield pending.rstrip('\r')
@@ -126,3 +126,11 @@ class NotInQueue(JenkinsAPIException):
     It's a job that is not in the queue
     """
     pass
+
+
+class CircuitOpen(JenkinsAPIException):
+    """
+    Jenkins failed too many requests in a row, see
+    jenkinsapi.utils.retry.CircuitBreaker
+    """
+    pass
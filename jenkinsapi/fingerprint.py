@@ -3,16 +3,53 @@ Module for jenkinsapi Fingerprint
 """
 
 from jenkinsapi.jenkinsbase import JenkinsBase
-from jenkinsapi.custom_exceptions import ArtifactBroken
+from jenkinsapi.custom_exceptions import ArtifactBroken, JenkinsAPIException, NotFound
 
 import urllib2
 import re
+import threading
+from collections import OrderedDict
 
 import logging
 
 log = logging.getLogger(__name__)
 
 
+class FingerprintCache(object):
+    """
+    The data of fingerprints known to Jenkins servers, by server and MD5.
+    Where a file came from never changes, so entries do not expire; the
+    least recently used ones are dropped past max_entries.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, baseurl, id_):
+        with self._lock:
+            data = self._entries.pop((baseurl, id_), None)
+            if data is not None:
+                self._entries[(baseurl, id_)] = data
+            return data
+
+    def store(self, baseurl, id_, data):
+        with self._lock:
+            self._entries.pop((baseurl, id_), None)
+            self._entries[(baseurl, id_)] = data
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by all Fingerprint objects
+KNOWN_FINGERPRINTS = FingerprintCache()
+
+
 class Fingerprint(JenkinsBase):
     """
     Represents a jenkins fingerprint on a single artifact file ??
@@ -25,8 +62,10 @@ class Fingerprint(JenkinsBase):
         assert self.RE_MD5.search(id_), "%s does not look like a valid id" % id_
         url = "%s/fingerprint/%s/" % (baseurl, id_)
         JenkinsBase.__init__(self, url, poll=False)
+        self.server_url = baseurl
         self.id_ = id_
         self.unknown = False  # Previously uninitialized in ctor
+        self.cached = False
 
     def get_jenkins_obj(self):
         return self.jenkins_obj
@@ -34,30 +73,51 @@ class Fingerprint(JenkinsBase):
     def __str__(self):
         return self.id_
 
-    def valid(self):
+    def valid(self, refresh=False):
         """
         Return True / False if valid. If returns True, self.unknown is
         set to either True or False, and can be checked if we have
         positive validity (fingerprint known at server) or negative
         validity (fingerprint not known at server, but not really an
         error).
+
+        Fingerprints known to the server are cached, see KNOWN_FINGERPRINTS.
+
+        :param refresh: ask the server even if the fingerprint is cached, bool
         """
+        data = None if refresh else KNOWN_FINGERPRINTS.get(self.server_url, self.id_)
+        if data is not None:
+            self._json = data
+            self._complete = True
+            self.unknown = False
+            self.cached = True
+            return True
         try:
             self.poll()
             self.unknown = False
-        except urllib2.HTTPError as err:
+            self.cached = False
+        except NotFound:
             # We can't really say anything about the validity of
             # fingerprints not found -- but the artifact can still
             # exist, so it is not possible to definitely say they are
             # valid or not.
-            if err.code == 404:
-                self.unknown = True
-                return True
-
+            self.unknown = True
+            return True
+        except (urllib2.HTTPError, JenkinsAPIException):
             return False
+        KNOWN_FINGERPRINTS.store(self.server_url, self.id_, self._json)
         return True
 
     def validate_for_build(self, filename, job, build):
+        if self._validate_for_build(filename, job, build):
+            return True
+        if self.cached:
+            # The usage of the file may have grown since it was cached
+            self.valid(refresh=True)
+            return self._validate_for_build(filename, job, build)
+        return False
+
+    def _validate_for_build(self, filename, job, build):
         if not self.valid():
             log.info("Unknown to jenkins.")
             return False
@@ -96,3 +156,26 @@ class Fingerprint(JenkinsBase):
         """
         self.poll()
         return self._data["original"]["name"], self._data["original"]["number"], self._data["fileName"]
+
+
+class FingerprintReport(object):
+    """
+    The outcome of validating many files, see Jenkins.validate_fingerprints.
+    """
+
+    def __init__(self):
+        self.md5s = {}
+        self.valid = []
+        self.unknown = []
+        self.invalid = []
+        self.failed = {}
+
+    def ok(self):
+        """
+        True if no file was found invalid, or could not be checked.
+        """
+        return not self.invalid and not self.failed
+
+    def __str__(self):
+        return "%i valid, %i unknown to Jenkins, %i invalid, %i failed" % (
+            len(self.valid), len(self.unknown), len(self.invalid), len(self.failed))
@@ -2,9 +2,9 @@
 Module for Jenkinsapi Invocation object
 """
 
-import time
-import datetime
-from jenkinsapi.custom_exceptions import UnknownQueueItem, TimeOut
+from jenkinsapi.queue import QueueItem
+from jenkinsapi.custom_exceptions import NoBuildData, UnknownQueueItem
+from jenkinsapi.utils.wait import Backoff, wait_until
 
 
 class Invocation(object):
@@ -19,42 +19,127 @@ class Invocation(object):
 
     def __init__(self, job):
         self.job = job
-        self.initial_builds = None
+        self.initial_next_build = None
         self.queue_item = None
         self.build_number = None
+        # Set once Jenkins no longer knows the queue item, or never served it
+        self.queue_item_gone = False
+        self._build_url = None
 
     def __enter__(self):
         """
         Start watching the job
         """
-        self.job.poll()
-        self.initial_builds = set(self.job.get_build_dict().keys())
+        self.initial_next_build = self.job.get_next_build_number(refresh=True)
 
     def __exit__(self, type_, value, traceback):
         """
         Finish watching the job - it will track which new queue items or builds have
         been created as a consequence of invoking the job.
+
+        Jenkins answers the trigger with the URL of the queue item it created,
+        see set_queue_item_url; only older versions need this guesswork.
         """
-        self.job.poll()
-        newly_created_builds = set(self.job.get_build_dict().keys())
-        if newly_created_builds:
-            self.build_number = newly_created_builds.pop()
-        else:
+        if type_ is not None or self.queue_item is not None:
+            return
+        try:
+            self.queue_item = self.job.get_queue_item()
+        except UnknownQueueItem:
             try:
-                self.queue_item = self.job.get_queue_item()
-                self.build_number = self.job.get_next_build_number()
-            except UnknownQueueItem:
-                pass
+                last_build = self.job.get_last_buildnumber()
+            except NoBuildData:
+                return
+            if last_build >= self.initial_next_build:
+                self.build_number = last_build
+
+    def set_queue_item_url(self, url):
+        """
+        Track the queue item at url, the Location of the response to the trigger.
+        """
+        self.queue_item = QueueItem.from_url(self.job.get_jenkins_obj(), url)
+
+    def _poll_queue_item(self):
+        """
+        Poll the queue item and return it, or None once Jenkins does not know
+        it: it forgets items a few minutes after they left the queue, and
+        versions before 1.519 do not serve them at all.
+        """
+        if self.queue_item is None or self.queue_item_gone:
+            return None
+        try:
+            item = self.queue_item.poll()
+        except UnknownQueueItem:
+            self.queue_item_gone = True
+            return None
+        self._take_build(item)
+        return item
+
+    def _take_build(self, item):
+        if item.get_build_number() is not None:
+            self.build_number = item.get_build_number()
+            self._build_url = item.executable['url']
+
+    def _find_build(self):
+        """
+        Look for the build started for the queue item among the builds of the
+        job numbered from initial_next_build on, newest first: the one whose
+        queueId is that of the item, or, with Jenkins too old to tell, the
+        oldest of them. Returns its number, or None.
+        """
+        queue_id = getattr(self.queue_item, 'id', None)
+        found = None
+        for build in self.job.iter_builds_summary(fields='number,url,queueId'):
+            if self.initial_next_build is not None and build.number < self.initial_next_build:
+                break
+            if 'queueId' in build and queue_id is not None:
+                if build.queueId == queue_id:
+                    found = build
+                    break
+            else:
+                found = build
+        if found is None:
+            return None
+        self.build_number = found.number
+        self._build_url = found.url
+        return self.build_number
 
     def get_build_number(self):
         """
         If this job is building or complete then provide it's build-number
         """
-        self.build_number = self.job.get_last_buildnumber()
+        if self.build_number is not None:
+            return self.build_number
+        if self.queue_item is None:
+            return self.job.get_last_buildnumber()
+        if self._poll_queue_item() is not None:
+            if self.build_number is None:
+                raise NoBuildData('%s has not left the queue' % self.queue_item)
+            return self.build_number
+        if self._find_build() is None:
+            raise NoBuildData('No build of %s was started for %s' % (self.job, self.queue_item))
         return self.build_number
 
+    def wait_for_build(self, timeout=None, delay=5):
+        """
+        Wait until the invocation leaves the queue and return its build.
+        """
+        if self.build_number is None and self.queue_item is not None and not self.queue_item_gone:
+            try:
+                self.queue_item.wait_for_build_number(timeout, delay)
+            except UnknownQueueItem:
+                self.queue_item_gone = True
+            else:
+                self._take_build(self.queue_item)
+        if self.build_number is None:
+            self.block_until_not_queued(timeout, delay)
+        return self.get_build()
+
     def get_build(self):
-        return self.job[self.get_build_number()]
+        number = self.get_build_number()
+        if self._build_url is not None:
+            # Where the queue item or the builds of the job said it is
+            return self.job._new_build(self._build_url, number)
+        return self.job[number]
 
     def block_until_not_queued(self, timeout, delay):
         # self.__block(lambda: self.is_queued(), False, timeout, delay)
@@ -66,15 +151,7 @@ class Invocation(object):
 
     @staticmethod
     def __block(fn, expectation, timeout, delay=2):
-        startTime = datetime.datetime.now()
-        endTime = startTime + datetime.timedelta(seconds=timeout)
-        while True:
-            if fn() == expectation:
-                break
-            else:
-                time.sleep(delay)
-            if datetime.datetime.now() > endTime:
-                raise TimeOut()
+        wait_until(lambda: fn() == expectation, timeout, Backoff.up_to(delay))
 
     def block(self, until='completed', timeout=200, delay=2):
         """
@@ -96,6 +173,13 @@ class Invocation(object):
         """
         Returns True if this item is on the queue
         """
+        if self.build_number is not None:
+            return False
+        item = self._poll_queue_item()
+        if item is not None:
+            return not item.is_cancelled() and self.build_number is None
+        if self.queue_item_gone and self._find_build() is not None:
+            return False
         return self.job.is_queued()
 
     def is_running(self):
@@ -106,7 +190,7 @@ class Invocation(object):
         """
         try:
             return self.get_build().is_running()
-        except KeyError:
+        except (KeyError, NoBuildData):
             # This item has not yet executed
             return False
 
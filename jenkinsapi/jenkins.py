@@ -3,6 +3,7 @@ Module for jenkinsapi Jenkins object
 """
 
 
+import os
 import json
 import urllib
 import logging
@@ -17,9 +18,12 @@ from jenkinsapi.nodes import Nodes
 from jenkinsapi.plugins import Plugins
 from jenkinsapi.views import Views
 from jenkinsapi.queue import Queue
-from jenkinsapi.fingerprint import Fingerprint
+from jenkinsapi.snapshot import JobSnapshot
+from jenkinsapi.fingerprint import Fingerprint, FingerprintReport
 from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi.utils import hashing
 from jenkinsapi.utils.requester import Requester
+from jenkinsapi.utils.executor import Executor, as_completed
 from jenkinsapi.custom_exceptions import UnknownJob
 
 log = logging.getLogger(__name__)
@@ -29,16 +33,19 @@ class Jenkins(JenkinsBase):
     """
     Represents a jenkins environment.
     """
-    def __init__(self, baseurl, username=None, password=None, requester=None, request_args=None):
+    def __init__(self, baseurl, username=None, password=None, requester=None, request_args=None,
+                 lazy=False):
         """
         :param baseurl: baseurl for jenkins instance including port, str
         :param username: username for jenkins auth, str
         :param password: password for jenkins auth, str
+        :param lazy: only poll this and the objects created from it when their data is first read, bool
         :return: a Jenkins obj
         """
         request_args = request_args or {}
         self.username = username
         self.password = password
+        self.lazy = lazy
         self.requester = (
             requester or
             Requester(self.username, self.password, baseurl=baseurl, **request_args)
@@ -47,7 +54,7 @@ class Jenkins(JenkinsBase):
 
     def _clone(self):
         return Jenkins(self.baseurl, username=self.username,
-                       password=self.password, requester=self.requester)
+                       password=self.password, requester=self.requester, lazy=self.lazy)
 
     def base_server_url(self):
         if config.JENKINS_API in self.baseurl:
@@ -73,11 +80,56 @@ class Jenkins(JenkinsBase):
         obj_fingerprint = Fingerprint(self.baseurl, digest, jenkins_obj=self)
         return obj_fingerprint.validate_for_build(filename, job, build)
 
+    def validate_fingerprints(self, files, job=None, build=None, workers=8):
+        """
+        Validate the fingerprints of many files, several at a time. Known
+        fingerprints are cached, see fingerprint.KNOWN_FINGERPRINTS.
+
+        :param files: dict of file name -> MD5 hex digest; where the digest is
+                      None the name is a local path, which is hashed first
+        :param job: name of the job which should have produced the files, str
+        :param build: number of the build of that job, int
+        :param workers: maximum number of concurrent requests, int
+        :return: FingerprintReport
+        """
+        assert (job is None) == (build is None), 'Give both job and build, or neither'
+        report = FingerprintReport()
+        to_hash = [name for name, md5 in files.items() if not md5]
+        report.md5s.update((name, md5) for name, md5 in files.items() if md5)
+        digests, failed = hashing.md5sums(to_hash)
+        report.md5s.update(digests)
+        report.failed.update(failed)
+        with Executor(workers, name='fingerprints') as executor:
+            futures = dict((executor.submit(self._check_fingerprint, md5, name, job, build), name)
+                           for name, md5 in report.md5s.items())
+            for future in as_completed(futures):
+                name = futures[future]
+                error = future.exception()
+                if error is not None:
+                    report.failed[name] = error
+                else:
+                    getattr(report, future.result()).append(name)
+        log.info("Checked the fingerprints of %i files: %s", len(files), report)
+        return report
+
+    def _check_fingerprint(self, digest, filename, job, build):
+        """
+        Return "valid", "unknown" or "invalid", the lists of FingerprintReport.
+        """
+        obj_fingerprint = Fingerprint(self.baseurl, digest, jenkins_obj=self)
+        if job is None:
+            ok = obj_fingerprint.valid()
+        else:
+            ok = obj_fingerprint.validate_for_build(os.path.basename(filename), job, build)
+        if obj_fingerprint.unknown:
+            return 'unknown'
+        return 'valid' if ok else 'invalid'
+
     def get_jenkins_obj(self):
         return self
 
     def get_jenkins_obj_from_url(self, url):
-        return Jenkins(url, self.username, self.password, self.requester)
+        return Jenkins(url, self.username, self.password, requester=self.requester, lazy=self.lazy)
 
     def get_create_url(self):
         # This only ever needs to work on the base object
@@ -99,6 +151,19 @@ class Jenkins(JenkinsBase):
             yield info["name"], \
                 Job(info["url"], info["name"], jenkins_obj=self)
 
+    def get_jobs_snapshot(self, fields=None):
+        """
+        Fetch the state of all jobs with a single request, instead of polling
+        every job. Use JobSnapshot.get_job for the full Job of a record.
+
+        :param fields: tree expression of the job fields to fetch, str,
+                       default JobSnapshot.DEFAULT_FIELDS
+        :return: list of JobSnapshot
+        """
+        tree = 'jobs[%s]' % (fields or JobSnapshot.DEFAULT_FIELDS)
+        data = self.get_data(self.python_api_url(self.baseurl), {'tree': tree})
+        return [JobSnapshot(info, self) for info in data.get('jobs', [])]
+
     def get_jobs_info(self):
         """
         Get the jobs information
@@ -231,9 +296,13 @@ class Jenkins(JenkinsBase):
         url = urlparse.urljoin(self.base_server_url(), 'queue')
         return url
 
-    def get_queue(self):
+    def get_queue(self, fields=None):
+        """
+        :param fields: only fetch these fields of each item, e.g.
+                       Queue.SUMMARY_FIELDS, str, default all of them
+        """
         queue_url = self.get_queue_url()
-        return Queue(queue_url, self)
+        return Queue(queue_url, self, fields=fields)
 
     def get_nodes(self):
         url = self.get_nodes_url()
@@ -245,7 +314,6 @@ class Jenkins(JenkinsBase):
         :param nodename: string, hostname
         :return: boolean
         """
-        self.poll()
         return nodename in self.get_nodes()
 
     def delete_node(self, nodename):
@@ -260,6 +328,7 @@ class Jenkins(JenkinsBase):
         assert nodename != "master", "you cannot delete the master node"
         url = "%s/doDelete" % self.get_node_url(nodename)
         self.requester.get_and_confirm_status(url)
+        self.requester.invalidate(self.get_nodes_url())
 
     def create_node(self, name, num_executors=2, node_description=None,
                     remote_fs='/var/lib/jenkins', labels=None, exclusive=False):
@@ -298,12 +367,13 @@ class Jenkins(JenkinsBase):
         }
         url = self.get_node_url() + "doCreateItem?%s" % urllib.urlencode(params)
         self.requester.get_and_confirm_status(url)
+        self.requester.invalidate(self.get_nodes_url())
 
         return Node(nodename=name, baseurl=self.get_node_url(nodename=name), jenkins_obj=self)
 
     def get_plugins_url(self):
         # This only ever needs to work on the base object
-        return '%s/pluginManager/api/python?depth=1' % self.baseurl
+        return '%s/pluginManager/%s?depth=1' % (self.baseurl, config.JENKINS_API)
 
     def get_plugins(self):
         url = self.get_plugins_url()
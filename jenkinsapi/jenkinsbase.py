@@ -4,7 +4,9 @@ Module for JenkinsBase class
 
 import logging
 from jenkinsapi import config
-from jenkinsapi.custom_exceptions import JenkinsAPIException
+from jenkinsapi.custom_exceptions import JenkinsAPIException, NotFound
+from jenkinsapi.utils.decoders import decode
+from jenkinsapi.utils.single_flight import SingleFlight
 log = logging.getLogger(__name__)
 
 
@@ -14,6 +16,10 @@ class JenkinsBase(object):
     """
     RETRY_ATTEMPTS = 1
 
+    # Named tree expressions for accessors which only need a few fields of the
+    # representation, see _get_fields. Subclasses declare their own.
+    TREES = {}
+
     def __repr__(self):
         return """<%s.%s %s>""" % (self.__class__.__module__,
                                    self.__class__.__name__,
@@ -25,11 +31,30 @@ class JenkinsBase(object):
     def __init__(self, baseurl, poll=True):
         """
         Initialize a jenkins connection
+
+        If the Jenkins object this belongs to is lazy, no request is sent
+        until the data is first needed.
         """
-        self._data = None
+        self._json = None
+        self._complete = False
         self.baseurl = self.strip_trailing_slash(baseurl)
-        if poll:
+        if poll and not self.is_lazy():
+            self.poll()
+
+    @property
+    def _data(self):
+        """
+        The full representation of this object, polled on first use.
+        """
+        if not self._complete:
             self.poll()
+        return self._json
+
+    def is_lazy(self):
+        """
+        Return True if polling is deferred until the data is first read.
+        """
+        return getattr(self.get_jenkins_obj(), 'lazy', False) is True
 
     def get_jenkins_obj(self):
         raise NotImplementedError('Please implement this method on %s' % self.__class__.__name__)
@@ -50,18 +75,93 @@ class JenkinsBase(object):
             url = url[:-1]
         return url
 
-    def poll(self):
-        self._data = self._poll()
+    def poll(self, tree=None):
+        """
+        Refresh the data of this object. With a tree expression only the
+        selected fields are fetched, and merged into the data we already have.
+        """
+        if tree is None:
+            self._json = self._poll()
+            self._complete = True
+        else:
+            self._merge_data(self._poll(tree=tree))
+
+    def _merge_data(self, data):
+        """
+        Merge fields fetched elsewhere, e.g. by a batched query, into our data.
+        """
+        # Copy rather than update in place: the old dict may be shared
+        merged = dict(self._json or {})
+        merged.update(data)
+        self._json = merged
 
-    def _poll(self):
+    def _poll(self, tree=None):
         url = self.python_api_url(self.baseurl)
+        if tree:
+            return self.get_data(url, {'tree': tree})
         return self.get_data(url)
 
+    def _get_fields(self, name, refresh=False):
+        """
+        Return data which holds at least the fields of the tree called name in
+        TREES. Objects which are already fully polled answer from their data,
+        others only fetch those fields instead of the full representation.
+
+        :param name: key of the tree expression in TREES, str
+        :param refresh: fetch the fields even if we already have them, bool
+        """
+        tree = self.TREES[name]
+        if refresh or not (self._complete or self._has_fields(tree)):
+            self.poll(tree=tree)
+        return self._json
+
+    def _has_fields(self, tree):
+        """
+        True if all top-level fields of a tree expression have been fetched.
+        """
+        if self._json is None:
+            return False
+        return all(field in self._json for field in self.tree_fields(tree))
+
+    @staticmethod
+    def tree_fields(tree):
+        """
+        Return the names of the top-level fields of a tree expression.
+        """
+        depth = 0
+        fields = ['']
+        for char in tree:
+            if char in '[{':
+                depth += 1
+            elif char in ']}':
+                depth -= 1
+            elif char == ',' and depth == 0:
+                fields.append('')
+            elif depth == 0:
+                fields[-1] += char
+        return fields
+
     def get_data(self, url, params=None):
+        """
+        Fetch and decode the JSON at url. Identical polls made concurrently
+        through the same requester share one request and its decoded result,
+        see Requester.single_flight; the result must not be modified.
+        """
         requester = self.get_jenkins_obj().requester
+        single_flight = getattr(requester, 'single_flight', None)
+        if not isinstance(single_flight, SingleFlight):
+            # Requesters of other implementations need not have one
+            return self._fetch_data(requester, url, params)
+        key = (url, tuple(sorted((params or {}).items())))
+        return single_flight.do(key, lambda: self._fetch_data(requester, url, params))
+
+    @staticmethod
+    def _fetch_data(requester, url, params):
         response = requester.get_url(url, params)
+        if response.status_code == 404:
+            raise NotFound(url)
         try:
-            return eval(response.text)
+            return decode(response.content)
         except Exception:
             log.exception('Inappropriate content found at %s', url)
             raise JenkinsAPIException('Cannot parse %s' % response.content)
@@ -6,13 +6,17 @@ import json
 import logging
 import urlparse
 import xml.etree.ElementTree as ET
-from collections import defaultdict
+from collections import defaultdict, deque
 from time import sleep
 from jenkinsapi.build import Build
 from jenkinsapi.invocation import Invocation
 from jenkinsapi.jenkinsbase import JenkinsBase
 from jenkinsapi.queue import QueueItem
+from jenkinsapi.snapshot import BuildSnapshot
 from jenkinsapi.mutable_jenkins_thing import MutableJenkinsThing
+from jenkinsapi.utils.executor import Executor
+from jenkinsapi.utils.wait import Backoff, wait_until
+from jenkinsapi.utils.revision_index import get_default_index
 from jenkinsapi.custom_exceptions import (
     NoBuildData,
     NotConfiguredSCM,
@@ -38,10 +42,34 @@ class Job(JenkinsBase, MutableJenkinsThing):
     Represents a jenkins job
     A job can hold N builds which are the actual execution environments
     """
+    KNOWNBUILDTYPES = [
+        "lastSuccessfulBuild",
+        "lastBuild",
+        "lastCompletedBuild",
+        "firstBuild",
+        "lastFailedBuild"]
+
+    TREES = {
+        'name': 'name',
+        'description': 'description',
+        'color': 'color',
+        'next_build_number': 'nextBuildNumber',
+        'queue': 'inQueue,queueItem[id,url,blocked,buildable,stuck,why,inQueueSince,params,task[name,url,color]]',
+        'build_ids': ','.join('%s[number,url]' % buildtype for buildtype in KNOWNBUILDTYPES),
+    }
+
+    # Jenkins lists at most 100 builds in "builds", older ones are fetched
+    # from "allBuilds" this many at a time
+    BUILDS_PAGE_SIZE = 100
+
+    # Build summaries are fetched this many at a time
+    SUMMARY_PAGE_SIZE = 1000
+
     def __init__(self, url, name, jenkins_obj):
         self.name = name
         self.jenkins = jenkins_obj
-        self._revmap = None
+        self._build_index = None
+        self._all_builds_loaded = False
         self._config = None
         self._element_tree = None
         self._scm_map = {
@@ -65,40 +93,97 @@ class Job(JenkinsBase, MutableJenkinsThing):
         JenkinsBase.__init__(self, url)
 
     def __str__(self):
-        return self._data["name"]
+        return self._get_fields('name')["name"]
 
     def get_description(self):
-        return self._data["description"]
+        return self._get_fields('description')["description"]
 
     def get_jenkins_obj(self):
         return self.jenkins
 
-    def _poll(self):
-        data = JenkinsBase._poll(self)
-        # jenkins loads only the first 100 builds, load more if needed
-        data = self._add_missing_builds(data)
-        return data
-
-    # pylint: disable=E1123
-    # Unexpected keyword arg 'params'
-    def _add_missing_builds(self, data):
-        '''Query Jenkins to get all builds of the job in the data object.
-
-        Jenkins API loads the first 100 builds and thus may not contain all builds
-        information. This method checks if all builds are loaded in the data object
-        and updates it with the missing builds if needed.'''
-        if not data.get("builds"):
-            return data
-        # do not call _buildid_for_type here: it would poll and do an infinite loop
-        oldest_loaded_build_number = data["builds"][-1]["number"]
-        first_build_number = data["firstBuild"]["number"]
-        all_builds_loaded = (oldest_loaded_build_number == first_build_number)
-        if all_builds_loaded:
-            return data
-        api_url = self.python_api_url(self.baseurl)
-        response = self.get_data(api_url, params={'tree': 'allBuilds[number,url]'})
-        data['builds'] = response['allBuilds']
-        return data
+    def poll(self, tree=None):
+        JenkinsBase.poll(self, tree=tree)
+        if tree is None and "builds" in self._json:
+            # jenkins lists only the newest builds, older ones are paged
+            # in by _load_older_builds when they are asked for
+            builds = self._json["builds"]
+            first_build = self._json.get("firstBuild")
+            complete = not builds or (first_build is not None and
+                                      builds[-1]["number"] == first_build["number"])
+            self._merge_builds(builds, complete)
+
+    def _merge_builds(self, builds, complete=False):
+        """
+        Add build references, newest first, to the index of known builds.
+
+        :param builds: list of dicts with the number and url of a build
+        :param complete: True if builds reaches back to the first build, bool
+        """
+        if self._build_index is None:
+            self._build_index = {}
+        index = self._build_index
+        if (index and len(builds) >= self.BUILDS_PAGE_SIZE and
+                builds[-1]["number"] > max(index)):
+            # More builds ran since we last looked than we got: we cannot
+            # know what lies between them and the builds we had, start over
+            index.clear()
+            self._all_builds_loaded = False
+        for build in builds:
+            index[build["number"]] = build["url"]
+        if complete:
+            self._all_builds_loaded = True
+
+    def _fetch_builds_page(self, start, fields='number,url', size=None):
+        """
+        Fetch the builds from position start in allBuilds, newest first.
+        By default only their number and url are fetched.
+        Raises NoBuildData if the job has no builds at all, like a folder.
+        """
+        tree = 'allBuilds[%s]{%i,%i}' % (fields, start, start + (size or self.BUILDS_PAGE_SIZE))
+        data = self.get_data(self.python_api_url(self.baseurl), {'tree': tree})
+        if "allBuilds" not in data:
+            raise NoBuildData(repr(self))
+        return data["allBuilds"] or []
+
+    def _load_build_index(self):
+        """
+        Make sure the index of builds holds at least the newest builds.
+        """
+        if self._build_index is not None:
+            return
+        if self._complete or not self.is_lazy():
+            self._data  # pylint: disable=W0104
+            if self._build_index is None:
+                raise NoBuildData(repr(self))
+        else:
+            builds = self._fetch_builds_page(0)
+            self._merge_builds(builds, len(builds) < self.BUILDS_PAGE_SIZE)
+
+    def _load_newer_builds(self):
+        """
+        Merge builds which ran since the index was loaded. Returns True if any were found.
+        """
+        known = len(self._build_index)
+        self._merge_builds(self._fetch_builds_page(0))
+        return len(self._build_index) > known
+
+    def _load_older_builds(self):
+        """
+        Fetch the next page of builds older than the ones we know.
+        Returns False once all builds are known.
+        """
+        self._load_build_index()
+        if self._all_builds_loaded:
+            return False
+        known = len(self._build_index)
+        builds = self._fetch_builds_page(known)
+        self._merge_builds(builds, len(builds) < self.BUILDS_PAGE_SIZE)
+        if len(self._build_index) == known and not self._all_builds_loaded:
+            # New builds shifted the positions of those we know into the
+            # page, catch up with them and try again
+            if not self._load_newer_builds():
+                self._all_builds_loaded = True
+        return True
 
     def _get_config_element_tree(self):
         """
@@ -180,39 +265,34 @@ class Job(JenkinsBase, MutableJenkinsThing):
                 files=files,
                 valid=[200, 201]
             )
-            response = response
-            if invoke_pre_check_delay > 0:
+            # Jenkins 1.519 and later tell where the queue item went
+            location = response.headers.get('Location')
+            if location and '/queue/item/' in location:
+                invocation.set_queue_item_url(location)
+            elif invoke_pre_check_delay > 0:
                 log.info(
                     "Waiting for %is to allow Jenkins to catch up", invoke_pre_check_delay)
                 sleep(invoke_pre_check_delay)
             if block:
-                total_wait = 0
-
-                while self.is_queued():
-                    log.info(
-                        "Waited %is for %s to begin...", total_wait, self.name)
-                    sleep(invoke_block_delay)
-                    total_wait += invoke_block_delay
-                if self.is_running():
-                    running_build = self.get_last_build()
+                log.info("Waiting for %s to begin...", self.name)
+                if invocation.queue_item is not None:
+                    running_build = invocation.wait_for_build(delay=invoke_block_delay)
+                else:
+                    wait_until(lambda: not self.is_queued(), backoff=Backoff.up_to(invoke_block_delay))
+                    running_build = self.get_last_build() if self.is_running() else None
+                if running_build is not None:
                     running_build.block_until_complete(
                         delay=invoke_pre_check_delay)
         return invocation
 
     def _buildid_for_type(self, buildtype):
         """Gets a buildid for a given type of build"""
-        self.poll()
-        KNOWNBUILDTYPES = [
-            "lastSuccessfulBuild",
-            "lastBuild",
-            "lastCompletedBuild",
-            "firstBuild",
-            "lastFailedBuild"]
-        assert buildtype in KNOWNBUILDTYPES, 'Unknown build info type: %s' % buildtype
-
-        if not self._data.get(buildtype):
+        assert buildtype in self.KNOWNBUILDTYPES, 'Unknown build info type: %s' % buildtype
+
+        data = self._get_fields('build_ids', refresh=True)
+        if not data.get(buildtype):
             raise NoBuildData(buildtype)
-        return self._data[buildtype]["number"]
+        return data[buildtype]["number"]
 
     def get_first_buildnumber(self):
         """
@@ -244,41 +324,120 @@ class Job(JenkinsBase, MutableJenkinsThing):
         """
         return self._buildid_for_type("lastCompletedBuild")
 
+    def _known_builds(self):
+        """
+        The builds we know of without asking Jenkins, as a dict of number -> url.
+        """
+        self._load_build_index()
+        build_dict = dict(self._build_index)
+        # The last*Build fields may have been refreshed more recently than
+        # the list of builds, see _buildid_for_type
+        data = self._json or {}
+        for buildtype in self.KNOWNBUILDTYPES:
+            build = data.get(buildtype)
+            if build:
+                build_dict[build["number"]] = build["url"]
+        return build_dict
+
     def get_build_dict(self):
-        if "builds" not in self._data:
-            raise NoBuildData(repr(self))
-        builds = self._data["builds"]
-        last_build = self._data['lastBuild']
-        if builds and last_build and builds[0]['number'] != last_build['number']:
-            builds = [last_build] + builds
-        # FIXME SO how is this supposed to work if build is false-y?
-        # I don't think that builds *can* be false here, so I don't
-        # understand the test above.
-        return dict((build["number"], build["url"]) for build in builds)
+        """
+        Return a dict of build number -> url for all builds of this job.
+        """
+        while self._load_older_builds():
+            pass
+        return self._known_builds()
 
     def get_revision_dict(self):
         """
         Get dictionary of all revisions with a list of buildnumbers (int) that used that particular revision
         """
-        revs = defaultdict(list)
-        if 'builds' not in self._data:
+        if (self._complete or not self.is_lazy()) and "builds" not in self._data:
+            # Known without a request; lazy jobs find out from the summaries
             raise NoBuildData(repr(self))
-        for buildnumber in self.get_build_ids():
-            revs[self.get_build(
-                buildnumber).get_revision()].append(buildnumber)
+        revs = defaultdict(list)
+        for build in self.iter_builds_summary(fields='number,%s' % Build.TREES['revision']):
+            revs[build.get_revision()].append(build.number)
         return revs
 
+    def get_builds_summary(self, numbers=None, fields=None):
+        """
+        Fetch the state of many builds at once, with one request for up to
+        SUMMARY_PAGE_SIZE builds instead of polling a Build for each of them.
+
+        :param numbers: build numbers, e.g. range(100, 200), all builds if None
+        :param fields: tree expression of the build fields to fetch, str,
+                       default BuildSnapshot.DEFAULT_FIELDS
+        :return: list of BuildSnapshot, newest first
+        """
+        return list(self.iter_builds_summary(numbers, fields))
+
+    def iter_builds_summary(self, numbers=None, fields=None):
+        """
+        Like get_builds_summary, but fetches the next page of builds only
+        when the iteration reaches it.
+        """
+        fields = fields or BuildSnapshot.DEFAULT_FIELDS
+        if 'number' not in self.tree_fields(fields):
+            fields = 'number,' + fields
+        wanted = None if numbers is None else set(numbers)
+        start = 0
+        size = self.SUMMARY_PAGE_SIZE
+        if wanted is not None:
+            if not wanted:
+                return
+            newest, oldest = max(wanted), min(wanted)
+            size = min(size, newest - oldest + 1)
+            last_build = self._get_fields('build_ids').get("lastBuild")
+            if not last_build:
+                return
+            # allBuilds is indexed by position, not number: build n is at most
+            # at position lastBuild - n, earlier if newer builds were deleted
+            start = max(0, last_build["number"] - newest)
+        first_page = True
+        while True:
+            page = self._fetch_builds_page(start, fields, size)
+            if first_page and start > 0 and (not page or page[0]["number"] < newest):
+                # Deleted builds moved newest before start, by at most the gap
+                start = max(0, start - (newest - page[0]["number"])) if page else 0
+                continue
+            first_page = False
+            for build in page:
+                if wanted is None or build["number"] in wanted:
+                    yield BuildSnapshot(build, self)
+            if len(page) < size or (wanted is not None and page[-1]["number"] <= oldest):
+                return
+            start += len(page)
+
     def get_build_ids(self):
         """
-        Return a sorted list of all good builds as ints.
-        """
-        return reversed(sorted(self.get_build_dict().keys()))
-
-    def get_next_build_number(self):
+        Return an iterator over the numbers of all builds, newest first.
+        Older builds are fetched as the iteration reaches them.
+        """
+        self._load_build_index()
+        return self._iter_build_ids()
+
+    def _iter_build_ids(self):
+        last = None
+        while True:
+            complete = self._all_builds_loaded
+            # firstBuild may be known long before the pages reach it
+            oldest_paged = None if complete or not self._build_index else min(self._build_index)
+            for number in sorted(self._known_builds(), reverse=True):
+                if oldest_paged is not None and number < oldest_paged:
+                    break
+                if last is None or number < last:
+                    last = number
+                    yield number
+            if complete or not self._load_older_builds():
+                return
+
+    def get_next_build_number(self, refresh=False):
         """
         Return the next build number that Jenkins will assign.
+
+        :param refresh: ask Jenkins rather than answer from our data, bool
         """
-        return self._data.get('nextBuildNumber', 0)
+        return self._get_fields('next_build_number', refresh=refresh).get('nextBuildNumber', 0)
 
     def get_last_good_build(self):
         """
@@ -314,26 +473,50 @@ class Job(JenkinsBase, MutableJenkinsThing):
         bn = self.get_last_completed_buildnumber()
         return self.get_build(bn)
 
-    def get_buildnumber_for_revision(self, revision, refresh=False):
+    def get_buildnumber_for_revision(self, revision, refresh=False, index=None):
         """
+        Look a revision up in the revision index, which is updated with the
+        builds which ran since its last update if the revision is not found.
 
-        :param revision: subversion revision to look for, int
-        :param refresh: boolean, whether or not to refresh the revision -> buildnumber map
-        :return: list of buildnumbers, [int]
+        :param revision: subversion revision to look for, int, or the start of a git or mercurial hash, str
+        :param refresh: boolean, whether or not to update the index before the lookup
+        :param index: RevisionIndex to use, default the one stored in config.REVISION_INDEX
+        :return: list of buildnumbers, newest first, [int]
         """
-        if self.get_scm_type() == 'svn' and not isinstance(revision, int):
+        scm = self.get_scm_type()
+        if scm == 'svn' and not isinstance(revision, int):
             revision = int(revision)
-        if self._revmap is None or refresh:
-            self._revmap = self.get_revision_dict()
-        try:
-            return self._revmap[revision]
-        except KeyError:
+        index = index or get_default_index()
+        if refresh:
+            index.update(self)
+        # Hashes may be abbreviated, subversion revisions are numbers
+        buildnumbers = index.lookup(self.baseurl, revision, prefix=scm != 'svn')
+        if not buildnumbers and not refresh:
+            index.update(self)
+            buildnumbers = index.lookup(self.baseurl, revision, prefix=scm != 'svn')
+        if not buildnumbers:
             raise NotFound("Couldn't find a build with that revision")
+        return buildnumbers
 
     def get_build(self, buildnumber):
         assert type(buildnumber) == int
-        url = self.get_build_dict()[buildnumber]
-        return Build(url, buildnumber, job=self)
+        url = self._get_build_url(buildnumber)
+        return self._new_build(url, buildnumber)
+
+    def _new_build(self, url, buildnumber, poll=True):
+        return Build(url, buildnumber, job=self, poll=poll)
+
+    def _get_build_url(self, buildnumber):
+        """
+        Find the url of a build, fetching only the pages of builds up to it.
+        """
+        builds = self._known_builds()
+        if buildnumber not in builds and builds and buildnumber > max(builds):
+            self._load_newer_builds()
+        else:
+            while buildnumber not in builds and self._load_older_builds():
+                builds = self._known_builds()
+        return self._known_builds()[buildnumber]
 
     def __getitem__(self, buildnumber):
         return self.get_build(buildnumber)
@@ -345,8 +528,7 @@ class Job(JenkinsBase, MutableJenkinsThing):
         return self.is_queued() or self.is_running()
 
     def is_queued(self):
-        self.poll()
-        return self._data["inQueue"]
+        return self._get_fields('queue', refresh=True)["inQueue"]
 
     def get_queue_item(self):
         """
@@ -354,10 +536,9 @@ class Job(JenkinsBase, MutableJenkinsThing):
         """
         if not self.is_queued():
             raise UnknownQueueItem()
-        return QueueItem(self.jenkins, **self._data['queueItem'])
+        return QueueItem(self.jenkins, **self._get_fields('queue')['queueItem'])
 
     def is_running(self):
-        self.poll()
         try:
             build = self.get_last_build_or_none()
             if build is not None:
@@ -521,8 +702,7 @@ class Job(JenkinsBase, MutableJenkinsThing):
         return upstream_jobs
 
     def is_enabled(self):
-        self.poll()
-        return self._data["color"] != 'disabled'
+        return self._get_fields('color', refresh=True)["color"] != 'disabled'
 
     def disable(self):
         '''Disable job'''
@@ -541,7 +721,7 @@ class Job(JenkinsBase, MutableJenkinsThing):
         """
         if not self.is_queued():
             raise NotInQueue()
-        queue_id = self._data['queueItem']['id']
+        queue_id = self._get_fields('queue')['queueItem']['id']
         url = urlparse.urljoin(self.get_jenkins_obj().get_queue().baseurl,
                                'cancelItem?id=%s' % queue_id)
         self.get_jenkins_obj().requester.post_and_confirm_status(url, data='')
@@ -574,6 +754,42 @@ class Job(JenkinsBase, MutableJenkinsThing):
             params.append(param['name'])
         return params
 
-    def build_iter(self):
-        for build_id in self.get_build_ids():
-            yield self.get_build(build_id)
+    def build_iter(self, prefetch=0, fields=None):
+        """
+        Iterate over the builds of this job, newest first.
+
+        :param prefetch: number of builds fetched ahead on a thread pool, int.
+                         The fetches still pending when the iteration is
+                         left early are cancelled.
+        :param fields: only fetch the fields of this tree expression, str,
+                       e.g. "artifacts[fileName,relativePath]"
+        """
+        if not prefetch and fields is None:
+            for build_id in self.get_build_ids():
+                yield self.get_build(build_id)
+            return
+        build_ids = self.get_build_ids()
+        executor = Executor(max(prefetch, 1), name='jenkinsapi-prefetch')
+        pending = deque()
+        try:
+            while True:
+                # Keep the window full; the urls are looked up here, as
+                # they may need the next page of builds
+                while len(pending) < max(prefetch, 1):
+                    build_id = next(build_ids, None)
+                    if build_id is None:
+                        break
+                    pending.append(executor.submit(self._load_build, self._get_build_url(build_id),
+                                                   build_id, fields))
+                if not pending:
+                    return
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _load_build(self, url, buildnumber, fields):
+        build = self._new_build(url, buildnumber, poll=False)
+        build.poll(tree=fields)
+        return build
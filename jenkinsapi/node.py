@@ -13,6 +13,11 @@ class Node(JenkinsBase):
     """
     Class to hold information on nodes that are attached as slaves to the master jenkins instance
     """
+    TREES = {
+        'state': 'offline,temporarilyOffline',
+        'jnlp_agent': 'jnlpAgent',
+        'idle': 'idle',
+    }
 
     def __init__(self, baseurl, nodename, jenkins_obj):
         """
@@ -33,18 +38,16 @@ class Node(JenkinsBase):
         return self.name
 
     def is_online(self):
-        self.poll()
-        return not self._data['offline']
+        return not self._get_fields('state', refresh=True)['offline']
 
     def is_temporarily_offline(self):
-        self.poll()
-        return self._data['temporarilyOffline']
+        return self._get_fields('state', refresh=True)['temporarilyOffline']
 
     def is_jnlpagent(self):
-        return self._data['jnlpAgent']
+        return self._get_fields('jnlp_agent')['jnlpAgent']
 
     def is_idle(self):
-        return self._data['idle']
+        return self._get_fields('idle')['idle']
 
     def set_online(self):
         """
@@ -90,6 +93,7 @@ class Node(JenkinsBase):
         initial_state = self.is_temporarily_offline()
         url = self.baseurl + "/toggleOffline?offlineMessage=" + urllib.quote(message)
         html_result = self.jenkins.requester.get_and_confirm_status(url)
+        self.jenkins.requester.invalidate(self.baseurl)
         self.poll()
         log.debug(html_result)
         state = self.is_temporarily_offline()
@@ -14,6 +14,9 @@ class Nodes(JenkinsBase):
     """
     Class to hold information on a collection of nodes
     """
+    TREES = {
+        'names': 'computer[displayName]',
+    }
 
     def __init__(self, baseurl, jenkins_obj):
         """
@@ -32,14 +35,14 @@ class Nodes(JenkinsBase):
         return node_name in self.keys()
 
     def iterkeys(self):
-        for item in self._data['computer']:
+        for item in self._get_fields('names')['computer']:
             yield item['displayName']
 
     def keys(self):
         return list(self.iterkeys())
 
     def iteritems(self):
-        for item in self._data['computer']:
+        for item in self._get_fields('names')['computer']:
             nodename = item['displayName']
             if nodename.lower() == 'master':
                 nodeurl = '%s/(%s)' % (self.baseurl, nodename)
@@ -23,7 +23,9 @@ class Plugins(JenkinsBase):
     def get_jenkins_obj(self):
         return self.jenkins_obj
 
-    def _poll(self):
+    def _poll(self, tree=None):
+        if tree:
+            return self.get_data(self.baseurl, params={'tree': tree})
         return self.get_data(self.baseurl)
 
     def keys(self):
@@ -2,9 +2,14 @@
 Queue module for jenkinsapi
 """
 
-from jenkinsapi.jenkinsbase import JenkinsBase
-from jenkinsapi.custom_exceptions import UnknownQueueItem
+import re
+import time
 import logging
+import urlparse
+
+from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi.utils.wait import Backoff, wait_until
+from jenkinsapi.custom_exceptions import BadURL, NoBuildData, NotFound, UnknownQueueItem, WillNotBuild
 
 log = logging.getLogger(__name__)
 
@@ -12,15 +17,26 @@ log = logging.getLogger(__name__)
 class Queue(JenkinsBase):
     """
     Class that represents the Jenkins queue
+
+    Items are indexed by id, job and label once per poll, so lookups do not
+    scan the queue nor create a QueueItem for every entry.
     """
 
-    def __init__(self, baseurl, jenkins_obj):
+    # Enough for QueueItem.get_job, the index and the state of each item,
+    # without the actions and causes of every entry
+    SUMMARY_FIELDS = 'id,url,blocked,buildable,stuck,why,inQueueSince,params,task[name,url],assignedLabel[name]'
+
+    def __init__(self, baseurl, jenkins_obj, fields=None):
         """
         Init the Jenkins queue object
         :param baseurl: basic url for the queue
         :param jenkins_obj: ref to the jenkins obj
+        :param fields: only fetch these fields of each item, a tree expression
+                       such as SUMMARY_FIELDS, str, default all of them
         """
         self.jenkins = jenkins_obj
+        self.fields = fields
+        self._index = None
         JenkinsBase.__init__(self, baseurl)
 
     def __str__(self):
@@ -29,6 +45,41 @@ class Queue(JenkinsBase):
     def get_jenkins_obj(self):
         return self.jenkins
 
+    def poll(self, tree=None):
+        JenkinsBase.poll(self, tree=tree)
+        self._index = None
+
+    def _poll(self, tree=None):
+        if tree is None and self.fields:
+            tree = 'items[%s]' % self.fields
+        return JenkinsBase._poll(self, tree=tree)
+
+    def _get_index(self):
+        """
+        Return the (by id, by job name, by label) maps of the items of the
+        last poll, building them on first use.
+        """
+        index = self._index
+        if index is None:
+            by_id = {}
+            by_job = {}
+            by_label = {}
+            for item in self._data['items']:
+                by_id[item['id']] = item
+                by_job.setdefault(item['task']['name'], []).append(item)
+                by_label.setdefault(self._label_of(item), []).append(item)
+            index = self._index = (by_id, by_job, by_label)
+        return index
+
+    @staticmethod
+    def _label_of(item):
+        """
+        The label expression an item waits for, None if it may run anywhere
+        or Jenkins does not tell.
+        """
+        label = item.get('assignedLabel')
+        return label.get('name') if label else None
+
     def iteritems(self):
         for item in self._data['items']:
             yield item['id'], QueueItem(self.jenkins, **item)
@@ -37,10 +88,13 @@ class Queue(JenkinsBase):
         for item in self._data['items']:
             yield item['id']
 
-    def iterivalues(self):
+    def itervalues(self):
         for item in self._data['items']:
             yield QueueItem(self.jenkins, **item)
 
+    # Misspelt name of itervalues, kept for compatibility
+    iterivalues = itervalues
+
     def keys(self):
         return list(self.iterkeys())
 
@@ -50,19 +104,61 @@ class Queue(JenkinsBase):
     def __len__(self):
         return len(self._data['items'])
 
+    def __contains__(self, item_id):
+        return item_id in self._get_index()[0]
+
     def __getitem__(self, item_id):
-        self_as_dict = dict(self.iteritems())
-        if item_id in self_as_dict:
-            return self_as_dict[item_id]
-        else:
+        try:
+            return QueueItem(self.jenkins, **self._get_index()[0][item_id])
+        except KeyError:
             raise UnknownQueueItem(item_id)
 
     def get_queue_items_for_job(self, job_name):
+        """
+        Return the items of a job, or with no job name all of them, in queue order.
+        """
         if not job_name:
-            return [QueueItem(**item) for item in self._data['items']]
-        else:
-            return [QueueItem(**item) for item in self._data['items']
-                    if item['task']['name'] == job_name]
+            return self.values()
+        return [QueueItem(self.jenkins, **item) for item in self._get_index()[1].get(job_name, [])]
+
+    def get_queue_items_for_label(self, label):
+        """
+        Return the items waiting for a label expression, in queue order. Needs
+        a Jenkins which exports the assignedLabel of queue items; items which
+        may run on any node are listed under None.
+        """
+        return [QueueItem(self.jenkins, **item) for item in self._get_index()[2].get(label, [])]
+
+    def get_job_names(self):
+        """
+        Return the names of the jobs with queued items.
+        """
+        return self._get_index()[1].keys()
+
+    def poll_changes(self):
+        """
+        Poll the queue and return what changed since the data we had.
+
+        :return: (items added, items removed), lists of QueueItem
+        """
+        before = self._get_index()[0]
+        self.poll()
+        after = self._get_index()[0]
+        added = [QueueItem(self.jenkins, **item) for item_id, item in after.iteritems() if item_id not in before]
+        removed = [QueueItem(self.jenkins, **item) for item_id, item in before.iteritems() if item_id not in after]
+        return added, removed
+
+    def watch(self, interval=1.0):
+        """
+        Poll the queue every interval seconds and yield (items added, items
+        removed) whenever it changed, see poll_changes. Runs until the caller
+        stops iterating.
+        """
+        while True:
+            time.sleep(interval)
+            added, removed = self.poll_changes()
+            if added or removed:
+                yield added, removed
 
     def delete_item(self, queue_item):
         self.delete_item_by_id(queue_item.id)
@@ -78,18 +174,96 @@ class QueueItem(object):
     those changes
     """
 
+    # What poll fetches: enough to tell whether the item left the queue, and
+    # for which build
+    TREE = 'id,url,why,blocked,buildable,stuck,cancelled,executable[number,url],task[name,url]'
+
     def __init__(self, jenkins, **kwargs):
         self.jenkins = jenkins
         self.__dict__.update(kwargs)
 
+    @classmethod
+    def from_url(cls, jenkins, url):
+        """
+        Return the item at a URL such as the Location returned when a build is
+        triggered, without polling it.
+        """
+        matched = re.search(r'/queue/item/(\d+)/?$', url)
+        if not matched:
+            raise BadURL('Not the URL of a queue item: %s' % url)
+        return cls(jenkins, id=int(matched.group(1)), url=url)
+
+    def get_url(self):
+        # Jenkins gives the URL relative to its root
+        return urlparse.urljoin(self.jenkins.base_server_url() + '/', self.url)
+
+    def poll(self):
+        """
+        Refresh the state of this item from queue/item/<id>/api, which Jenkins
+        keeps for a few minutes after the item has left the queue.
+        """
+        url = JenkinsBase.python_api_url(self.get_url())
+        try:
+            data = self.jenkins.get_data(url, {'tree': self.TREE})
+        except NotFound:
+            raise UnknownQueueItem(self.id)
+        self.__dict__.update(data)
+        return self
+
+    def is_cancelled(self):
+        return bool(getattr(self, 'cancelled', False))
+
+    def get_build_number(self):
+        """
+        Return the number of the build started for this item, as of the last
+        poll, or None if it has not left the queue.
+        """
+        executable = getattr(self, 'executable', None)
+        return executable['number'] if executable else None
+
+    def get_build(self):
+        number = self.get_build_number()
+        if number is None:
+            raise NoBuildData(str(self))
+        # The job may not know of the build yet, but we know its URL
+        return self.get_job()._new_build(self.executable['url'], number)
+
+    def wait_for_build_number(self, timeout=None, delay=5):
+        """
+        Poll this item until it leaves the queue, and return the number of the
+        build started for it.
+
+        :param timeout: seconds after which TimeOut is raised, float
+        :param delay: longest interval between two polls, float
+        :raise WillNotBuild: if the item was cancelled
+        """
+        def left_queue():
+            self.poll()
+            return self.is_cancelled() or self.get_build_number() is not None
+        wait_until(left_queue, timeout, Backoff.up_to(delay))
+        if self.is_cancelled():
+            raise WillNotBuild('%s was cancelled' % self)
+        return self.get_build_number()
+
+    def wait_for_build(self, timeout=None, delay=5):
+        """
+        As wait_for_build_number, but return the Build.
+        """
+        self.wait_for_build_number(timeout, delay)
+        return self.get_build()
+
     def get_job(self):
         """
         Return the job associated with this queue item
         """
+        if not hasattr(self, 'task'):
+            self.poll()
         return self.jenkins[self.task['name']]
 
     def __repr__(self):
         return "<%s.%s %s>" % (self.__class__.__module__, self.__class__.__name__, str(self))
 
     def __str__(self):
+        if not hasattr(self, 'task'):
+            return "queue item #%i" % self.id
         return "%s #%i" % (self.task['name'], self.id)
@@ -0,0 +1,130 @@
+"""
+Read-only records built from a single tree query, for listing many Jenkins
+objects without creating (and polling) one full object per entry.
+"""
+
+from jenkinsapi.constants import STATUS_SUCCESS
+from jenkinsapi.custom_exceptions import NoBuildData
+
+
+class Snapshot(object):
+    """
+    A read-only view of a dict returned by the Jenkins API. Fields are
+    attributes named as in the API, nested objects are snapshots too.
+    """
+    __slots__ = ('_fields', '_jenkins')
+
+    def __init__(self, fields, jenkins_obj=None):
+        object.__setattr__(self, '_fields', fields)
+        object.__setattr__(self, '_jenkins', jenkins_obj)
+
+    def __getattr__(self, name):
+        try:
+            value = self._fields[name]
+        except KeyError:
+            raise AttributeError('%s has no field %r' % (self.__class__.__name__, name))
+        if isinstance(value, dict):
+            return Snapshot(value, self._jenkins)
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is read-only' % self.__class__.__name__)
+
+    def __getitem__(self, name):
+        return self._fields[name]
+
+    def __contains__(self, name):
+        return name in self._fields
+
+    def get(self, name, default=None):
+        return self._fields.get(name, default)
+
+    def as_dict(self):
+        return dict(self._fields)
+
+    def __eq__(self, other):
+        return isinstance(other, Snapshot) and self._fields == other._fields
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<%s.%s %r>' % (self.__class__.__module__, self.__class__.__name__, self._fields)
+
+
+class JobSnapshot(Snapshot):
+    """
+    The state of a job as listed by Jenkins.get_jobs_snapshot.
+    """
+    __slots__ = ()
+
+    # The fields fetched for every job unless others are asked for
+    DEFAULT_FIELDS = 'name,url,color,lastBuild[number,result,timestamp,duration],inQueue'
+
+    def __str__(self):
+        return self.name
+
+    def is_enabled(self):
+        return self.color != 'disabled'
+
+    def is_running(self):
+        return (self.get('color') or '').endswith('_anime')
+
+    def is_queued(self):
+        return self.inQueue
+
+    def get_last_buildnumber(self):
+        last_build = self.get('lastBuild')
+        if not last_build:
+            raise NoBuildData('lastBuild')
+        return last_build['number']
+
+    def get_job(self):
+        """
+        Upgrade this record to a full Job object.
+        """
+        from jenkinsapi.job import Job
+        return Job(self.url, self.name, jenkins_obj=self._jenkins)
+
+
+class BuildSnapshot(Snapshot):
+    """
+    The state of a build as listed by Job.get_builds_summary.
+    """
+    __slots__ = ('_job',)
+
+    # The fields fetched for every build unless others are asked for
+    DEFAULT_FIELDS = 'number,url,result,building,timestamp,duration'
+
+    def __init__(self, fields, job):
+        Snapshot.__init__(self, fields, job.get_jenkins_obj())
+        object.__setattr__(self, '_job', job)
+
+    def __str__(self):
+        return '%s #%s' % (self._job.name, self.number)
+
+    def get_number(self):
+        return self.number
+
+    def get_status(self):
+        return self.result
+
+    def is_running(self):
+        return self.building
+
+    def is_good(self):
+        return not self.building and self.result == STATUS_SUCCESS
+
+    def get_revision(self):
+        """
+        Needs the fields of Build.TREES['revision'].
+        """
+        from jenkinsapi.build import Build
+        return Build.revision_of(self._fields)
+
+    def get_build(self):
+        """
+        Upgrade this record to a full Build object.
+        """
+        from jenkinsapi.build import Build
+        return Build(self.url, self.number, job=self._job)
@@ -0,0 +1,98 @@
+"""
+A persistent index of the artifacts archived by the builds of jobs, used by
+api.search_artifacts and api.search_artifact_by_regexp. See
+jenkinsapi.utils.build_index.
+"""
+
+import re
+import fnmatch
+from collections import namedtuple
+
+from jenkinsapi import config
+from jenkinsapi.utils import sqlite_store
+from jenkinsapi.utils.build_index import BuildIndex
+
+IndexedArtifact = namedtuple('IndexedArtifact', 'number filename relative_path md5')
+
+
+class ArtifactIndex(BuildIndex):
+    """
+    Holds the file name, path, build number and fingerprint of every
+    artifact of the jobs indexed.
+    """
+
+    JOBS_TABLE = 'artifact_jobs'
+    ROWS_TABLE = 'artifacts'
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS artifacts (
+        url TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        relative_path TEXT NOT NULL,
+        md5 TEXT,
+        PRIMARY KEY (url, number, relative_path)
+    );
+    CREATE INDEX IF NOT EXISTS artifacts_filename ON artifacts (url, filename);
+    """
+    FIELDS = 'artifacts[fileName,relativePath],fingerprint[fileName,hash]'
+
+    def rows_for(self, job_url, build):
+        md5s = dict((fp['fileName'], fp['hash']) for fp in build.get('fingerprint') or [])
+        return [(job_url, build.number, artifact['fileName'], artifact['relativePath'],
+                 md5s.get(artifact['fileName']))
+                for artifact in build.get('artifacts') or []]
+
+    def store(self, job_url, rows):
+        self._db.executemany('INSERT OR REPLACE INTO artifacts (url, number, filename, relative_path, md5) '
+                             'VALUES (?, ?, ?, ?, ?)', rows)
+
+    def find(self, job_url, names=None, glob=None, regexp=None, limit=None):
+        """
+        Return the artifacts of a job matching all of the criteria given, newest first.
+
+        :param names: file names, list of str
+        :param glob: glob pattern matching the file name or the path, as Artifact.matches
+        :param regexp: regular expression searched in the file name, str or compiled
+        :param limit: maximum number of artifacts to return, int
+        """
+        query = 'SELECT number, filename, relative_path, md5 FROM artifacts WHERE url = ?'
+        args = [job_url]
+        if names is not None:
+            names = list(names)
+            query += ' AND filename IN (%s)' % ','.join('?' * len(names))
+            args.extend(names)
+        query += ' ORDER BY number DESC, relative_path'
+        if isinstance(regexp, basestring):
+            regexp = re.compile(regexp)
+        found = []
+        for row in self._query(query, args):
+            artifact = IndexedArtifact(*row)
+            if glob is not None and not (fnmatch.fnmatch(artifact.filename, glob) or
+                                         fnmatch.fnmatch(artifact.relative_path, glob)):
+                continue
+            if regexp is not None and not regexp.search(artifact.filename):
+                continue
+            found.append(artifact)
+            if len(found) == limit:
+                break
+        return found
+
+    def builds_with(self, job_url, names):
+        """
+        Return the numbers of the builds of a job which have all of the
+        artifacts named, newest first.
+
+        :param names: file names, list of str
+        """
+        names = set(names)
+        query = ('SELECT number FROM artifacts WHERE url = ? AND filename IN (%s) '
+                 'GROUP BY number HAVING COUNT(DISTINCT filename) = ? ORDER BY number DESC'
+                 % ','.join('?' * len(names)))
+        return [row[0] for row in self._query(query, [job_url] + list(names) + [len(names)])]
+
+
+def get_default_index():
+    """
+    The index shared by all jobs, stored in config.ARTIFACT_INDEX.
+    """
+    return sqlite_store.get_shared(ArtifactIndex, config.ARTIFACT_INDEX)
@@ -0,0 +1,180 @@
+"""
+Base class of the local indexes of the builds of jobs, see RevisionIndex and
+ArtifactIndex.
+
+An index lives in an SQLite database keyed by job URL, so that it survives
+the process when it is stored in a file. It is brought up to date
+incrementally: only the builds newer than the last one indexed are fetched,
+with a few build summary requests (see Job.iter_builds_summary).
+"""
+
+import logging
+import threading
+
+from jenkinsapi.custom_exceptions import NoBuildData
+from jenkinsapi.utils import sqlite_store
+
+log = logging.getLogger(__name__)
+
+
+class BuildIndex(object):
+    """
+    Rows derived from the completed builds of jobs. Subclasses name their
+    tables, the build fields they need and how a build becomes rows.
+    Safe to share between threads.
+    """
+
+    # Table holding the number of the last build indexed for each job
+    JOBS_TABLE = None
+    # Table holding the rows, with url and number columns
+    ROWS_TABLE = None
+    # Statements creating ROWS_TABLE and its indexes
+    SCHEMA = None
+    # Tree expression of the build fields needed, besides number and building
+    FIELDS = None
+
+    def __init__(self, path=':memory:'):
+        """
+        :param path: file of the SQLite database, ':memory:' for one which
+                     lives as long as this object, str
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite_store.connect(path)
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS %s (url TEXT PRIMARY KEY, last_number INTEGER NOT NULL, '
+            'last_timestamp INTEGER);' % self.JOBS_TABLE + self.SCHEMA)
+        with self._lock:
+            with self._db:
+                columns = set(row[1] for row in self._db.execute('PRAGMA table_info(%s)' % self.JOBS_TABLE))
+                if 'last_timestamp' not in columns:
+                    self._db.execute('ALTER TABLE %s ADD COLUMN last_timestamp INTEGER' % self.JOBS_TABLE)
+                self.migrate()
+
+    def migrate(self):
+        """
+        Move rows kept by an earlier layout of the database into the current
+        tables, within a transaction. Nothing to do by default.
+        """
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def last_indexed(self, job_url):
+        """
+        Number of the newest build indexed for a job, 0 if none.
+        """
+        row = self._query('SELECT last_number FROM %s WHERE url = ?' % self.JOBS_TABLE, (job_url,))
+        return row[0][0] if row else 0
+
+    def update(self, job):
+        """
+        Index the builds of job which completed since the last update.
+        Returns the number of builds added.
+        """
+        url = job.baseurl
+        last = self.last_indexed(url)
+        try:
+            last_build = job.get_last_buildnumber()
+        except NoBuildData:
+            return 0
+        if last_build < last:
+            if not self._recreated(job, url, last_build):
+                # The newest builds were deleted
+                log.info('Builds of %s after #%i were deleted', url, last_build)
+                self.discard_after(url, last_build)
+                return 0
+            # The job was recreated, and numbers its builds from 1 again
+            log.info('Build numbers of %s went back, reindexing it', url)
+            self.forget(url)
+            last = 0
+        if last_build == last:
+            return 0
+        rows = []
+        running = []
+        indexed = 0
+        timestamps = {}
+        fields = 'number,building,timestamp,%s' % self.FIELDS
+        for build in job.iter_builds_summary(range(last + 1, last_build + 1), fields=fields):
+            if build.building:
+                # Builds only record their outcome once they complete
+                running.append(build.number)
+                continue
+            rows.extend(self.rows_for(url, build))
+            timestamps[build.number] = build.get('timestamp')
+            indexed += 1
+        # Builds above one still running are fetched again by the next update
+        indexed_to = min(running) - 1 if running else last_build
+        last_timestamp = max([t for n, t in timestamps.items() if n <= indexed_to] or [None])
+        with self._lock:
+            with self._db:
+                self.store(url, rows)
+                self._db.execute('INSERT OR REPLACE INTO %s (url, last_number, last_timestamp) '
+                                 'VALUES (?, ?, COALESCE(?, (SELECT last_timestamp FROM %s WHERE url = ?)))'
+                                 % (self.JOBS_TABLE, self.JOBS_TABLE),
+                                 (url, indexed_to, last_timestamp, url))
+        log.debug('Indexed %i builds of %s, up to #%i', indexed, url, indexed_to)
+        return indexed
+
+    def _recreated(self, job, job_url, last_build):
+        """
+        Tell whether a job whose last build is numbered below the last one
+        indexed was recreated, rather than had its newest builds deleted: its
+        last build then started after the newest one indexed did.
+        """
+        row = self._query('SELECT last_timestamp FROM %s WHERE url = ?' % self.JOBS_TABLE, (job_url,))
+        indexed_timestamp = row[0][0] if row else None
+        if indexed_timestamp is None:
+            # Indexed before timestamps were kept
+            return True
+        builds = list(job.iter_builds_summary([last_build], fields='number,timestamp'))
+        return not builds or builds[0].get('timestamp', 0) > indexed_timestamp
+
+    def rows_for(self, job_url, build):
+        """
+        Return the rows to store for a completed build.
+
+        :param build: BuildSnapshot with the fields of FIELDS
+        """
+        raise NotImplementedError
+
+    def store(self, job_url, rows):
+        """
+        Insert rows, within the transaction of an update.
+        """
+        raise NotImplementedError
+
+    def discard(self, job_url, number):
+        """
+        Drop the rows of a build, e.g. one which was deleted.
+        """
+        with self._lock:
+            with self._db:
+                self._db.execute('DELETE FROM %s WHERE url = ? AND number = ?' % self.ROWS_TABLE,
+                                 (job_url, number))
+
+    def discard_after(self, job_url, number):
+        """
+        Drop the rows of the builds numbered above number, and index the job
+        up to number only.
+        """
+        with self._lock:
+            with self._db:
+                self._db.execute('DELETE FROM %s WHERE url = ? AND number > ?' % self.ROWS_TABLE,
+                                 (job_url, number))
+                self._db.execute('UPDATE %s SET last_number = ? WHERE url = ?' % self.JOBS_TABLE,
+                                 (number, job_url))
+
+    def forget(self, job_url):
+        """
+        Drop everything indexed for a job.
+        """
+        with self._lock:
+            with self._db:
+                self._db.execute('DELETE FROM %s WHERE url = ?' % self.ROWS_TABLE, (job_url,))
+                self._db.execute('DELETE FROM %s WHERE url = ?' % self.JOBS_TABLE, (job_url,))
+
+    def _query(self, query, args=()):
+        with self._lock:
+            return self._db.execute(query, args).fetchall()
@@ -0,0 +1,66 @@
+"""
+Decoders for the data returned by the Jenkins JSON API.
+
+The standard library json module is always available. If an accelerated
+decoder (ujson or simplejson) is installed it is preferred, unless
+config.JSON_DECODER names a specific decoder.
+"""
+
+import json
+
+from jenkinsapi import config
+
+DECODERS = {}
+
+
+def register_decoder(name, loads):
+    """
+    Make a decoder available under a name.
+
+    :param name: name used to select the decoder, str
+    :param loads: callable turning a JSON document (str) into python objects
+    """
+    DECODERS[name] = loads
+
+
+register_decoder('json', json.loads)
+
+try:
+    import simplejson
+    register_decoder('simplejson', simplejson.loads)
+except ImportError:
+    pass
+
+try:
+    import ujson
+    register_decoder('ujson', ujson.loads)
+except ImportError:
+    pass
+
+# Decoders in order of preference when none is configured
+PREFERRED_DECODERS = ['ujson', 'simplejson', 'json']
+
+
+def get_decoder(name=None):
+    """
+    Return the loads-function of the named decoder. When no name is given the
+    one configured in config.JSON_DECODER is used, or else the fastest
+    available decoder.
+    """
+    name = name or config.JSON_DECODER
+    if name:
+        try:
+            return DECODERS[name]
+        except KeyError:
+            raise ValueError("Unknown JSON decoder %r, available: %s" %
+                             (name, ", ".join(sorted(DECODERS))))
+    for name in PREFERRED_DECODERS:
+        if name in DECODERS:
+            return DECODERS[name]
+
+
+def decode(text, name=None):
+    """
+    Decode a JSON document with the selected decoder.
+    """
+    return get_decoder(name)(text)
@@ -0,0 +1,219 @@
+"""
+A small bounded thread pool returning futures, used wherever jenkinsapi talks
+to Jenkins concurrently.
+"""
+
+import sys
+import Queue
+import logging
+import threading
+
+from jenkinsapi.custom_exceptions import TimeOut
+
+log = logging.getLogger(__name__)
+
+
+class CancelledError(Exception):
+    """
+    The result of a cancelled future was requested.
+    """
+    pass
+
+
+class Future(object):
+    """
+    The eventual result of a call submitted to an Executor.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._exc_info = None
+        self._cancelled = False
+        self._running = False
+        self._callbacks = []
+
+    def cancel(self):
+        """
+        Cancel the call if it has not started yet. Returns True on success.
+        """
+        with self._lock:
+            if self._running or self._done.is_set():
+                return False
+            self._cancelled = True
+        self._finish()
+        return True
+
+    def cancelled(self):
+        return self._cancelled
+
+    def done(self):
+        return self._done.is_set()
+
+    def set_running(self):
+        """
+        Mark the call as started; returns False if it was cancelled before.
+        """
+        with self._lock:
+            if self._cancelled:
+                return False
+            self._running = True
+            return True
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exc_info):
+        """
+        :param exc_info: a sys.exc_info() triple, re-raised by result()
+        """
+        self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    def _run_callback(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            log.exception('Callback %r of %r failed', callback, self)
+
+    def add_done_callback(self, callback):
+        """
+        Call callback(future) when the future completes, or now if it has.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run_callback(callback)
+
+    def exception(self, timeout=None):
+        self._wait(timeout)
+        return self._exc_info and self._exc_info[1]
+
+    def result(self, timeout=None):
+        """
+        Wait for the call to complete and return its result, or raise its exception.
+        """
+        self._wait(timeout)
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def _wait(self, timeout):
+        # Event.wait without a timeout cannot be interrupted in python 2
+        while not self._done.wait(timeout if timeout is not None else 3600):
+            if timeout is not None:
+                raise TimeOut('Result not available after %ss' % timeout)
+        if self._cancelled:
+            raise CancelledError()
+
+
+class Executor(object):
+    """
+    Runs callables on at most max_workers threads.
+    """
+
+    def __init__(self, max_workers=8, name='jenkinsapi'):
+        assert max_workers > 0, 'An executor needs at least one worker'
+        self.max_workers = max_workers
+        self.name = name
+        self._work = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule fn(*args, **kwargs) and return a Future for its result.
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit to an executor which was shut down')
+            self._work.put((future, fn, args, kwargs))
+            if len(self._threads) < self.max_workers:
+                self._start_worker()
+        return future
+
+    def map(self, fn, *iterables):
+        """
+        Like the builtin map, but calls run concurrently. Returns the results in order.
+        """
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        return [future.result() for future in futures]
+
+    def _start_worker(self):
+        thread = threading.Thread(target=self._worker,
+                                  name='%s-%i' % (self.name, len(self._threads)))
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if not future.set_running():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                future.set_exception(sys.exc_info())
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers once the submitted work is done.
+        """
+        with self._lock:
+            self._shutdown = True
+            for _ in self._threads:
+                self._work.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.shutdown(wait=True)
+
+
+def as_completed(futures, timeout=None):
+    """
+    Yield futures as they complete.
+    """
+    finished = Queue.Queue()
+    futures = list(futures)
+    for future in futures:
+        future.add_done_callback(finished.put)
+    remaining = len(futures)
+    while remaining:
+        try:
+            future = finished.get(timeout=timeout if timeout is not None else 3600)
+        except Queue.Empty:
+            if timeout is not None:
+                raise TimeOut('Futures did not complete within %ss' % timeout)
+            continue
+        remaining -= 1
+        yield future
+
+
+def gather(futures, timeout=None):
+    """
+    Wait for all futures and return their results in order.
+    """
+    return [future.result(timeout) for future in futures]
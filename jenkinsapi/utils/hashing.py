@@ -0,0 +1,182 @@
+"""
+MD5 hashing of local files, producing the digests Jenkins records as
+fingerprints.
+
+Digests are cached by path, size and modification time, so that a file which
+did not change since it was last hashed, e.g. by a previous deploy run, is not
+read again. Large files are hashed through mmap, without copying them into
+Python strings, and many files are hashed in parallel on threads: hashlib
+releases the GIL while it digests more than a couple of kilobytes, so threads
+keep all cores busy without pickling anything to worker processes.
+"""
+
+import os
+import mmap
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing
+
+from jenkinsapi import config
+from jenkinsapi.utils.executor import Executor
+from jenkinsapi.utils import sqlite_store
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2 ** 20
+# Files at least this large are mapped rather than read
+MMAP_THRESHOLD = 16 * 2 ** 20
+# Bytes of a mapped file handed to hashlib at a time
+MMAP_WINDOW = 64 * 2 ** 20
+# A file modified this recently may change again within the resolution of
+# its modification time, so its digest is not cached
+RACY_SECONDS = 2
+
+
+class DigestCache(object):
+    """
+    The MD5 digests of local files, keyed by absolute path and valid as long
+    as the size and modification time of the file are unchanged. Lives in an
+    SQLite database, so that it survives the process when stored in a file.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        :param path: file of the SQLite database, ':memory:' for one which
+                     lives as long as this object, str
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite_store.connect(path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS digests ('
+                         'path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, md5 TEXT NOT NULL)')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def get(self, fspath, stat):
+        """
+        Return the cached digest of a file, or None if it is unknown or the
+        file changed since.
+
+        :param stat: os.stat() of the file
+        """
+        with self._lock:
+            row = self._db.execute('SELECT size, mtime, md5 FROM digests WHERE path = ?',
+                                   (os.path.abspath(fspath),)).fetchone()
+            if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime:
+                self.hits += 1
+                return str(row[2])
+            self.misses += 1
+            return None
+
+    def store(self, fspath, stat, md5):
+        """
+        Remember the digest of a file, unless it was modified too recently to
+        tell later changes apart by modification time.
+
+        :param stat: os.stat() of the file, taken before it was hashed
+        """
+        if time.time() - stat.st_mtime < RACY_SECONDS:
+            return
+        with self._lock:
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO digests (path, size, mtime, md5) VALUES (?, ?, ?, ?)',
+                                 (os.path.abspath(fspath), stat.st_size, stat.st_mtime, md5))
+
+    def forget(self, fspath):
+        with self._lock:
+            with self._db:
+                self._db.execute('DELETE FROM digests WHERE path = ?', (os.path.abspath(fspath),))
+
+    def clear(self):
+        with self._lock:
+            with self._db:
+                self._db.execute('DELETE FROM digests')
+
+
+def get_default_cache():
+    """
+    The digest cache shared by the whole process, stored in config.DIGEST_CACHE.
+    """
+    return sqlite_store.get_shared(DigestCache, config.DIGEST_CACHE)
+
+
+def update_md5(md5, fspath, chunk_size=CHUNK_SIZE):
+    """
+    Feed the content of a file to a hash object.
+    """
+    with open(fspath, 'rb') as f:
+        _update_md5(md5, f, chunk_size)
+
+
+def _update_md5(md5, f, chunk_size):
+    size = os.fstat(f.fileno()).st_size
+    if size >= MMAP_THRESHOLD:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for offset in xrange(0, size, MMAP_WINDOW):
+                md5.update(buffer(mapped, offset, MMAP_WINDOW))
+        finally:
+            mapped.close()
+    else:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            md5.update(chunk)
+
+
+def md5sum(fspath, cache=None, chunk_size=CHUNK_SIZE):
+    """
+    Return the MD5 hex digest of a file, as Jenkins computes it.
+
+    :param cache: DigestCache consulted and updated, default get_default_cache(),
+                  False to always read the file
+    """
+    if cache is None:
+        cache = get_default_cache()
+    with open(fspath, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if cache:
+            digest = cache.get(fspath, stat)
+            if digest is not None:
+                return digest
+        md5 = hashlib.md5()
+        _update_md5(md5, f, chunk_size)
+    digest = md5.hexdigest()
+    if cache:
+        cache.store(fspath, stat, digest)
+    return digest
+
+
+def md5sums(paths, workers=None, cache=None):
+    """
+    Hash many files in parallel.
+
+    :param paths: local files, list of str
+    :param workers: number of threads, default one per CPU
+    :param cache: as md5sum
+    :return: (dict of path -> MD5 hex digest, dict of path -> exception for
+             the files which could not be read)
+    """
+    paths = list(paths)
+    if cache is None:
+        cache = get_default_cache()
+    digests = {}
+    failed = {}
+    workers = min(workers or multiprocessing.cpu_count(), len(paths))
+    if not workers:
+        return digests, failed
+    with Executor(workers, name='md5') as executor:
+        futures = [(fspath, executor.submit(md5sum, fspath, cache)) for fspath in paths]
+        for fspath, future in futures:
+            error = future.exception()
+            if error is None:
+                digests[fspath] = future.result()
+            else:
+                failed[fspath] = error
+    log.debug("Hashed %i files, %i failed", len(digests), len(failed))
+    return digests, failed
@@ -2,6 +2,7 @@
 Kerberos aware Requester
 """
 from jenkinsapi.utils.requester import Requester
+from jenkinsapi.utils.session_auth import SessionAuth, ThreadLocalAuth
 from requests_kerberos import HTTPKerberosAuth, OPTIONAL
 
 
@@ -9,29 +10,37 @@ from requests_kerberos import HTTPKerberosAuth, OPTIONAL
 class KrbRequester(Requester):
     """
     A class which carries out HTTP requests with Kerberos/GSSAPI authentication.
+    It shares the pooled session of the base Requester. Every request is
+    answered with a 401 challenge first and authenticated by a SPNEGO
+    exchange, unless reuse_session lets the session cookie stand in for it.
     """
 
-    def __init__(self, ssl_verify=None, baseurl=None, mutual_auth=OPTIONAL):
+    def __init__(self, ssl_verify=None, baseurl=None, mutual_auth=OPTIONAL, **kwargs):
         """
         :param ssl_verify: flag indicating if server certificate in HTTPS requests should be verified
         :param baseurl: Jenkins' base URL
         :param mutual_auth: type of mutual authentication, use one of REQUIRED, OPTIONAL or DISABLED
                             from requests_kerberos package
+        :param kwargs: connection pool and session settings, see Requester
         """
-        args = {}
+        args = dict(kwargs)
         if ssl_verify:
             args["ssl_verify"] = ssl_verify
         if baseurl:
             args["baseurl"] = baseurl
         super(KrbRequester, self).__init__(**args)
         self.mutual_auth = mutual_auth
+        auth = ThreadLocalAuth(self._new_kerberos_auth)
+        self.krb_auth = SessionAuth(auth) if self.reuse_session else auth
 
-    def get_request_dict(self, url, params, data, headers):
-        req_dict = super(KrbRequester, self).get_request_dict(url=url, params=params,
-                                                              data=data, headers=headers)
+    def _new_kerberos_auth(self):
         if self.mutual_auth:
-            auth = HTTPKerberosAuth(self.mutual_auth)
-        else:
-            auth = HTTPKerberosAuth()
-        req_dict['auth'] = auth
+            return HTTPKerberosAuth(self.mutual_auth)
+        return HTTPKerberosAuth()
+
+    def get_request_dict(self, params=None, data=None, files=None, headers=None):
+        req_dict = super(KrbRequester, self).get_request_dict(params=params, data=data,
+                                                              files=files, headers=headers)
+        req_dict['auth'] = self.krb_auth
         return req_dict
+
@@ -0,0 +1,262 @@
+"""
+Client-side limits on the load put on a Jenkins master, used by Requester.
+
+A Limiter combines a token bucket, bounding the rate of requests, with an
+adaptive bound on the number of requests in flight. The bound grows by about
+one for every round trip without trouble and shrinks by a factor when the
+master shows signs of overload: 5xx or 429 answers, or latency well above
+what it usually is (AIMD, as in TCP congestion control). Fan-outs over a
+thread pool then settle at the concurrency the master sustains.
+
+Share one Limiter between everything talking to a master, see get_limiter:
+objects created from one Jenkins object share its Requester and thus its
+limiter, synchronous calls and those of jenkinsapi.aio alike.
+"""
+
+import time
+import logging
+import threading
+import urlparse
+
+from jenkinsapi.custom_exceptions import TimeOut
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket(object):
+    """
+    Allows rate requests per second on average, and bursts of up to burst
+    requests. Thread-safe.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.time, sleep=time.sleep):
+        """
+        :param rate: requests per second, float
+        :param burst: requests allowed at once after a quiet period, default rate, int
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self.waited = 0.0
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, sleeping until one is available.
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token even if it is not there yet, so that waiters
+            # are served in turn
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+            self.waited += delay
+        if delay:
+            self.sleep(delay)
+
+
+class AdaptiveConcurrency(object):
+    """
+    An AIMD bound on the number of requests in flight. Thread-safe.
+    """
+
+    # Weights of the newest latency in the short and long term averages
+    FAST_WEIGHT = 0.3
+    SLOW_WEIGHT = 0.02
+    # Requests seen before latency is trusted as a signal
+    WARMUP = 10
+
+    def __init__(self, initial=8, minimum=1, maximum=64, backoff=0.7, tolerance=2.0, latency_target=None,
+                 clock=time.time):
+        """
+        :param initial: requests allowed in flight at first, int
+        :param minimum: lower bound of the limit, int
+        :param maximum: upper bound of the limit, int
+        :param backoff: factor applied to the limit on overload, float
+        :param tolerance: overload is assumed when the recent latency exceeds the
+                          long term latency by this factor, float
+        :param latency_target: seconds of latency above which overload is assumed
+                               regardless of the history, float
+        """
+        assert 0 < backoff < 1, 'backoff must shrink the limit'
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.latency_target = latency_target
+        self.clock = clock
+        self.in_flight = 0
+        self.samples = 0
+        self.increases = 0
+        self.decreases = 0
+        self._fast = None
+        self._slow = None
+        self._last_decrease = None
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """
+        Wait until another request may be sent.
+
+        :param timeout: seconds after which TimeOut is raised, float
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    raise TimeOut('No request slot within %ss' % timeout)
+                self._cond.wait(remaining)
+            self.in_flight += 1
+
+    def release(self, latency, overloaded=False):
+        """
+        Record the outcome of a request and free its slot.
+
+        :param latency: seconds until the response arrived, float
+        :param overloaded: the master answered with an overload status, bool
+        """
+        with self._cond:
+            was_full = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self.samples += 1
+            congested = self._congested(latency)
+            if overloaded or congested:
+                self._decrease()
+            elif was_full and self.limit < self.maximum:
+                # About one more for every limit requests, i.e. every round trip
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                self.increases += 1
+            self._cond.notify_all()
+
+    def _congested(self, latency):
+        if self._fast is None:
+            self._fast = self._slow = latency
+        else:
+            self._fast += self.FAST_WEIGHT * (latency - self._fast)
+            self._slow += self.SLOW_WEIGHT * (latency - self._slow)
+        if self.latency_target is not None and self._fast > self.latency_target:
+            return True
+        return self.samples > self.WARMUP and self._fast > self.tolerance * self._slow
+
+    def _decrease(self):
+        now = self.clock()
+        # The requests in flight when overload begins all report it; shrink
+        # once per round trip rather than once for each of them
+        if self._last_decrease is not None and now - self._last_decrease < (self._fast or 0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.backoff)
+        self.decreases += 1
+        log.debug('Overload, allowing %i requests in flight', int(self.limit))
+
+
+class Limiter(object):
+    """
+    A token bucket and an adaptive concurrency bound for the requests sent to
+    one master.
+    """
+
+    def __init__(self, rate=None, burst=None, timeout=None, **kwargs):
+        """
+        :param rate: requests per second, float, default unlimited
+        :param burst: see TokenBucket
+        :param timeout: seconds to wait for a slot before TimeOut is raised, float
+        :param kwargs: settings of the AdaptiveConcurrency, e.g. maximum
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.concurrency = AdaptiveConcurrency(**kwargs)
+        self.timeout = timeout
+
+    @staticmethod
+    def is_overload(status_code):
+        return status_code == 429 or status_code >= 500
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Send a request within the limits and return its response.
+
+        The body of a streamed response (stream=True), e.g. an artifact or a
+        console, is still to be sent by the master when fn returns. It keeps
+        its slot until the response is closed, so such responses must be,
+        before the thread reading them sends another request.
+
+        :param fn: function sending the request, returning a response with a status_code
+        """
+        self.concurrency.acquire(self.timeout)
+        start = self.concurrency.clock()
+        overloaded = True
+        held = False
+        try:
+            if self.bucket is not None:
+                self.bucket.acquire()
+                start = self.concurrency.clock()
+            response = fn(*args, **kwargs)
+            overloaded = self.is_overload(response.status_code)
+            if kwargs.get('stream') and not overloaded:
+                self._release_on_close(response, self.concurrency.clock() - start)
+                held = True
+            return response
+        finally:
+            # Connection errors count as overload too
+            if not held:
+                self.concurrency.release(self.concurrency.clock() - start, overloaded)
+
+    def _release_on_close(self, response, latency):
+        """
+        Free the slot of a streamed response once it is closed. The time to
+        the headers counts as its latency; the body takes as long as it is.
+        """
+        close = response.close
+        lock = threading.Lock()
+        released = []
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                with lock:
+                    release = not released
+                    released.append(True)
+                if release:
+                    self.concurrency.release(latency)
+        response.close = close_and_release
+
+    def stats(self):
+        """
+        Return the state and counters of this limiter as a dict.
+        """
+        concurrency = self.concurrency
+        return {
+            'limit': int(concurrency.limit),
+            'in_flight': concurrency.in_flight,
+            'requests': concurrency.samples,
+            'increases': concurrency.increases,
+            'decreases': concurrency.decreases,
+            'throttled_seconds': self.bucket.waited if self.bucket else 0.0,
+        }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url, **kwargs):
+    """
+    Return the Limiter of the master at url, one per scheme, host and port in
+    the process. The settings only apply when the limiter is created.
+
+    :param kwargs: see Limiter
+    """
+    parts = urlparse.urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = Limiter(**kwargs)
+        return _limiters[key]
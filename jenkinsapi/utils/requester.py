@@ -2,10 +2,18 @@
 Module for jenkinsapi requester (which is a wrapper around python-requests)
 """
 
+import json
+import logging
 import requests
 import urlparse
+import threading
+from requests.adapters import HTTPAdapter
 from jenkinsapi.custom_exceptions import JenkinsAPIException
-# import logging
+from jenkinsapi.utils.retry import Hedger
+from jenkinsapi.utils.session_auth import SessionAuth
+from jenkinsapi.utils.single_flight import SingleFlight
+
+log = logging.getLogger(__name__)
 
 # # these two lines enable debugging at httplib level (requests->urllib3->httplib)
 # # you will see the REQUEST, including HEADERS and DATA, and RESPONSE with HEADERS but without DATA.
@@ -26,18 +34,99 @@ class Requester(object):
     A class which carries out HTTP requests. You can replace this class with one of your
     own implementation if you require some other way to access Jenkins.
 
-    This default class can handle simple authentication only.
+    This default class can handle simple authentication only. The password may
+    also be an API token of the user, which Jenkins checks more cheaply.
+
+    All requests go through a single requests.Session, so connections to the
+    Jenkins master are pooled and kept alive between calls. Objects which share
+    a Requester (e.g. everything created from one Jenkins object) share the pool.
     """
 
     VALID_STATUS_CODES = [200, ]
 
-    def __init__(self, username=None, password=None, ssl_verify=True, baseurl=None):
+    # Where Jenkins hands out the crumbs which protect it from CSRF
+    CRUMB_URL = 'crumbIssuer/api/json'
+
+    def __init__(self, username=None, password=None, ssl_verify=True, baseurl=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 max_retries=0, backoff_factor=0, keep_alive=True, cache=None, coalesce=True,
+                 limiter=None, retry=None, circuit_breaker=None, hedge_after=None, crumb=True,
+                 reuse_session=False):
+        """
+        :param pool_connections: number of per-host connection pools to cache, int
+        :param pool_maxsize: maximum number of connections kept open per host, int
+        :param pool_block: block instead of opening extra connections when a host's pool is full, bool
+        :param max_retries: number of times to retry failed connections, int
+        :param backoff_factor: exponential backoff factor applied between connection retries, float
+        :param keep_alive: reuse connections between requests, bool
+        :param cache: cache for API responses, a jenkinsapi.utils.response_cache.ResponseCache
+        :param coalesce: let concurrent identical API polls share one request, see
+                         jenkinsapi.utils.single_flight, bool
+        :param limiter: bounds the rate and concurrency of requests, usually the one
+                        shared by all requesters of the master, see
+                        jenkinsapi.utils.limiter.get_limiter
+        :param retry: retries requests which failed for transient reasons,
+                      a jenkinsapi.utils.retry.RetryPolicy
+        :param circuit_breaker: fails requests at once while Jenkins is down,
+                                a jenkinsapi.utils.retry.CircuitBreaker
+        :param hedge_after: send a second copy of a GET not answered within
+                            this many seconds, see jenkinsapi.utils.retry.Hedger, float
+        :param crumb: send the CSRF crumb of Jenkins with POSTs, when it issues
+                      them; needs baseurl, bool
+        :param reuse_session: authenticate only until Jenkins opens a web session,
+                              then send its cookie instead of the credentials, see
+                              jenkinsapi.utils.session_auth, bool
+        """
         if username:
             assert password, 'Cannot set a username without a password!'
 
         self.base_scheme = baseurl and urlparse.urlsplit(baseurl).scheme
+        self.baseurl = baseurl
         self.auth = (username, password) if (username and password) else None
+        self.reuse_session = reuse_session
+        self.session_auth = SessionAuth(self.auth) if (reuse_session and self.auth) else None
         self.ssl_verify = ssl_verify
+        self.keep_alive = keep_alive
+        self.cache = cache
+        # Polls are only shared between callers with the same credentials,
+        # i.e. those of this requester
+        self.single_flight = SingleFlight() if coalesce else None
+        self.limiter = limiter
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.hedger = Hedger(hedge_after) if hedge_after else None
+        self.use_crumb = crumb and bool(baseurl)
+        # None until asked for, then the header carrying the crumb, empty if
+        # Jenkins does not issue crumbs
+        self._crumb = None
+        self._crumb_lock = threading.Lock()
+        self.session = self._make_session(pool_connections, pool_maxsize, pool_block,
+                                          max_retries, backoff_factor)
+
+    def _make_session(self, pool_connections, pool_maxsize, pool_block, max_retries, backoff_factor):
+        """
+        Build the pooled session used for every request made by this requester.
+        """
+        if backoff_factor:
+            from requests.packages.urllib3.util.retry import Retry
+            max_retries = Retry(total=max_retries, backoff_factor=backoff_factor)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              pool_block=pool_block, max_retries=max_retries)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self):
+        """
+        Close the pooled connections of this requester and stop the threads
+        of its hedger. Requests made afterwards open new connections.
+        """
+        self.session.close()
+        if self.hedger is not None:
+            self.hedger.shutdown()
 
     # FIXME This was created because the unit tests hit properties of the Requester
     @property
@@ -61,7 +150,7 @@ class Requester(object):
             for key, value in [('params', params), ('headers', headers), ('files', files), ('data', data)]
             if value is not None
         ]
-        unfiltered_args = [('auth', self.auth), ('verify', self.ssl_verify)]
+        unfiltered_args = [('auth', self.session_auth or self.auth), ('verify', self.ssl_verify)]
 
         return dict(filtered_args + unfiltered_args)
 
@@ -82,13 +171,170 @@ class Requester(object):
             )
         return url
 
-    def get_url(self, url, params=None, headers=None):
+    def get_url(self, url, params=None, headers=None, stream=False):
+        """
+        :param stream: defer downloading the body until it is read through
+                       response.iter_content or response.raw, bool
+        """
+        url = self._update_url_scheme(url)
+        if stream or self.cache is None or not self.cache.is_cacheable(url):
+            requestKwargs = self.get_request_dict(params=params, headers=headers)
+            if stream:
+                requestKwargs['stream'] = True
+            return self._send('GET', self.session.get, url, **requestKwargs)
+
+        def do_get(request_headers):
+            requestKwargs = self.get_request_dict(params=params, headers=request_headers)
+            return self._send('GET', self.session.get, url, **requestKwargs)
+        return self.cache.fetch(url, params, headers, do_get)
+
+    def head_url(self, url, params=None, headers=None):
+        """
+        Ask for the headers Jenkins would answer a GET of url with.
+        """
+        url = self._update_url_scheme(url)
         requestKwargs = self.get_request_dict(params=params, headers=headers)
-        return requests.get(self._update_url_scheme(url), **requestKwargs)
+        return self._send('HEAD', self.session.head, url, **requestKwargs)
+
+    def _send(self, method, send, url, **kwargs):
+        """
+        Send a request through the retry policy, the circuit breaker, the
+        hedger and the limiter, those which are set.
+
+        :param send: method of the session, e.g. self.session.get
+        """
+        def limited():
+            if self.limiter is None:
+                return send(url, **kwargs)
+            return self.limiter.call(send, url, **kwargs)
+
+        def attempt():
+            if self.hedger is not None and method == 'GET' and not kwargs.get('stream'):
+                return self.hedger.call(limited)
+            return limited()
+
+        def guarded():
+            if self.circuit_breaker is None:
+                return attempt()
+            return self.circuit_breaker.call(attempt)
+
+        if self.retry is None:
+            return guarded()
+        return self.retry.call(method, guarded)
 
     def post_url(self, url, params=None, data=None, files=None, headers=None):
+        url = self._update_url_scheme(url)
+        if not self.use_crumb:
+            response = self._post(url, params, data, files, headers)
+        else:
+            crumb = self.get_crumb()
+            crumbed = dict(headers or {})
+            crumbed.update(crumb)
+            positions = self._file_positions(files)
+            response = self._post(url, params, data, files, crumbed)
+            # The crumb expired with the web session, or Jenkins started to
+            # ask for crumbs. Files can only be sent again from where they
+            # were, or they would arrive empty.
+            if self._is_crumb_error(response) and positions is not None:
+                log.info('Jenkins refused the crumb for %s, fetching a new one', url)
+                response.close()
+                for fileobj, position in positions:
+                    fileobj.seek(position)
+                crumbed = dict(headers or {})
+                crumbed.update(self.get_crumb(refused=crumb))
+                response = self._post(url, params, data, files, crumbed)
+        self.invalidate(self._parent_url(url))
+        return response
+
+    @staticmethod
+    def _parent_url(url):
+        """
+        Return the URL of the resource an action URL belongs to, e.g.
+        http://jenkins/job/foo/ for http://jenkins/job/foo/build?delay=0sec
+        """
+        parts = urlparse.urlsplit(url)
+        path = parts.path.rstrip('/').rsplit('/', 1)[0] + '/'
+        return urlparse.urlunsplit((parts.scheme, parts.netloc, path, '', ''))
+
+    @staticmethod
+    def _file_positions(files):
+        """
+        Return the file objects among the values of files, as in
+        requests.post, with their current positions, as a list of pairs, or
+        None if one of them cannot be rewound.
+        """
+        positions = []
+        values = files.values() if isinstance(files, dict) else files or []
+        for value in values:
+            if isinstance(value, (list, tuple)):
+                # (name, file) or a (field, (name, file...)) pair
+                value = value[1]
+                if isinstance(value, (list, tuple)):
+                    value = value[1]
+            if isinstance(value, basestring):
+                continue
+            try:
+                positions.append((value, value.tell()))
+            except (AttributeError, IOError):
+                return None
+        return positions
+
+    def _post(self, url, params, data, files, headers):
         requestKwargs = self.get_request_dict(params=params, data=data, files=files, headers=headers)
-        return requests.post(self._update_url_scheme(url), **requestKwargs)
+        return self._send('POST', self.session.post, url, **requestKwargs)
+
+    def get_crumb(self, refused=None):
+        """
+        Return the header which carries the CSRF crumb, as a dict, empty if
+        Jenkins does not issue crumbs. The crumb is fetched once and kept
+        until Jenkins refuses it; it belongs to the web session, whose cookie
+        the session of this requester keeps.
+
+        :param refused: the header Jenkins refused, as returned before; a new
+                        crumb is fetched unless another thread already did, dict
+        """
+        with self._crumb_lock:
+            if self._crumb is None or (refused is not None and self._crumb == refused):
+                self._crumb = self._fetch_crumb()
+            return self._crumb
+
+    def _fetch_crumb(self):
+        """
+        Return the crumb header, {} if Jenkins issues none or it could not be
+        fetched: a POST refused for its crumb fetches it again, no other does.
+        """
+        url = self._update_url_scheme(urlparse.urljoin(self.baseurl.rstrip('/') + '/', self.CRUMB_URL))
+        # Not through get_url: a cached crumb is no use after a refusal
+        response = self._send('GET', self.session.get, url, **self.get_request_dict())
+        if response.status_code == 404:
+            # CSRF protection is disabled
+            return {}
+        if response.status_code != 200:
+            log.warning('Could not fetch a crumb from %s, status=%i', url, response.status_code)
+            return {}
+        try:
+            crumb = json.loads(response.content)
+            return {crumb['crumbRequestField']: crumb['crumb']}
+        except (ValueError, KeyError, TypeError):
+            # e.g. the login page of a proxy
+            log.warning('No crumb in the answer of %s', url)
+            return {}
+
+    @staticmethod
+    def _is_crumb_error(response):
+        return response.status_code == 403 and 'crumb' in (response.text or '').lower()
+
+    def invalidate(self, url=None):
+        """
+        Forget cached responses for the resource at url, and the resources
+        above and below it. Call this after a request which changed state on
+        the server; POSTs do it automatically.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(url and self._update_url_scheme(url))
+        if self.single_flight is not None:
+            # Polls which started before the change must not answer later ones
+            self.single_flight.forget()
 
     def post_xml_and_confirm_status(self, url, params=None, data=None, valid=None):
         headers = {'Content-Type': 'text/xml'}
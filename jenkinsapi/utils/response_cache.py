@@ -0,0 +1,195 @@
+"""
+A cache for the responses of the Jenkins API, used by Requester.
+
+Entries are keyed by URL plus query parameters (so tree and depth selections
+are cached separately), expire after a per-resource time-to-live and are
+evicted least-recently-used first once the cache grows past its memory cap.
+Expired entries which carry an ETag or Last-Modified header are revalidated
+with a conditional GET instead of being fetched again.
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from jenkinsapi import config
+
+
+class CacheEntry(object):
+    """
+    A cached response and its expiry time.
+    """
+
+    def __init__(self, response, expires):
+        self.response = response
+        self.expires = expires
+        self.size = len(response.content or '')
+
+    def is_fresh(self):
+        return time.time() < self.expires
+
+    def validators(self):
+        """
+        Headers which turn a GET for this entry into a conditional GET.
+        """
+        headers = {}
+        etag = self.response.headers.get('ETag')
+        if etag:
+            headers['If-None-Match'] = etag
+        last_modified = self.response.headers.get('Last-Modified')
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """
+    Thread-safe TTL and LRU cache of Jenkins API responses.
+
+    Only URLs of the Jenkins API (see config.JENKINS_API) are cached: consoles,
+    artifacts and config.xml always go to the server.
+    """
+
+    # Resources whose state changes quickly get a short life. The first pattern
+    # matching the URL wins, otherwise default_ttl applies.
+    DEFAULT_TTLS = [
+        (r'/queue/', 1),
+        (r'/computer/', 5),
+    ]
+
+    def __init__(self, default_ttl=5, ttls=None, max_bytes=64 * 1024 * 1024):
+        """
+        :param default_ttl: seconds a response stays fresh, float
+        :param ttls: list of (regular expression, seconds) pairs overriding default_ttl
+                     for matching URLs
+        :param max_bytes: upper bound for the total size of cached response bodies, int
+        """
+        self.default_ttl = default_ttl
+        if ttls is None:
+            ttls = self.DEFAULT_TTLS
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def is_cacheable(url):
+        return config.JENKINS_API in url
+
+    @staticmethod
+    def make_key(url, params=None, headers=None):
+        return (url,
+                tuple(sorted((params or {}).items())),
+                tuple(sorted((headers or {}).items())))
+
+    def ttl_for(self, url):
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key):
+        """
+        Return the entry for a key, fresh or not, or None.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                # Re-insert to mark it as most recently used
+                self._entries[key] = entry
+            return entry
+
+    def store(self, key, response):
+        url = key[0]
+        entry = CacheEntry(response, time.time() + self.ttl_for(url))
+        with self._lock:
+            self._discard(key)
+            if entry.size > self.max_bytes:
+                return entry
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+        return entry
+
+    def refresh(self, key, entry):
+        """
+        Extend the life of an entry which the server confirmed to be current.
+        """
+        with self._lock:
+            entry.expires = time.time() + self.ttl_for(key[0])
+            self.revalidations += 1
+
+    def fetch(self, url, params, headers, do_get):
+        """
+        Answer a GET from the cache when possible.
+
+        :param do_get: callable performing the GET, receives the headers to send
+        :return: a response object
+        """
+        key = self.make_key(url, params, headers)
+        entry = self.get(key)
+        if entry is not None and entry.is_fresh():
+            with self._lock:
+                self.hits += 1
+            return entry.response
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.validators())
+        response = do_get(request_headers or None)
+        if entry is not None and response.status_code == 304:
+            self.refresh(key, entry)
+            return entry.response
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200:
+            self.store(key, response)
+        return response
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def invalidate(self, url=None):
+        """
+        Drop entries affected by a change to the resource at url: the resource
+        itself, everything below it and the resources containing it. Without
+        a url the whole cache is emptied.
+        """
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                self.size = 0
+                return
+            for key in list(self._entries):
+                resource_url = key[0].split(config.JENKINS_API)[0]
+                if resource_url.startswith(url) or url.startswith(resource_url):
+                    self._discard(key)
+
+    def stats(self):
+        """
+        Return the counters of this cache as a dict.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.size,
+            }
+
+    def __len__(self):
+        return len(self._entries)
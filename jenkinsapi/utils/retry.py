@@ -0,0 +1,376 @@
+"""
+Policies for riding out an unreliable master, used by Requester.
+
+- RetryPolicy retries idempotent requests which failed with a connection
+  error or a transient status, with exponential backoff, honouring the
+  Retry-After header of the master.
+- CircuitBreaker fails requests at once while the master is down, instead of
+  letting every caller wait for its own timeouts, and lets a single request
+  through now and then to find out whether it is back.
+- Hedger sends a duplicate of a GET which is slow to answer and takes the
+  first answer, so that a request stuck on a dead connection does not also
+  cost a retry.
+"""
+
+import sys
+import time
+import logging
+import threading
+import email.utils
+
+import requests
+
+from jenkinsapi.custom_exceptions import CircuitOpen
+from jenkinsapi.utils.executor import Executor
+from jenkinsapi.utils.wait import Backoff
+
+log = logging.getLogger(__name__)
+
+# Exceptions of requests after which a request may be sent again
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class RetryPolicy(object):
+    """
+    How often, and after how long, requests are retried.
+    """
+
+    # Statuses of a master which is restarting, overloaded or behind a
+    # struggling proxy
+    TRANSIENT_STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, retries=3, initial=0.5, maximum=30, factor=2, statuses=None, methods=('GET',)):
+        """
+        :param retries: number of retries after the first attempt, int
+        :param initial: first delay in seconds, float
+        :param maximum: upper bound for a delay in seconds, also for those
+                        asked for with Retry-After, float
+        :param factor: growth of the delay after each retry, float
+        :param statuses: statuses worth a retry, default TRANSIENT_STATUSES
+        :param methods: HTTP methods which are safe to send again
+        """
+        self.retries = retries
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.statuses = frozenset(self.TRANSIENT_STATUSES if statuses is None else statuses)
+        self.methods = frozenset(methods)
+        self.retried = 0
+
+    def backoff(self):
+        """
+        Return the delays of the retries of one request, a fresh Backoff.
+        """
+        return Backoff(initial=self.initial, maximum=self.maximum, factor=self.factor)
+
+    def should_retry(self, method, response=None, error=None):
+        if method not in self.methods:
+            return False
+        if error is not None:
+            return isinstance(error, TRANSIENT_ERRORS)
+        return response.status_code in self.statuses
+
+    def delay(self, backoff, response=None):
+        """
+        Seconds to wait before the next attempt: what the master asked for
+        with Retry-After, if anything, or the next delay of backoff.
+        """
+        retry_after = self.retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.maximum)
+        return backoff.next()
+
+    @staticmethod
+    def retry_after(response):
+        """
+        Return the seconds asked for by the Retry-After header of a response,
+        given in seconds or as an HTTP date, or None.
+        """
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        parsed = email.utils.parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+
+    def call(self, method, send, sleep=time.sleep):
+        """
+        Call send until it returns a response which needs no retry, or the
+        retries are used up. Returns the last response, or raises the last
+        error.
+
+        :param method: HTTP method of the request, str
+        :param send: function without arguments sending the request
+        """
+        backoff = self.backoff()
+        for attempt in xrange(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = send()
+            except Exception as error:
+                if last or not self.should_retry(method, error=error):
+                    raise
+                delay = self.delay(backoff)
+                log.warning('%s failed (%s), retrying in %.1fs', method, error, delay)
+            else:
+                if last or not self.should_retry(method, response=response):
+                    return response
+                delay = self.delay(backoff, response)
+                log.warning('%s %s answered %i, retrying in %.1fs',
+                            method, response.url, response.status_code, delay)
+                response.close()
+            self.retried += 1
+            sleep(delay)
+
+
+class CircuitBreaker(object):
+    """
+    Opens after a number of consecutive failures, failing requests with
+    CircuitOpen until reset_timeout has passed. Then a single trial request
+    goes through: if it succeeds the circuit closes, otherwise it opens again.
+    Thread-safe.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failures=5, reset_timeout=30, clock=time.time):
+        """
+        :param failures: consecutive failures which open the circuit, int
+        :param reset_timeout: seconds before a trial request is let through, float
+        """
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    # Statuses of a master which is down or unreachable, unlike 500 which
+    # usually answers a bad request
+    FAILURE_STATUSES = (502, 503, 504)
+
+    @classmethod
+    def is_failure(cls, response):
+        return response.status_code in cls.FAILURE_STATUSES
+
+    def before(self):
+        """
+        Call before sending a request; raises CircuitOpen if it must not be sent.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                # Let this request find out whether the master is back
+                self.state = self.HALF_OPEN
+                return
+            self.rejected += 1
+            raise CircuitOpen('Jenkins failed %i requests in a row, not sending more for %ss' %
+                              (self.consecutive_failures, self.reset_timeout))
+
+    def record(self, failed):
+        """
+        Record the outcome of a request let through by before.
+        """
+        with self._lock:
+            if not failed:
+                if self.state != self.CLOSED:
+                    log.info('Jenkins answers again, closing the circuit')
+                self.state = self.CLOSED
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failures:
+                if self.state != self.OPEN:
+                    log.warning('Jenkins failed %i requests in a row, opening the circuit',
+                                self.consecutive_failures)
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+    def abandon(self):
+        """
+        Record that a request let through by before ended without an outcome.
+        An abandoned trial request leaves the next one to find out.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def call(self, send):
+        """
+        Send a request through the breaker and return its response.
+        """
+        self.before()
+        try:
+            response = send()
+        except TRANSIENT_ERRORS:
+            self.record(True)
+            raise
+        except Exception:
+            # Not the master's fault, e.g. a bad URL
+            self.record(False)
+            raise
+        except BaseException:
+            # Interrupted, which tells nothing about the master
+            self.abandon()
+            raise
+        self.record(self.is_failure(response))
+        return response
+
+
+class Hedger(object):
+    """
+    Sends a second copy of a request which has not been answered within
+    delay seconds, in case the first one is stuck, e.g. on a dead connection
+    or a lost packet, and returns whichever answers first. Only for requests
+    which are safe to duplicate, i.e. GETs.
+
+    Both attempts are sent on a small pool of threads, and only while one of
+    its threads is free: a request which finds none is sent on the caller's
+    thread, unhedged, so that a busy pool neither delays requests nor adds
+    copies to the load. The delay runs from when the first attempt is sent.
+    """
+
+    def __init__(self, delay, max_workers=8):
+        """
+        :param delay: seconds to wait for an answer before hedging, e.g. the
+                      95th percentile of the latency of the master, float
+        :param max_workers: maximum number of attempts in flight, int
+        """
+        self.delay = delay
+        self.hedged = 0
+        self.wins = 0
+        self.skipped = 0
+        self._slots = threading.Semaphore(max_workers)
+        self._executor = Executor(max_workers, name='hedge')
+
+    def call(self, send):
+        race = _Race()
+        if not self._start(race, send):
+            self.skipped += 1
+            return send()
+        try:
+            with race.condition:
+                while race.sent_at is None and not race.decided():
+                    race.condition.wait()
+                deadline = race.sent_at + self.delay if race.sent_at is not None else None
+                while not race.decided() and deadline is not None and time.time() < deadline:
+                    race.condition.wait(deadline - time.time())
+                hedge = not race.decided()
+            if hedge and self._start(race, send):
+                self.hedged += 1
+            with race.condition:
+                while not race.decided():
+                    race.condition.wait()
+                winner = race.finish()
+        except BaseException:
+            with race.condition:
+                race.abandon()
+            raise
+        if winner > 0:
+            self.wins += 1
+        response, error = race.outcomes[winner]
+        if error is not None:
+            raise error[0], error[1], error[2]
+        return response
+
+    def _start(self, race, send):
+        """
+        Send another attempt of the race if a thread is free for it.
+        """
+        if not self._slots.acquire(False):
+            return False
+        with race.condition:
+            race.outcomes.append(None)
+            attempt = len(race.outcomes) - 1
+        try:
+            self._executor.submit(self._attempt, race, attempt, send)
+        except RuntimeError:
+            # Shut down
+            with race.condition:
+                race.outcomes.pop()
+            self._slots.release()
+            return False
+        return True
+
+    def _attempt(self, race, attempt, send):
+        try:
+            with race.condition:
+                if race.sent_at is None:
+                    race.sent_at = time.time()
+                    race.condition.notify_all()
+            try:
+                outcome = send(), None
+            except BaseException:
+                outcome = None, sys.exc_info()
+            with race.condition:
+                race.outcomes[attempt] = outcome
+                late = race.winner is not None
+                race.condition.notify_all()
+            if late:
+                _close(outcome[0])
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class _Race(object):
+    """
+    The attempts of one hedged request, guarded by condition. An outcome is
+    None while its attempt is under way, then a (response, exc_info) pair.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.outcomes = []
+        self.sent_at = None
+        self.winner = None
+
+    @staticmethod
+    def succeeded(outcome):
+        return outcome is not None and outcome[1] is None and not CircuitBreaker.is_failure(outcome[0])
+
+    def decided(self):
+        """
+        True once an attempt succeeded or all of them are over.
+        """
+        return (any(self.succeeded(outcome) for outcome in self.outcomes) or
+                None not in self.outcomes)
+
+    def finish(self):
+        """
+        Pick the winning attempt: the first to succeed or, if none did, the
+        first one. Closes the responses of the others which are in; those
+        still under way are closed when they come in. Returns its index.
+        """
+        winners = [i for i, outcome in enumerate(self.outcomes) if self.succeeded(outcome)]
+        self.winner = winners[0] if winners else 0
+        self._close_others()
+        return self.winner
+
+    def abandon(self):
+        """
+        Close every response, the caller was interrupted.
+        """
+        self.winner = -1
+        self._close_others()
+
+    def _close_others(self):
+        for i, outcome in enumerate(self.outcomes):
+            if i != self.winner and outcome is not None:
+                _close(outcome[0])
+
+
+def _close(response):
+    if response is not None:
+        response.close()
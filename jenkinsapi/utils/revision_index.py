@@ -0,0 +1,85 @@
+"""
+A persistent index of the revisions built by the builds of jobs, used by
+Job.get_buildnumber_for_revision. See jenkinsapi.utils.build_index.
+"""
+
+import logging
+
+from jenkinsapi import config
+from jenkinsapi.build import Build
+from jenkinsapi.utils import sqlite_store
+from jenkinsapi.utils.build_index import BuildIndex
+
+log = logging.getLogger(__name__)
+
+
+class RevisionIndex(BuildIndex):
+    """
+    Maps the revisions of jobs to the numbers of the builds which built them.
+    """
+
+    JOBS_TABLE = 'revision_jobs'
+    ROWS_TABLE = 'revisions'
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS revisions (
+        url TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        revision TEXT,
+        PRIMARY KEY (url, number)
+    );
+    CREATE INDEX IF NOT EXISTS revisions_revision ON revisions (url, revision);
+    """
+    FIELDS = Build.TREES['revision']
+    # Tables of the first layout of the index, before BuildIndex
+    LEGACY_JOBS_TABLE = 'jobs'
+    LEGACY_ROWS_TABLE = 'builds'
+
+    def migrate(self):
+        tables = set(row[0] for row in self._db.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        if self.LEGACY_JOBS_TABLE not in tables or self.LEGACY_ROWS_TABLE not in tables:
+            return
+        columns = set(row[1] for row in self._db.execute('PRAGMA table_info(%s)' % self.LEGACY_ROWS_TABLE))
+        if 'revision' not in columns:
+            # Someone else's tables
+            return
+        log.info('Moving the revision index in %s to its current tables', self.path)
+        self._db.execute('INSERT OR IGNORE INTO revisions (url, number, revision) '
+                         'SELECT url, number, revision FROM %s' % self.LEGACY_ROWS_TABLE)
+        self._db.execute('INSERT OR IGNORE INTO revision_jobs (url, last_number) '
+                         'SELECT url, last_number FROM %s' % self.LEGACY_JOBS_TABLE)
+        self._db.execute('DROP TABLE %s' % self.LEGACY_ROWS_TABLE)
+        self._db.execute('DROP TABLE %s' % self.LEGACY_JOBS_TABLE)
+
+    def rows_for(self, job_url, build):
+        revision = build.get_revision()
+        return [(job_url, build.number, None if revision is None else unicode(revision))]
+
+    def store(self, job_url, rows):
+        self._db.executemany('INSERT OR REPLACE INTO revisions (url, number, revision) VALUES (?, ?, ?)', rows)
+
+    def lookup(self, job_url, revision, prefix=False):
+        """
+        Return the numbers of the builds of a job which built revision, newest first.
+
+        :param revision: revision, or with prefix the start of one, str or int
+        :param prefix: match revisions starting with revision, e.g. abbreviated git SHAs, bool
+        """
+        revision = unicode(revision)
+        if prefix and revision:
+            revision = revision.lower()
+            # Everything starting with revision sorts between these bounds
+            upper = revision[:-1] + unichr(ord(revision[-1]) + 1)
+            query = ('SELECT number FROM revisions WHERE url = ? AND revision >= ? AND revision < ? '
+                     'ORDER BY number DESC')
+            args = (job_url, revision, upper)
+        else:
+            query = 'SELECT number FROM revisions WHERE url = ? AND revision = ? ORDER BY number DESC'
+            args = (job_url, revision)
+        return [row[0] for row in self._query(query, args)]
+
+
+def get_default_index():
+    """
+    The index shared by all jobs, stored in config.REVISION_INDEX.
+    """
+    return sqlite_store.get_shared(RevisionIndex, config.REVISION_INDEX)
@@ -0,0 +1,148 @@
+"""
+Authentication through the web session of Jenkins, used by Requester.
+
+Jenkins verifies the credentials sent with a request every time: a password
+hash for basic authentication, a full SPNEGO exchange for Kerberos. Once a
+request has authenticated, the JSESSIONID cookie Jenkins sets identifies the
+user just as well, for nothing. SessionAuth sends the credentials only while
+there is no session, and sends a request again with them when Jenkins turns
+out to have dropped the session, so that callers do not notice.
+
+ThreadLocalAuth gives each thread its own instance of an authentication
+which, like HTTPKerberosAuth, keeps the state of a negotiation on itself.
+"""
+
+import logging
+import threading
+
+from requests.auth import AuthBase, HTTPBasicAuth
+from requests.hooks import dispatch_hook
+
+log = logging.getLogger(__name__)
+
+SESSION_COOKIE = 'JSESSIONID'
+
+
+class SessionAuth(AuthBase):
+    """
+    A requests authentication which wraps another, e.g. HTTPBasicAuth or
+    HTTPKerberosAuth, and skips it while the session holds a JSESSIONID
+    cookie.
+    """
+
+    # Statuses of a request Jenkins did not recognize the session of
+    DENIED_STATUSES = (401, 403)
+    # Methods which may run twice: a POST Jenkins answered has done its work
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, auth):
+        """
+        :param auth: the authentication to use when there is no session, a
+                     requests auth object or a (username, password) tuple
+        """
+        if isinstance(auth, tuple):
+            auth = HTTPBasicAuth(*auth)
+        self.auth = auth
+        self.authenticated = 0
+        self.reused = 0
+        self.renewed = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        if SESSION_COOKIE not in request.headers.get('Cookie', ''):
+            self._count('authenticated')
+            return self.auth(request)
+        self._count('reused')
+        request.register_hook('response', self._handle_response)
+        return request
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _session_dropped(response):
+        """
+        True if Jenkins did not take the request as the session's user and
+        it may be sent again: Jenkins refused it, or started a new session
+        for an idempotent request. A refused CSRF crumb is left to Requester.
+        """
+        if response.status_code in SessionAuth.DENIED_STATUSES:
+            return 'crumb' not in (response.text or '').lower()
+        if response.request.method not in SessionAuth.IDEMPOTENT_METHODS:
+            return False
+        return SESSION_COOKIE in response.headers.get('Set-Cookie', '')
+
+    @staticmethod
+    def _can_resend(request):
+        """
+        True if the body of request can be sent again: not a stream, which
+        was read by the first attempt, nor the upload of files.
+        """
+        if request.body is not None and not isinstance(request.body, basestring):
+            return False
+        return not request.headers.get('Content-Type', '').startswith('multipart/form-data')
+
+    def _handle_response(self, response, **kwargs):
+        if not self._session_dropped(response):
+            return response
+        if not self._can_resend(response.request):
+            log.warning('Jenkins dropped the session, not sending the body of %s again', response.url)
+            return response
+        log.debug('Jenkins dropped the session, authenticating %s again', response.url)
+        self._count('renewed')
+        self._count('authenticated')
+        # Release the connection for the next attempt
+        response.close()
+        request = response.request.copy()
+        # The cookie of the dropped session must not win over the credentials
+        del request.headers['Cookie']
+        request.hooks = {'response': []}
+        request = self.auth(request)
+        retry = response.connection.send(request, **kwargs)
+        retry.history.append(response)
+        retry.request = request
+        # Auths which negotiate, like Kerberos, answer the challenge in a hook
+        return dispatch_hook('response', request.hooks, retry, **kwargs)
+
+    def stats(self):
+        """
+        Return the counters of this authentication as a dict: requests which
+        carried the credentials, requests which relied on the session, and
+        sessions Jenkins dropped.
+        """
+        with self._lock:
+            return {
+                'authenticated': self.authenticated,
+                'reused': self.reused,
+                'renewed': self.renewed,
+            }
+
+
+class ThreadLocalAuth(AuthBase):
+    """
+    A requests authentication which hands each request to an authentication
+    of its thread, created by factory. HTTPKerberosAuth keeps the GSS
+    context of a negotiation on the instance, so concurrent requests must
+    not share one.
+    """
+
+    def __init__(self, factory):
+        """
+        :param factory: function without arguments returning a new
+                        requests auth object
+        """
+        self.factory = factory
+        self._local = threading.local()
+
+    def get(self):
+        """
+        Return the authentication of the current thread.
+        """
+        auth = getattr(self._local, 'auth', None)
+        if auth is None:
+            auth = self._local.auth = self.factory()
+        return auth
+
+    def __call__(self, request):
+        return self.get()(request)
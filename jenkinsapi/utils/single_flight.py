@@ -0,0 +1,90 @@
+"""
+Coalescing of identical concurrent calls, used by JenkinsBase.get_data.
+
+When many threads poll the same resource at once, e.g. the builds of one job
+each polling their parent, only the first GET goes to Jenkins. The others wait
+for it and share its parsed result, which callers must therefore treat as
+read-only.
+"""
+
+import sys
+import threading
+
+
+class _Call(object):
+    """
+    A call in flight and the callers waiting for it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time. Callers asking for a key while
+    its call is in flight get the result, or the exception, of that call.
+    Thread-safe.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, fn):
+        """
+        Return fn(), or the result of the call for key already in flight.
+
+        :param key: hashable identity of the call, e.g. URL and parameters
+        :param fn: function without arguments
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.exc_info is not None:
+                raise call.exc_info[0], call.exc_info[1], call.exc_info[2]
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException:
+            # Even KeyboardInterrupt or SystemExit, or the waiters would take
+            # None for the result
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is call:
+                    del self._in_flight[key]
+            call.done.set()
+        return call.result
+
+    def forget(self):
+        """
+        Let later callers start new calls rather than join those in flight,
+        e.g. after a request which changed state on the server.
+        """
+        with self._lock:
+            self._in_flight.clear()
+
+    def stats(self):
+        """
+        Return the counters of this group as a dict: calls made and calls
+        answered by joining another.
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._in_flight),
+            }
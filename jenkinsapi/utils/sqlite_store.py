@@ -0,0 +1,43 @@
+"""
+SQLite databases holding the local state of jenkinsapi, such as the indexes
+of builds (see BuildIndex) and the digests of local files (see DigestCache).
+"""
+
+import os
+import sqlite3
+import threading
+
+MEMORY = ':memory:'
+
+
+def connect(path=MEMORY):
+    """
+    Open the database in path, creating its directory if needed. The
+    connection may be used from any thread, callers serialize its use.
+
+    :param path: file of the database, MEMORY for one which lives as long as
+                 the connection, str
+    """
+    if path != MEMORY:
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    return sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared(cls, path):
+    """
+    Return the instance of cls stored in path, one per process.
+
+    :param cls: class taking the path of its database
+    :param path: file of the database, None to keep it in memory, str
+    """
+    path = os.path.expanduser(path) if path else MEMORY
+    with _shared_lock:
+        if (cls, path) not in _shared:
+            _shared[(cls, path)] = cls(path)
+        return _shared[(cls, path)]
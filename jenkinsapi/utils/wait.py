@@ -0,0 +1,371 @@
+"""
+A scheduler which waits for many builds and jobs from a single thread.
+
+Instead of polling every object in its own loop, the scheduler checks all of
+them in rounds: the builds of a job are checked with one small tree query on
+the job, the jobs of a Jenkins server with one query on the server. Between
+rounds it sleeps following an exponential backoff with jitter, which starts
+over whenever something changed, and it fails every target whose deadline
+has passed with TimeOut.
+
+    scheduler = WaitScheduler()
+    futures = [scheduler.add_build(build, timeout=3600) for build in builds]
+    scheduler.run(futures)
+    results = [future.result() for future in futures]
+"""
+
+import sys
+import time
+import random
+import logging
+import threading
+from collections import defaultdict
+
+from jenkinsapi.utils.executor import Future
+from jenkinsapi.custom_exceptions import NotFound, TimeOut
+
+log = logging.getLogger(__name__)
+
+
+class Backoff(object):
+    """
+    Delays growing exponentially from initial to maximum, randomized by jitter
+    so that many clients do not poll in lockstep.
+    """
+
+    def __init__(self, initial=1, maximum=30, factor=2, jitter=0.2):
+        """
+        :param initial: first delay in seconds, float
+        :param maximum: upper bound for the delay in seconds, float
+        :param factor: growth of the delay after each wait, float
+        :param jitter: relative amount of randomization, 0.2 is +/- 20%, float
+        """
+        assert 0 < initial <= maximum, 'Expected 0 < initial <= maximum'
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.current = initial
+
+    @classmethod
+    def up_to(cls, interval):
+        """
+        A backoff which starts at one second, or less, and grows to interval.
+        Intervals below 0.1s are raised to it, so that a zero delay does not spin.
+        """
+        interval = max(interval, 0.1)
+        return cls(initial=min(1, interval), maximum=interval)
+
+    def reset(self):
+        self.current = self.initial
+
+    def next(self):
+        """
+        Return the delay to wait now, and grow the next one.
+        """
+        delay = self.current
+        self.current = min(self.current * self.factor, self.maximum)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class _Target(object):
+
+    def __init__(self, obj, deadline):
+        self.obj = obj
+        self.deadline = deadline
+        self.future = Future()
+
+    def fail(self, exc):
+        try:
+            raise exc
+        except type(exc):
+            self.future.set_exception(sys.exc_info())
+
+
+class WaitScheduler(object):
+    """
+    Waits for builds to complete, jobs to become idle and arbitrary conditions
+    to become true. Each add_* method returns a Future for the outcome.
+    """
+
+    # number, building and result of the newest builds of a job
+    BUILDS_TREE = 'nextBuildNumber,%s[number,building,result]{0,%i}'
+    BUILD_TREE = 'building,result'
+    JOBS_TREE = 'jobs[name,color,inQueue]'
+    JOB_TREE = 'color,inQueue'
+    MIN_BUILDS_WINDOW = 10
+
+    def __init__(self, backoff=None, clock=time.time):
+        """
+        :param backoff: Backoff between rounds of checks, default Backoff()
+        :param clock: function returning the current time in seconds
+        """
+        self.backoff = backoff or Backoff()
+        self.clock = clock
+        self._builds = []
+        self._jobs = []
+        self._conditions = []
+        self._next_build_numbers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopped = False
+
+    def _add(self, targets, obj, timeout):
+        target = _Target(obj, None if timeout is None else self.clock() + timeout)
+        with self._lock:
+            targets.append(target)
+        self._wakeup.set()
+        return target.future
+
+    def add_build(self, build, timeout=None):
+        """
+        :param timeout: seconds after which the future fails with TimeOut, float
+        :return: Future resolving to the result of the build, e.g. "SUCCESS"
+        """
+        return self._add(self._builds, build, timeout)
+
+    def add_job(self, job, timeout=None):
+        """
+        :return: Future resolving to the job once it is neither queued nor running
+        """
+        return self._add(self._jobs, job, timeout)
+
+    def add_condition(self, fn, timeout=None):
+        """
+        :param fn: called without arguments in each round until it returns a true value
+        :return: Future resolving to the value returned by fn
+        """
+        return self._add(self._conditions, fn, timeout)
+
+    def pending(self):
+        """
+        Number of targets not done yet.
+        """
+        with self._lock:
+            return len(self._builds) + len(self._jobs) + len(self._conditions)
+
+    def check(self):
+        """
+        Check every target once. Returns True if any of them completed.
+        """
+        with self._lock:
+            builds, jobs, conditions = list(self._builds), list(self._jobs), list(self._conditions)
+        log.debug("Waiting for %i builds, %i jobs and %i conditions",
+                  len(builds), len(jobs), len(conditions))
+        changed = False
+        if builds:
+            changed |= self._check_builds(builds)
+        if jobs:
+            changed |= self._check_jobs(jobs)
+        for target in conditions:
+            try:
+                value = target.obj()
+            except Exception:
+                target.future.set_exception(sys.exc_info())
+                continue
+            if value:
+                target.future.set_result(value)
+        self._expire()
+        return self._remove_done() or changed
+
+    def _check_builds(self, targets):
+        by_job = defaultdict(list)
+        changed = False
+        for target in targets:
+            build = target.obj
+            if build.baseurl == '%s/%i' % (build.job.baseurl, build.buildno):
+                by_job[build.job.baseurl].append(target)
+            else:
+                # e.g. matrix runs, which are not listed in the builds of their job
+                changed |= self._check_build(target)
+        for job_url, job_targets in by_job.items():
+            job = job_targets[0].obj.job
+            oldest = min(target.obj.buildno for target in job_targets)
+            try:
+                next_build_number, states, window = self._query_builds(job, oldest)
+            except Exception:
+                log.warning("Could not check the builds of %s", job_url, exc_info=True)
+                continue
+            for target in job_targets:
+                state = states.get(target.obj.buildno)
+                if state is None:
+                    if target.obj.buildno < next_build_number and len(states) < window:
+                        target.fail(NotFound('%s was deleted' % target.obj.baseurl))
+                    # Otherwise it has not started yet
+                    continue
+                changed |= self._complete_build(target, state)
+        return changed
+
+    def _query_builds(self, job, oldest):
+        """
+        Fetch the state of the newest builds of a job, down to build oldest.
+        Returns nextBuildNumber, the states by build number and the number of
+        builds asked for.
+        """
+        job_url = job.baseurl
+        window = max(self.MIN_BUILDS_WINDOW, self._next_build_numbers.get(job_url, 0) - oldest)
+        while True:
+            # builds only lists the newest 100 builds
+            field = 'builds' if window <= 100 else 'allBuilds'
+            data = job.get_data(job.python_api_url(job_url), {'tree': self.BUILDS_TREE % (field, window)})
+            next_build_number = data.get('nextBuildNumber', 0)
+            self._next_build_numbers[job_url] = next_build_number
+            builds = data.get(field) or []
+            if len(builds) == window and next_build_number - oldest > window:
+                # More builds were started than we asked for
+                window = next_build_number - oldest
+                continue
+            return next_build_number, dict((build['number'], build) for build in builds), window
+
+    def _check_build(self, target):
+        build = target.obj
+        try:
+            state = build.get_data(build.python_api_url(build.baseurl), {'tree': self.BUILD_TREE})
+        except Exception:
+            log.warning("Could not check %s", build.baseurl, exc_info=True)
+            return False
+        return self._complete_build(target, state)
+
+    @staticmethod
+    def _complete_build(target, state):
+        if state['building']:
+            return False
+        target.obj._merge_data({'building': False, 'result': state['result']})
+        target.future.set_result(state['result'])
+        return True
+
+    def _check_jobs(self, targets):
+        by_jenkins = defaultdict(list)
+        for target in targets:
+            by_jenkins[target.obj.get_jenkins_obj().baseurl].append(target)
+        changed = False
+        for jenkins_targets in by_jenkins.values():
+            jenkins = jenkins_targets[0].obj.get_jenkins_obj()
+            try:
+                data = jenkins.get_data(jenkins.python_api_url(jenkins.baseurl), {'tree': self.JOBS_TREE})
+            except Exception:
+                log.warning("Could not check the jobs of %s", jenkins.baseurl, exc_info=True)
+                continue
+            states = dict((job['name'], job) for job in data.get('jobs') or [])
+            for target in jenkins_targets:
+                job = target.obj
+                state = states.get(job.name)
+                if state is None:
+                    # e.g. jobs in folders, which are not listed at the top
+                    try:
+                        state = job.get_data(job.python_api_url(job.baseurl), {'tree': self.JOB_TREE})
+                    except Exception:
+                        log.warning("Could not check %s", job.baseurl, exc_info=True)
+                        continue
+                if not state.get('inQueue') and not (state.get('color') or '').endswith('_anime'):
+                    target.future.set_result(job)
+                    changed = True
+        return changed
+
+    def _expire(self):
+        now = self.clock()
+        with self._lock:
+            targets = self._builds + self._jobs + self._conditions
+        for target in targets:
+            if not target.future.done() and target.deadline is not None and now >= target.deadline:
+                target.fail(TimeOut('Waited too long for %r' % (target.obj,)))
+
+    def _remove_done(self):
+        removed = False
+        with self._lock:
+            for targets in (self._builds, self._jobs, self._conditions):
+                remaining = [target for target in targets if not target.future.done()]
+                removed |= len(remaining) != len(targets)
+                targets[:] = remaining
+        return removed
+
+    def _next_delay(self):
+        """
+        The backoff delay, shortened to the nearest deadline.
+        """
+        delay = self.backoff.next()
+        with self._lock:
+            deadlines = [target.deadline for target in self._builds + self._jobs + self._conditions
+                         if target.deadline is not None]
+        if deadlines:
+            delay = max(0, min(delay, min(deadlines) - self.clock()))
+        return delay
+
+    def run(self, futures=None):
+        """
+        Check the targets in rounds until the given futures are done, or all
+        targets if futures is None. Only one thread may run the scheduler.
+        """
+        def finished():
+            if futures is None:
+                return not self.pending()
+            return all(future.done() for future in futures)
+
+        while not self._stopped and not finished():
+            self._wakeup.clear()
+            if self.check():
+                self.backoff.reset()
+            if finished():
+                break
+            # Adding a target interrupts the wait
+            self._wakeup.wait(self._next_delay())
+
+    def start(self):
+        """
+        Run the scheduler on a background thread, until stop is called.
+        """
+        assert self._thread is None, 'The scheduler was already started'
+        self._thread = threading.Thread(target=self._serve, name='jenkinsapi-wait')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def _serve(self):
+        while not self._stopped:
+            self.run()
+            self._wakeup.wait(60)
+            self.backoff.reset()
+
+    def stop(self):
+        """
+        Stop the background thread and cancel the targets still pending.
+        """
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self._lock:
+            targets = self._builds + self._jobs + self._conditions
+            self._builds, self._jobs, self._conditions = [], [], []
+        for target in targets:
+            target.future.cancel()
+
+
+def wait_until(fn, timeout=None, backoff=None):
+    """
+    Call fn until it returns a true value, and return that value.
+
+    :param fn: function without arguments
+    :param timeout: seconds after which TimeOut is raised, float
+    :param backoff: Backoff between the calls
+    """
+    scheduler = WaitScheduler(backoff)
+    future = scheduler.add_condition(fn, timeout)
+    scheduler.run([future])
+    return future.result()
+
+
+def wait_for_builds(builds, timeout=None, backoff=None):
+    """
+    Wait until all builds are complete. The builds of a job are checked
+    together, with one request per round.
+
+    :param builds: list of Build obj
+    :param timeout: seconds after which TimeOut is raised, float
+    :return: the result of each build, e.g. ["SUCCESS", "FAILURE"]
+    """
+    scheduler = WaitScheduler(backoff)
+    futures = [scheduler.add_build(build, timeout) for build in builds]
+    scheduler.run(futures)
+    return [future.result() for future in futures]
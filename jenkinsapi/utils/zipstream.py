@@ -0,0 +1,204 @@
+"""
+Read the entries of a zip archive from a stream, as it arrives over the network.
+
+The zipfile module needs to seek to the central directory at the end of an
+archive. Here the local headers are read in order instead, which works for
+the archives Jenkins builds on the fly (artifact/*zip*/archive.zip): their
+deflated entries are followed by a data descriptor, the end of each entry is
+found by decompressing it.
+
+    for entry in iter_zip(response.raw):
+        if entry.name.endswith('.jar'):
+            for chunk in entry.iter_content():
+                out.write(chunk)
+"""
+
+import zlib
+import struct
+import zipfile
+
+LOCAL_HEADER = 'PK\x03\x04'
+DATA_DESCRIPTOR = 'PK\x07\x08'
+LOCAL_HEADER_FORMAT = '<HHHHHIIIHH'
+ZIP64_EXTRA = 0x0001
+ZIP64_LIMIT = 0xFFFFFFFF
+
+FLAG_ENCRYPTED = 0x1
+FLAG_DATA_DESCRIPTOR = 0x8
+
+
+class _Reader(object):
+    """
+    Reads from a file-like object, allowing data read too far to be pushed back.
+    """
+
+    def __init__(self, fileobj, chunk_size):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.buffer = ''
+
+    def read_some(self):
+        """
+        Return the next bytes available, '' at the end of the stream.
+        """
+        if self.buffer:
+            data, self.buffer = self.buffer, ''
+            return data
+        return self.fileobj.read(self.chunk_size)
+
+    def read(self, size):
+        """
+        Return exactly size bytes.
+        """
+        parts = []
+        while size > 0:
+            data = self.read_some()
+            if not data:
+                raise zipfile.BadZipfile('Truncated zip stream')
+            if len(data) > size:
+                self.unread(data[size:])
+                data = data[:size]
+            parts.append(data)
+            size -= len(data)
+        return ''.join(parts)
+
+    def unread(self, data):
+        self.buffer = data + self.buffer
+
+
+class ZipStreamEntry(object):
+    """
+    A file in a zip stream. Its content must be read with iter_content, or
+    skipped, before the next entry can be read.
+    """
+
+    def __init__(self, reader, name, flags, method, crc, compressed_size, file_size, zip64):
+        self.name = name
+        self.flags = flags
+        self.method = method
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.file_size = file_size
+        self.zip64 = zip64
+        self._reader = reader
+        self._consumed = False
+
+    def is_dir(self):
+        return self.name.endswith('/')
+
+    def __repr__(self):
+        return '<%s.%s %s>' % (self.__class__.__module__, self.__class__.__name__, self.name)
+
+    def iter_content(self):
+        """
+        Yield the uncompressed content of the entry in chunks, and check its CRC.
+        """
+        assert not self._consumed, 'The content of %s was already read' % self.name
+        self._consumed = True
+        if self.method == zipfile.ZIP_STORED:
+            chunks = self._iter_stored()
+        elif self.method == zipfile.ZIP_DEFLATED:
+            chunks = self._iter_deflated()
+        else:
+            raise zipfile.BadZipfile('Unsupported compression method %i for %s' % (self.method, self.name))
+        crc = 0
+        size = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            yield chunk
+        if self.flags & FLAG_DATA_DESCRIPTOR:
+            self._read_data_descriptor(size)
+        if crc & 0xFFFFFFFF != self.crc or size != self.file_size:
+            raise zipfile.BadZipfile('Bad CRC or size for %s' % self.name)
+
+    def skip(self):
+        if not self._consumed:
+            for _ in self.iter_content():
+                pass
+
+    def _iter_stored(self):
+        if self.flags & FLAG_DATA_DESCRIPTOR:
+            raise zipfile.BadZipfile('Cannot find the end of stored entry %s' % self.name)
+        remaining = self.compressed_size
+        while remaining:
+            chunk = self._reader.read(min(remaining, self._reader.chunk_size))
+            remaining -= len(chunk)
+            yield chunk
+
+    def _iter_deflated(self):
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        if not self.flags & FLAG_DATA_DESCRIPTOR:
+            remaining = self.compressed_size
+            while remaining:
+                data = self._reader.read(min(remaining, self._reader.chunk_size))
+                remaining -= len(data)
+                yield decompressor.decompress(data)
+        else:
+            # The size is unknown: feed data until the deflate stream ends,
+            # the decompressor then hands back what follows
+            while not decompressor.unused_data:
+                data = self._reader.read_some()
+                if not data:
+                    raise zipfile.BadZipfile('Truncated entry %s' % self.name)
+                yield decompressor.decompress(data)
+            self._reader.unread(decompressor.unused_data)
+        yield decompressor.flush()
+
+    def _read_data_descriptor(self, size):
+        signature = self._reader.read(4)
+        if signature != DATA_DESCRIPTOR:
+            # The signature is optional
+            self._reader.unread(signature)
+        self.crc, = struct.unpack('<I', self._reader.read(4))
+        sizes = self._reader.read(16)
+        compressed_size, file_size = struct.unpack('<II', sizes[:8])
+        if self.zip64 or (file_size != size & ZIP64_LIMIT or sizes[8:10] != 'PK'):
+            compressed_size, file_size = struct.unpack('<QQ', sizes)
+        else:
+            self._reader.unread(sizes[8:])
+        self.compressed_size = compressed_size
+        self.file_size = file_size
+
+
+def _zip64_sizes(extra, compressed_size, file_size):
+    """
+    Read the sizes which did not fit in the local header from the ZIP64 extra field.
+    """
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, length = struct.unpack('<HH', extra[pos:pos + 4])
+        if tag == ZIP64_EXTRA:
+            values = list(struct.unpack('<%iQ' % (length // 8), extra[pos + 4:pos + 4 + length - length % 8]))
+            if file_size == ZIP64_LIMIT and values:
+                file_size = values.pop(0)
+            if compressed_size == ZIP64_LIMIT and values:
+                compressed_size = values.pop(0)
+            return compressed_size, file_size, True
+        pos += 4 + length
+    return compressed_size, file_size, False
+
+
+def iter_zip(fileobj, chunk_size=2 ** 16):
+    """
+    Yield a ZipStreamEntry for each file of a zip archive read from fileobj.
+    Reading stops at the central directory, which is not needed.
+    """
+    reader = _Reader(fileobj, chunk_size)
+    while True:
+        data = reader.read_some()
+        if not data:
+            return
+        reader.unread(data)
+        if reader.read(4) != LOCAL_HEADER:
+            return
+        (_, flags, method, _, _, crc, compressed_size, file_size,
+         name_length, extra_length) = struct.unpack(LOCAL_HEADER_FORMAT, reader.read(26))
+        name = reader.read(name_length)
+        extra = reader.read(extra_length)
+        if flags & FLAG_ENCRYPTED:
+            raise zipfile.BadZipfile('%s is encrypted' % name)
+        compressed_size, file_size, zip64 = _zip64_sizes(extra, compressed_size, file_size)
+        entry = ZipStreamEntry(reader, name, flags, method, crc, compressed_size, file_size, zip64)
+        yield entry
+        entry.skip()
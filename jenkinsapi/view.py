@@ -15,6 +15,10 @@ class View(JenkinsBase):
     """
     View class
     """
+    TREES = {
+        'jobs': 'jobs[name,url]',
+        'views': 'views[name,url]',
+    }
 
     def __init__(self, url, name, jenkins_obj):
         self.name = name
@@ -26,7 +30,7 @@ class View(JenkinsBase):
         return self.name
 
     def __getitem__(self, job_name):
-        assert isinstance(job_name, str)
+        assert isinstance(job_name, basestring)
         api_url = self.python_api_url(self.get_job_url(job_name))
         return Job(api_url, job_name, self.jenkins_obj)
 
@@ -60,10 +64,11 @@ class View(JenkinsBase):
         return [a for a in self.iteritems()]
 
     def _get_jobs(self):
-        if not 'jobs' in self._data:
+        data = self._get_fields('jobs')
+        if not 'jobs' in data:
             pass
         else:
-            for viewdict in self._data["jobs"]:
+            for viewdict in data["jobs"]:
                 yield viewdict["name"], viewdict["url"]
 
     def get_job_dict(self):
@@ -151,7 +156,7 @@ class View(JenkinsBase):
         return True
 
     def _get_nested_views(self):
-        for viewdict in self._data.get("views", []):
+        for viewdict in self._get_fields('views').get("views", []):
             yield viewdict["name"], viewdict["url"]
 
     def get_nested_view_dict(self):
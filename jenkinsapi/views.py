@@ -37,7 +37,7 @@ class Views(object):
 
     def __setitem__(self, view_name, job_names_list):
         new_view = self.create(view_name)
-        if isinstance(job_names_list, str):
+        if isinstance(job_names_list, basestring):
             job_names_list = [job_names_list]
         for job_name in job_names_list:
             if not new_view.add_job(job_name):
@@ -0,0 +1,61 @@
+import unittest
+
+from jenkinsapi import aio
+from jenkinsapi.build import Build
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class TestAio(unittest.TestCase):
+
+    NUM_JOBS = 20
+    LATENCY = 0.05
+
+    def setUp(self):
+        self.server = FakeJenkins(latency=self.LATENCY).start()
+        for n in range(self.NUM_JOBS):
+            self.server.add_job('job%i' % n, builds=2)
+        self.J = aio.Jenkins(self.server.baseurl, max_workers=self.NUM_JOBS)
+
+    def tearDown(self):
+        self.J.close()
+        self.server.stop()
+
+    def test_lazy(self):
+        self.assertEquals(self.server.count(), 0)
+        job = self.J['job0']
+        self.assertTrue(isinstance(job, aio.Job))
+        # only the Jenkins object has been polled, to find the job
+        self.assertEquals(self.server.count(), 1)
+
+    def test_fetch_jobs_concurrently(self):
+        self.J.fetch().result(timeout=5)
+        self.server.reset_requests()
+        jobs = [future.result() for future in aio.as_completed(self.J.fetch_jobs(), timeout=5)]
+        self.assertEquals(sorted(job.name for job in jobs),
+                          sorted('job%i' % n for n in range(self.NUM_JOBS)))
+        self.assertTrue(all(job.is_enabled() for job in jobs))
+        # Serially there would never be more than one
+        self.assertTrue(self.server.peak_in_flight > 1, self.server.peak_in_flight)
+
+    def test_fetch_jobs_with_tree(self):
+        jobs = aio.gather(self.J.fetch_jobs(['job1', 'job2'], tree='color'), timeout=5)
+        self.assertEquals([job._json for job in jobs], [{'color': 'blue'}] * 2)
+
+    def test_fetch_last_build(self):
+        build = self.J['job3'].fetch_last_build().result(timeout=5)
+        self.assertTrue(isinstance(build, Build))
+        self.assertEquals(build.get_number(), 2)
+        self.assertEquals(build.get_status(), 'SUCCESS')
+        self.assertEquals(str(build), 'job3 #2')
+
+    def test_submit(self):
+        job = self.J['job4']
+        self.assertEquals(job.submit('get_last_buildnumber').result(timeout=5), 2)
+
+    def test_queue_and_nodes(self):
+        self.assertEquals(len(self.J.get_queue().fetch().result(timeout=5)), 0)
+        self.assertEquals(self.J.get_nodes().fetch_nodes(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,299 @@
+import os
+import time
+import shutil
+import zipfile
+import StringIO
+import hashlib
+import tempfile
+import unittest
+
+from jenkinsapi.artifact import Artifact
+from jenkinsapi.custom_exceptions import ArtifactBroken
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class TestArtifactDownload(unittest.TestCase):
+
+    DATA = ''.join(chr(n % 251) for n in xrange(100000))
+    PATH = 'job/foo/1/artifact/dist/out.bin'
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        self.server.add_job('foo', builds=1)
+        self.server.add_file(self.PATH, self.DATA)
+        self.md5 = hashlib.md5(self.DATA).hexdigest()
+        self.server.set('fingerprint/%s' % self.md5, {
+            'fileName': 'out.bin', 'hash': self.md5,
+            'original': {'name': 'foo', 'number': 1}, 'usage': []})
+        J = Jenkins(self.server.baseurl)
+        self.build = J['foo'].get_build(1)
+        self.artifact = Artifact('out.bin', self.server.url(self.PATH).rstrip('/'), self.build)
+        self.tmpdir = tempfile.mkdtemp()
+        self.fspath = os.path.join(self.tmpdir, 'out.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        self.server.stop()
+
+    def read(self, fspath):
+        with open(fspath, 'rb') as f:
+            return f.read()
+
+    def test_streamed_download(self):
+        self.assertEquals(self.artifact._do_download(self.fspath, chunk_size=4096), self.md5)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+        self.assertFalse(os.path.exists(self.fspath + Artifact.PART_SUFFIX))
+
+    def write_part(self, data, validator=None):
+        partpath = self.fspath + Artifact.PART_SUFFIX
+        with open(partpath, 'wb') as part:
+            part.write(data)
+        if validator is not None:
+            with open(partpath + Artifact.VALIDATOR_SUFFIX, 'w') as f:
+                f.write(validator)
+
+    def test_resume(self):
+        self.write_part(self.DATA[:30000], '"%s"' % self.md5)
+        self.assertEquals(self.artifact._do_download(self.fspath), self.md5)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+        self.assertFalse(os.path.exists(self.fspath + Artifact.PART_SUFFIX + Artifact.VALIDATOR_SUFFIX))
+
+    def test_resume_of_complete_part(self):
+        self.write_part(self.DATA, '"%s"' % self.md5)
+        self.assertEquals(self.artifact._do_download(self.fspath), self.md5)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+
+    def test_changed_artifact_is_not_resumed(self):
+        self.write_part('stale' * 1000, '"%s"' % hashlib.md5('stale').hexdigest())
+        self.assertEquals(self.artifact._do_download(self.fspath), self.md5)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+
+    def test_part_without_validator_is_not_resumed(self):
+        self.write_part('stale' * 1000)
+        self.assertEquals(self.artifact._do_download(self.fspath), self.md5)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+        self.assertEquals(self.server.count('/' + self.PATH), 1)
+
+    def test_unexpected_range_restarts(self):
+        def wrong_range(request, query):
+            if request.headers.get('Range'):
+                return 206, self.DATA[1000:], {'Content-Range': 'bytes 1000-%i/%i' % (
+                    len(self.DATA) - 1, len(self.DATA))}
+            return 200, self.DATA, {}
+        self.server.add_handler('GET', self.PATH, wrong_range)
+        self.write_part(self.DATA[:30000], '"%s"' % self.md5)
+        self.assertEquals(self.artifact._do_download(self.fspath), self.md5)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+
+    def test_corrupt_local_copy_is_replaced(self):
+        with open(self.fspath, 'wb') as f:
+            f.write(self.DATA[:1000])
+        self.assertEquals(self.artifact.save(self.fspath), self.fspath)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+        self.assertEquals(self.server.count('/' + self.PATH), 1)
+
+    def test_copy_of_unfingerprinted_artifact_is_kept(self):
+        # A job which does not record fingerprints
+        del self.server.documents['fingerprint/%s' % self.md5]
+        with open(self.fspath, 'wb') as f:
+            f.write(self.DATA)
+        self.assertEquals(self.artifact.save(self.fspath), self.fspath)
+        self.assertEquals(self.server.count('/' + self.PATH), 0)
+        self.assertEquals(self.server.count('/' + self.PATH, method='HEAD'), 1)
+
+    def test_older_copy_of_unfingerprinted_artifact_is_replaced(self):
+        del self.server.documents['fingerprint/%s' % self.md5]
+        with open(self.fspath, 'wb') as f:
+            f.write('x' * len(self.DATA))
+        # Rebuilt since the copy was made, with the same size
+        self.server.add_file(self.PATH, self.DATA, last_modified=time.time() + 3600)
+        self.assertEquals(self.artifact.save(self.fspath), self.fspath)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+        self.assertEquals(self.server.count('/' + self.PATH), 1)
+
+    def test_unverified_download_is_discarded(self):
+        self.server.add_file(self.PATH, 'corrupt')
+        self.server.set('fingerprint/%s' % hashlib.md5('corrupt').hexdigest(), {
+            'fileName': 'out.bin', 'hash': hashlib.md5('corrupt').hexdigest(),
+            'original': {'name': 'bar', 'number': 7}, 'usage': []})
+        with self.assertRaises(ArtifactBroken):
+            self.artifact.save(self.fspath)
+        self.assertFalse(os.path.exists(self.fspath))
+        self.assertFalse(os.path.exists(self.fspath + Artifact.PART_SUFFIX))
+
+    def test_no_resume(self):
+        with open(self.fspath + Artifact.PART_SUFFIX, 'wb') as part:
+            part.write('garbage')
+        self.assertEquals(self.artifact._do_download(self.fspath, resume=False), self.md5)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+
+    def test_save_to_dir_verifies_without_rereading(self):
+        self.assertEquals(self.artifact.save_to_dir(self.tmpdir), self.fspath)
+        self.assertEquals(self.read(self.fspath), self.DATA)
+        self.assertEquals(self.server.count('/fingerprint/%s/' % self.md5), 1)
+        # An up to date local copy is not downloaded again
+        self.server.reset_requests()
+        self.artifact.save(self.fspath)
+        self.assertEquals(self.server.count('/' + self.PATH), 0)
+
+
+class BuildWithArtifacts(unittest.TestCase):
+
+    FILES = dict(('file%i.%s' % (n, 'txt' if n % 2 else 'bin'), 'data %i ' % n * 1000)
+                 for n in range(10))
+
+    def setUp(self):
+        self.server = FakeJenkins(latency=0.01).start()
+        self.server.add_job('foo', builds=1)
+        artifacts = []
+        fingerprints = []
+        for name, data in self.FILES.items():
+            path = 'dist/%s' % name
+            self.server.add_file('job/foo/1/artifact/%s' % path, data)
+            artifacts.append({'fileName': name, 'relativePath': path})
+            fingerprints.append({'fileName': name, 'hash': hashlib.md5(data).hexdigest()})
+        self.server.add_build('foo', 1, artifacts=artifacts, fingerprint=fingerprints)
+        J = Jenkins(self.server.baseurl, lazy=True)
+        self.build = J['foo'].get_build(1)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        self.server.stop()
+
+
+class TestBuildDownloadArtifacts(BuildWithArtifacts):
+
+    def test_download_all(self):
+        report = self.build.download_artifacts(self.tmpdir, workers=5)
+        self.assertEquals(len(report.downloaded), 10)
+        self.assertEquals(report.bytes, sum(len(data) for data in self.FILES.values()))
+        self.assertTrue(report.throughput() > 0)
+        for name, data in self.FILES.items():
+            with open(os.path.join(self.tmpdir, 'dist', name), 'rb') as f:
+                self.assertEquals(f.read(), data)
+        # the fingerprints of all files are fetched at once
+        self.assertEquals(self.server.count('/fingerprint/'), 0)
+        self.assertEquals(self.server.count('/job/foo/1/api/json?tree=fingerprint'), 1)
+
+    def test_include(self):
+        report = self.build.download_artifacts(self.tmpdir, include='dist/*.txt')
+        self.assertEquals(sorted(os.path.basename(path) for path in report.downloaded),
+                          sorted(name for name in self.FILES if name.endswith('.txt')))
+
+    def test_skip_up_to_date(self):
+        self.build.download_artifacts(self.tmpdir)
+        with open(os.path.join(self.tmpdir, 'dist', 'file0.bin'), 'wb') as f:
+            f.write('changed')
+        self.server.reset_requests()
+        report = self.build.download_artifacts(self.tmpdir)
+        self.assertEquals(report.downloaded, [os.path.join(self.tmpdir, 'dist', 'file0.bin')])
+        self.assertEquals(len(report.skipped), 9)
+        self.assertEquals(self.server.count('/job/foo/1/artifact/'), 1)
+
+    def test_retry(self):
+        attempts = []
+
+        def flaky(request, query):
+            attempts.append(request.path)
+            if len(attempts) == 1:
+                return 500, 'oops', {}
+            return 200, self.FILES['file3.txt'], {}
+        self.server.add_handler('GET', 'job/foo/1/artifact/dist/file3.txt', flaky)
+        report = self.build.download_artifacts(self.tmpdir, include='file3.txt')
+        self.assertEquals(len(attempts), 2)
+        self.assertEquals(len(report.downloaded), 1)
+
+    def test_failure_is_reported(self):
+        self.server.add_handler('GET', 'job/foo/1/artifact/dist/file3.txt',
+                                lambda request, query: (200, 'corrupt', {}))
+        report = self.build.download_artifacts(self.tmpdir, retries=1)
+        self.assertEquals(len(report.downloaded), 9)
+        self.assertEquals(report.failed.keys(), [os.path.join(self.tmpdir, 'dist', 'file3.txt')])
+        self.assertEquals(os.listdir(os.path.join(self.tmpdir, 'dist')).count('file3.txt.part'), 0)
+
+    def test_same_name_in_different_folders(self):
+        build = self.server.get('job/foo/1')
+        for folder, data in (('a', 'first'), ('b', 'second')):
+            self.server.add_file('job/foo/1/artifact/%s/x.jar' % folder, data)
+            build['artifacts'].append({'fileName': 'x.jar', 'relativePath': '%s/x.jar' % folder})
+            build['fingerprint'].append({'fileName': 'x.jar', 'hash': hashlib.md5(data).hexdigest()})
+        report = self.build.download_artifacts(self.tmpdir, include='x.jar', workers=2)
+        self.assertEquals(report.failed, {})
+        for folder, data in (('a', 'first'), ('b', 'second')):
+            with open(os.path.join(self.tmpdir, folder, 'x.jar'), 'rb') as f:
+                self.assertEquals(f.read(), data)
+
+    def test_path_outside_target_dir_is_refused(self):
+        self.server.get('job/foo/1')['artifacts'].append({'fileName': 'evil', 'relativePath': '../evil'})
+        report = self.build.download_artifacts(self.tmpdir, include='evil')
+        self.assertEquals(report.failed.keys(), ['../evil'])
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.tmpdir), 'evil')))
+
+
+class TestBuildDownloadArchive(BuildWithArtifacts):
+
+    def setUp(self):
+        BuildWithArtifacts.setUp(self)
+        self.server.add_file('job/foo/1/artifact/*zip*/archive.zip', self.make_archive(self.FILES))
+
+    @staticmethod
+    def make_archive(files, compression=zipfile.ZIP_DEFLATED):
+        buf = StringIO.StringIO()
+        archive = zipfile.ZipFile(buf, 'w', compression)
+        for name, data in sorted(files.items()):
+            archive.writestr('archive/%s' % (name if '/' in name else 'dist/' + name), data)
+        archive.close()
+        return buf.getvalue()
+
+    def test_single_request(self):
+        report = self.build.download_artifacts(self.tmpdir, archive=True)
+        self.assertEquals(len(report.downloaded), 10)
+        for name, data in self.FILES.items():
+            with open(os.path.join(self.tmpdir, 'dist', name), 'rb') as f:
+                self.assertEquals(f.read(), data)
+        self.assertEquals(self.server.count('/job/foo/1/artifact/'), 1)
+
+    def test_include(self):
+        report = self.build.download_artifacts(self.tmpdir, include='dist/*.txt', archive=True)
+        self.assertEquals(sorted(os.path.basename(path) for path in report.downloaded),
+                          sorted(name for name in self.FILES if name.endswith('.txt')))
+
+    def test_skip_up_to_date(self):
+        self.build.download_artifacts(self.tmpdir, archive=True)
+        with open(os.path.join(self.tmpdir, 'dist', 'file0.bin'), 'wb') as f:
+            f.write('changed')
+        report = self.build.download_artifacts(self.tmpdir, archive=True)
+        self.assertEquals(report.downloaded, [os.path.join(self.tmpdir, 'dist', 'file0.bin')])
+        self.assertEquals(len(report.skipped), 9)
+
+    def test_fingerprint_mismatch_is_reported(self):
+        fingerprints = self.server.get('job/foo/1')['fingerprint']
+        fingerprints[0]['hash'] = '0' * 32
+        report = self.build.download_artifacts(self.tmpdir, archive=True)
+        self.assertEquals(len(report.downloaded), 9)
+        self.assertEquals(report.failed.keys(), [os.path.join(self.tmpdir, 'dist', fingerprints[0]['fileName'])])
+
+    def test_bad_crc_is_reported(self):
+        data = self.make_archive(self.FILES, zipfile.ZIP_STORED)
+        corrupt = data.replace('data 3 data 3 ', 'data 3 dxta 3 ', 1)
+        self.server.add_file('job/foo/1/artifact/*zip*/archive.zip', corrupt)
+        report = self.build.download_artifacts(self.tmpdir, archive=True)
+        fspath = os.path.join(self.tmpdir, 'dist', 'file3.txt')
+        self.assertEquals(report.failed.keys(), [fspath])
+        self.assertEquals(len(report.downloaded), 9)
+        self.assertFalse(os.path.exists(fspath))
+        self.assertFalse(os.path.exists(fspath + '.part'))
+
+    def test_path_outside_target_dir_is_refused(self):
+        self.server.add_file('job/foo/1/artifact/*zip*/archive.zip',
+                             self.make_archive({'../evil': 'x', 'dist/ok': 'y'}))
+        report = self.build.download_artifacts(self.tmpdir, archive=True)
+        self.assertEquals(report.failed.keys(), ['../evil'])
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.tmpdir), 'evil')))
+        self.assertEquals(report.downloaded, [os.path.join(self.tmpdir, 'dist', 'ok')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import re
+import os
+import mock
+import shutil
+import tempfile
+import unittest
+
+from jenkinsapi import api
+from jenkinsapi.job import Job
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.custom_exceptions import ArtifactsMissing
+from jenkinsapi.utils.artifact_index import ArtifactIndex
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class TestArtifactIndex(unittest.TestCase):
+
+    JOB_API = '/job/foo/api/json'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'artifacts.db')
+        self.server = FakeJenkins().start()
+        self.server.add_job('foo', builds=0)
+        self.add_builds(1, 40)
+        self.index = ArtifactIndex(self.path)
+        self.j = Job(self.server.url('job/foo'), 'foo', Jenkins(self.server.baseurl))
+        self.server.reset_requests()
+
+    def tearDown(self):
+        self.index.close()
+        self.server.stop()
+        shutil.rmtree(self.tmp)
+
+    def add_builds(self, first, last, **fields):
+        job = self.server.get('job/foo')
+        for number in range(first, last + 1):
+            # Every build has a jar, every tenth build a pom too
+            names = ['foo-%i.jar' % number] + (['foo.pom'] if number % 10 == 0 else [])
+            artifacts = [{'fileName': name, 'relativePath': 'target/%s' % name} for name in names]
+            fingerprints = [{'fileName': name, 'hash': '%032x' % number} for name in names]
+            build = self.server.add_build('foo', number, artifacts=artifacts, fingerprint=fingerprints, **fields)
+            job['allBuilds'].insert(0, build)
+            job['lastBuild'] = {'number': number, 'url': build['url']}
+        job['builds'] = job['allBuilds'][:100]
+
+    def test_bulk_update(self):
+        self.assertEquals(self.index.update(self.j), 40)
+        # The last build number, then all builds at once
+        self.assertEquals(self.server.count(self.JOB_API), 2)
+        self.assertEquals(self.server.count(), 2)
+
+    def test_find(self):
+        self.index.update(self.j)
+        self.server.reset_requests()
+        self.assertEquals(self.index.find(self.j.baseurl, names=['foo-7.jar']),
+                          [(7, 'foo-7.jar', 'target/foo-7.jar', '%032x' % 7)])
+        self.assertEquals([a.number for a in self.index.find(self.j.baseurl, glob='target/*.pom')], [40, 30, 20, 10])
+        self.assertEquals([a.number for a in self.index.find(self.j.baseurl, regexp=r'-3\d\.jar$', limit=2)],
+                          [39, 38])
+        self.assertEquals(self.index.builds_with(self.j.baseurl, ['foo.pom', 'foo-20.jar']), [20])
+        self.assertEquals(self.server.count(), 0)
+
+    def test_incremental_update(self):
+        self.index.update(self.j)
+        self.add_builds(41, 42)
+        self.add_builds(43, 43, building=True, result=None)
+        self.assertEquals(self.index.update(self.j), 2)
+        self.assertEquals(self.index.last_indexed(self.j.baseurl), 42)
+        self.index.close()
+        self.index = ArtifactIndex(self.path)
+        self.assertEquals(self.index.builds_with(self.j.baseurl, ['foo-42.jar']), [42])
+
+    def test_search_artifacts(self):
+        with mock.patch.object(api, 'job_by_jobid', return_value=self.j):
+            artifacts = api.search_artifacts(self.server.baseurl, 'foo', ['foo.pom'], index=self.index)
+            self.assertEquals(artifacts['foo.pom'].build.buildno, 40)
+            self.assertTrue(artifacts['foo.pom'].url.endswith('/job/foo/40/artifact/target/foo.pom'))
+            artifact = api.search_artifact_by_regexp(self.server.baseurl, 'foo', re.compile(r'-2\d\.jar$'),
+                                                     index=self.index)
+            self.assertEquals(artifact.filename, 'foo-29.jar')
+            with self.assertRaises(ArtifactsMissing):
+                api.search_artifacts(self.server.baseurl, 'foo', ['foo.pom', 'foo-1.jar'], index=self.index)
+        # Only the builds found were polled
+        self.assertEquals(self.server.count('/job/foo/40/api/json'), 1)
+        self.assertEquals(self.server.count('/job/foo/29/api/json'), 1)
+
+    def test_search_without_index_stops_at_first_match(self):
+        with mock.patch.object(api, 'job_by_jobid', return_value=self.j), \
+                mock.patch.object(Job, 'SUMMARY_PAGE_SIZE', 5), \
+                mock.patch.object(api, 'get_default_artifact_index') as get_index:
+            artifacts = api.search_artifacts(self.server.baseurl, 'foo', ['foo.pom'])
+            self.assertEquals(artifacts['foo.pom'].build.buildno, 40)
+            artifact = api.search_artifact_by_regexp(self.server.baseurl, 'foo', re.compile(r'-38\.jar$'))
+            self.assertEquals(artifact.filename, 'foo-38.jar')
+            with self.assertRaises(ArtifactsMissing):
+                api.search_artifacts(self.server.baseurl, 'foo', ['foo-41.jar'])
+        self.assertFalse(get_index.called)
+        # One page for each of the finds, every page until the end for the miss
+        self.assertEquals(self.server.count(self.JOB_API + '?tree=allBuilds'), 1 + 1 + 9)
+
+    def test_deleted_build(self):
+        self.add_builds(41, 41)
+        self.index.update(self.j)
+        job = self.server.get('job/foo')
+        job['allBuilds'] = job['builds'] = [build for build in job['allBuilds'] if build['number'] != 40]
+        self.server.documents.pop('job/foo/40')
+        self.j = Job(self.server.url('job/foo'), 'foo', Jenkins(self.server.baseurl))
+        with mock.patch.object(api, 'job_by_jobid', return_value=self.j):
+            artifacts = api.search_artifacts(self.server.baseurl, 'foo', ['foo.pom'], index=self.index)
+        self.assertEquals(artifacts['foo.pom'].build.buildno, 30)
+        self.assertEquals(self.index.builds_with(self.j.baseurl, ['foo.pom']), [30, 20, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
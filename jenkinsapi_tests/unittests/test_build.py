@@ -4,6 +4,7 @@ import unittest
 import datetime
 
 from jenkinsapi.build import Build
+from jenkinsapi.jenkinsbase import JenkinsBase
 
 
 class test_build(unittest.TestCase):
@@ -76,6 +77,52 @@ class test_build(unittest.TestCase):
     #     self.assertEquals(self.b.get_downstream_job_names(), expected)
 
 
+class test_lazy_build(unittest.TestCase):
+
+    API_URL = 'http://localhost:8080/job/foo/1/api/json'
+
+    def setUp(self):
+        self.J = mock.MagicMock()  # Jenkins
+        self.J.lazy = True
+        self.j = mock.MagicMock()  # Job
+        self.j.get_jenkins_obj.return_value = self.J
+
+    @mock.patch.object(JenkinsBase, 'get_data')
+    def test_no_request_on_construction(self, _get_data):
+        Build('http://localhost:8080/job/foo/1/', 1, self.j)
+        self.assertFalse(_get_data.called)
+
+    @mock.patch.object(JenkinsBase, 'get_data')
+    def test_accessor_fetches_its_tree(self, _get_data):
+        _get_data.return_value = {'result': 'SUCCESS'}
+        b = Build('http://localhost:8080/job/foo/1/', 1, self.j)
+        self.assertEquals(b.get_status(), 'SUCCESS')
+        self.assertEquals(b.get_status(), 'SUCCESS')
+        _get_data.assert_called_once_with(self.API_URL, {'tree': 'result'})
+
+    @mock.patch.object(JenkinsBase, 'get_data')
+    def test_is_running_refreshes(self, _get_data):
+        _get_data.return_value = {'building': True, 'result': None}
+        b = Build('http://localhost:8080/job/foo/1/', 1, self.j)
+        self.assertTrue(b.is_running())
+        _get_data.return_value = {'building': False, 'result': 'SUCCESS'}
+        self.assertTrue(b.is_good())
+        self.assertEquals(_get_data.call_count, 2)
+        _get_data.assert_called_with(self.API_URL, {'tree': 'building,result'})
+
+    @mock.patch.object(JenkinsBase, 'get_data')
+    def test_full_poll_on_other_fields(self, _get_data):
+        _get_data.return_value = {'result': 'SUCCESS'}
+        b = Build('http://localhost:8080/job/foo/1/', 1, self.j)
+        b.get_status()
+        _get_data.return_value = test_build.DATA
+        self.assertEquals(b.get_actions()['causes'][0]['userName'], 'anonymous')
+        _get_data.assert_called_with(self.API_URL + '?depth=2')
+        # The full representation answers the tree accessors from now on
+        self.assertEquals(b.get_duration().seconds, 5)
+        self.assertEquals(_get_data.call_count, 2)
+
+
 def main():
     unittest.main(verbosity=2)
 
@@ -0,0 +1,71 @@
+import mock
+import unittest
+
+from jenkinsapi.job import Job
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class TestBuildsSummary(unittest.TestCase):
+
+    JOB_API = '/job/big/api/json'
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        job = self.server.add_job('big', builds=250)
+        # Like Jenkins, allBuilds lists the builds themselves
+        job['allBuilds'] = [self.server.get('job/big/%i' % n) for n in range(250, 0, -1)]
+        for build in job['allBuilds']:
+            build['actions'] = [{'lastBuiltRevision': {'SHA1': 'sha%i' % (build['number'] // 100)}}]
+        self.j = Job(self.server.url('job/big'), 'big', Jenkins(self.server.baseurl))
+        self.server.reset_requests()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_range_is_one_request(self):
+        builds = self.j.get_builds_summary(range(120, 131))
+        self.assertEquals([build.number for build in builds], range(130, 119, -1))
+        self.assertEquals(builds[0].get_status(), 'SUCCESS')
+        self.assertFalse(builds[0].is_running())
+        self.assertTrue(builds[0].is_good())
+        self.assertEquals(builds[0].duration, 1000)
+        self.assertEquals(self.server.count(self.JOB_API), 1)
+
+    def test_deleted_builds(self):
+        job = self.server.get('job/big')
+        job['allBuilds'] = [build for build in job['allBuilds'] if not 200 <= build['number'] < 240]
+        builds = self.j.get_builds_summary([150, 155, 160])
+        self.assertEquals([build.number for build in builds], [160, 155, 150])
+        self.assertEquals(self.server.count(self.JOB_API), 2)
+
+    def test_custom_fields(self):
+        builds = self.j.get_builds_summary([7], fields='timestamp')
+        self.assertEquals(builds[0].as_dict(), {'number': 7, 'timestamp': 1380000007000})
+
+    def test_all_builds_are_paged(self):
+        with mock.patch.object(Job, 'SUMMARY_PAGE_SIZE', 100):
+            builds = self.j.get_builds_summary()
+        self.assertEquals(len(builds), 250)
+        self.assertEquals(self.server.count(self.JOB_API), 3)
+
+    def test_get_build(self):
+        build = self.j.get_builds_summary([12])[0].get_build()
+        self.assertEquals(build.get_number(), 12)
+        self.assertEquals(build.job, self.j)
+
+    def test_revision_dict(self):
+        revs = self.j.get_revision_dict()
+        self.assertEquals(sorted(revs), ['sha0', 'sha1', 'sha2'])
+        self.assertEquals(revs['sha2'], range(250, 199, -1))
+        self.assertEquals(self.server.count(), 1)
+
+    def test_revision_dict_of_lazy_job(self):
+        job = Jenkins(self.server.baseurl, lazy=True).get_job('big')
+        self.server.reset_requests()
+        self.assertEquals(sorted(job.get_revision_dict()), ['sha0', 'sha1', 'sha2'])
+        self.assertEquals(self.server.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
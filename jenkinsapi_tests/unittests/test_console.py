@@ -0,0 +1,93 @@
+import unittest
+
+from jenkinsapi import aio
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.utils.limiter import Limiter
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class RunningBuildLog(object):
+    """
+    Answers logText/progressiveText like Jenkins for a build which writes
+    one more part of its log each time it is asked.
+    """
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+        self.log = ''
+        self.starts = []
+
+    def __call__(self, request, query):
+        start = int(query.get('start', 0))
+        self.starts.append(start)
+        if self.parts:
+            self.log += self.parts.pop(0)
+        headers = {'X-Text-Size': str(len(self.log))}
+        if self.parts:
+            headers['X-More-Data'] = 'true'
+        return 200, self.log[start:], headers
+
+
+class TestConsoleStream(unittest.TestCase):
+
+    PARTS = ['Started\nBuil', 'ding\n', '', 'x' * 50 + '\n', 'Finished: SUCCESS\n']
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        self.server.add_job('foo', builds=1)
+        self.log = RunningBuildLog(self.PARTS)
+        self.server.add_handler('GET', 'job/foo/1/logText/progressiveText', self.log)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get_build(self, jenkins_class=Jenkins):
+        return jenkins_class(self.server.baseurl, lazy=True)['foo'].get_build(1)
+
+    def test_only_new_output_is_fetched(self):
+        stream = self.get_build().stream_console(delay=0)
+        self.assertEquals(''.join(stream), ''.join(self.PARTS))
+        self.assertEquals(self.log.starts, [0, 12, 17, 17, 68])
+        self.assertEquals(stream.offset, len(''.join(self.PARTS)))
+
+    def test_resume_at_offset(self):
+        stream = self.get_build().stream_console(start=13, delay=0)
+        self.assertEquals(''.join(stream), ''.join(self.PARTS)[13:])
+
+    def test_lines(self):
+        lines = list(self.get_build().iter_console_lines(delay=0, max_line_length=20))
+        self.assertEquals(lines, ['Started', 'Building', 'x' * 20, 'x' * 20, 'x' * 10,
+                                  'Finished: SUCCESS'])
+
+    def test_close(self):
+        stream = self.get_build().stream_console(delay=0)
+        for chunk in stream:
+            stream.close()
+        self.assertEquals(chunk, self.PARTS[0])
+        self.assertEquals(stream.offset, len(self.PARTS[0]))
+        self.assertEquals(len(self.log.starts), 1)
+
+    def test_requests_between_chunks(self):
+        # A single slot, which an open response would hold
+        limiter = Limiter(initial=1, maximum=1, timeout=1)
+        build = Jenkins(self.server.baseurl, lazy=True,
+                        request_args={'limiter': limiter})['foo'].get_build(1)
+        chunks = []
+        for chunk in build.stream_console(delay=0):
+            chunks.append(chunk)
+            self.assertFalse(build.is_running())
+        self.assertEquals(''.join(chunks), ''.join(self.PARTS))
+        self.assertEquals(limiter.stats()['in_flight'], 0)
+
+    def test_follow_console(self):
+        J = aio.Jenkins(self.server.baseurl)
+        chunks = []
+        build = J['foo'].get_build(1)
+        offset = build.follow_console(chunks.append, delay=0).result(timeout=5)
+        self.assertEquals(''.join(chunks), ''.join(self.PARTS))
+        self.assertEquals(offset, len(''.join(self.PARTS)))
+        J.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import mock
+import unittest
+
+from jenkinsapi import config
+from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi.custom_exceptions import JenkinsAPIException
+from jenkinsapi.utils import decoders
+
+
+class TestDecoders(unittest.TestCase):
+
+    DOCUMENT = '{"name": "foo", "inQueue": false, "lastBuild": null, "builds": [{"number": 3}]}'
+
+    def test_decode(self):
+        data = decoders.decode(self.DOCUMENT)
+        self.assertEquals(data['name'], 'foo')
+        self.assertEquals(data['inQueue'], False)
+        self.assertEquals(data['lastBuild'], None)
+        self.assertEquals(data['builds'][0]['number'], 3)
+
+    def test_named_decoder(self):
+        self.assertTrue(decoders.get_decoder('json') is decoders.DECODERS['json'])
+
+    def test_unknown_decoder(self):
+        with self.assertRaises(ValueError):
+            decoders.get_decoder('nosuchdecoder')
+
+    def test_configured_decoder(self):
+        fake_loads = mock.MagicMock(return_value={'fake': True})
+        decoders.register_decoder('fake', fake_loads)
+        try:
+            with mock.patch.object(config, 'JSON_DECODER', 'fake'):
+                self.assertEquals(decoders.decode('{}'), {'fake': True})
+        finally:
+            del decoders.DECODERS['fake']
+        fake_loads.assert_called_once_with('{}')
+
+    def test_api_url(self):
+        self.assertEquals(JenkinsBase.python_api_url('http://localhost:8080/job/foo'),
+                          'http://localhost:8080/job/foo/api/json')
+
+
+class TestGetData(unittest.TestCase):
+
+    class Thing(JenkinsBase):
+        def __init__(self, jenkins_obj):
+            self.jenkins_obj = jenkins_obj
+            JenkinsBase.__init__(self, 'http://localhost:8080/job/foo', poll=False)
+
+        def get_jenkins_obj(self):
+            return self.jenkins_obj
+
+    def setUp(self):
+        self.response = mock.MagicMock()
+        self.J = mock.MagicMock()
+        self.J.requester.get_url.return_value = self.response
+        self.thing = self.Thing(self.J)
+
+    def test_get_data_decodes_json(self):
+        self.response.content = TestDecoders.DOCUMENT
+        data = self.thing.get_data('http://localhost:8080/job/foo/api/json')
+        self.assertEquals(data['builds'], [{'number': 3}])
+
+    def test_get_data_does_not_eval(self):
+        self.response.content = "__import__('os').getcwd()"
+        with self.assertRaises(JenkinsAPIException):
+            self.thing.get_data('http://localhost:8080/job/foo/api/json')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import time
+import threading
+import unittest
+
+from jenkinsapi.custom_exceptions import TimeOut
+from jenkinsapi.utils.executor import Executor, CancelledError, as_completed, gather
+
+
+class TestExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = Executor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_result(self):
+        future = self.executor.submit(lambda a, b: a + b, 1, b=2)
+        self.assertEquals(future.result(timeout=5), 3)
+        self.assertTrue(future.done())
+
+    def test_exception(self):
+        def fail():
+            raise KeyError('boom')
+        future = self.executor.submit(fail)
+        with self.assertRaises(KeyError):
+            future.result(timeout=5)
+        self.assertTrue(isinstance(future.exception(), KeyError))
+
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def work():
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+
+        gather([self.executor.submit(work) for _ in range(20)], timeout=5)
+        self.assertTrue(state['peak'] <= 4)
+        self.assertEquals(len(self.executor._threads), 4)
+
+    def test_map_keeps_order(self):
+        self.assertEquals(self.executor.map(lambda n: n * n, range(10)),
+                          [n * n for n in range(10)])
+
+    def test_cancel_pending(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        executor = Executor(max_workers=1)
+        busy = executor.submit(block)
+        started.wait(5)
+        pending = executor.submit(lambda: 'never')
+        self.assertTrue(pending.cancel())
+        self.assertFalse(busy.cancel())
+        release.set()
+        with self.assertRaises(CancelledError):
+            pending.result(timeout=5)
+        executor.shutdown()
+
+    def test_result_timeout(self):
+        release = threading.Event()
+        future = self.executor.submit(release.wait)
+        with self.assertRaises(TimeOut):
+            future.result(timeout=0.01)
+        release.set()
+
+    def test_as_completed(self):
+        futures = [self.executor.submit(time.sleep, delay) for delay in (0.1, 0)]
+        finished = list(as_completed(futures, timeout=5))
+        self.assertEquals(finished, list(reversed(futures)))
+
+    def test_callback(self):
+        seen = []
+        future = self.executor.submit(lambda: 42)
+        future.result(timeout=5)
+        future.add_done_callback(lambda f: seen.append(f.result()))
+        self.assertEquals(seen, [42])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.fingerprint import Fingerprint, FingerprintCache, KNOWN_FINGERPRINTS
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class TestValidateFingerprints(unittest.TestCase):
+
+    def setUp(self):
+        KNOWN_FINGERPRINTS.clear()
+        self.tmp = tempfile.mkdtemp()
+        self.server = FakeJenkins().start()
+        self.server.add_job('foo', builds=3)
+        self.J = Jenkins(self.server.baseurl)
+        self.files = {}
+        for number in range(6):
+            path = os.path.join(self.tmp, 'file%i.jar' % number)
+            content = 'content %i' % number
+            with open(path, 'wb') as f:
+                f.write(content)
+            md5 = hashlib.md5(content).hexdigest()
+            self.files[path] = md5
+            if number < 4:
+                # Jenkins knows files 0-3, file 3 comes from another build
+                self.server.set('fingerprint/%s' % md5, {
+                    'fileName': 'file%i.jar' % number,
+                    'original': {'name': 'foo', 'number': 3 if number == 3 else 2},
+                    'usage': [],
+                })
+        self.server.reset_requests()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp)
+        KNOWN_FINGERPRINTS.clear()
+
+    def fingerprint_requests(self):
+        return self.server.count('/fingerprint/')
+
+    def test_report(self):
+        report = self.J.validate_fingerprints(dict.fromkeys(self.files), job='foo', build=2)
+        self.assertEquals(report.md5s, self.files)
+        self.assertEquals(sorted(os.path.basename(path) for path in report.valid),
+                          ['file0.jar', 'file1.jar', 'file2.jar'])
+        self.assertEquals([os.path.basename(path) for path in report.invalid], ['file3.jar'])
+        self.assertEquals(sorted(os.path.basename(path) for path in report.unknown), ['file4.jar', 'file5.jar'])
+        self.assertFalse(report.ok())
+        self.assertEquals(str(report), '3 valid, 2 unknown to Jenkins, 1 invalid, 0 failed')
+        self.assertEquals(self.fingerprint_requests(), 6)
+
+    def test_known_fingerprints_are_cached(self):
+        self.J.validate_fingerprints(self.files)
+        self.server.reset_requests()
+        report = self.J.validate_fingerprints(self.files)
+        self.assertEquals(len(report.valid), 4)
+        self.assertEquals(len(report.unknown), 2)
+        # Only the unknown ones were asked for again
+        self.assertEquals(self.fingerprint_requests(), 2)
+
+    def test_cached_usage_is_refreshed(self):
+        md5 = self.files[os.path.join(self.tmp, 'file0.jar')]
+        self.assertTrue(Fingerprint(self.J.baseurl, md5, self.J).validate_for_build('file0.jar', 'foo', 2))
+        self.server.get('fingerprint/%s' % md5)['usage'] = [
+            {'name': 'bar', 'ranges': {'ranges': [{'start': 5, 'end': 7}]}}]
+        self.assertTrue(Fingerprint(self.J.baseurl, md5, self.J).validate_for_build('file0.jar', 'bar', 6))
+
+    def test_missing_file(self):
+        report = self.J.validate_fingerprints({os.path.join(self.tmp, 'missing.jar'): None})
+        self.assertEquals(report.failed.keys(), [os.path.join(self.tmp, 'missing.jar')])
+        self.assertTrue(isinstance(report.failed.values()[0], IOError))
+
+    def test_unknown_fingerprint_is_valid(self):
+        fingerprint = Fingerprint(self.J.baseurl, '0' * 32, self.J)
+        self.assertTrue(fingerprint.valid())
+        self.assertTrue(fingerprint.unknown)
+
+
+class TestFingerprintCache(unittest.TestCase):
+
+    def test_least_recently_used_are_dropped(self):
+        cache = FingerprintCache(max_entries=2)
+        cache.store('http://x', 'a', {})
+        cache.store('http://x', 'b', {})
+        cache.get('http://x', 'a')
+        cache.store('http://x', 'c', {})
+        self.assertEquals(cache.get('http://x', 'b'), None)
+        self.assertEquals(cache.get('http://x', 'a'), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import mock
+import time
+import shutil
+import hashlib
+import tempfile
+import unittest
+
+from jenkinsapi.utils import hashing
+from jenkinsapi.utils.hashing import DigestCache
+
+
+class TestHashing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache = DigestCache()
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, content, age=60):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        then = time.time() - age
+        os.utime(path, (then, then))
+        return path
+
+    def test_md5sum(self):
+        path = self.write('small.jar', 'content')
+        self.assertEquals(hashing.md5sum(path, cache=False), hashlib.md5('content').hexdigest())
+
+    def test_mapped_file(self):
+        content = os.urandom(1000) * 300
+        path = self.write('large.jar', content)
+        with mock.patch.object(hashing, 'MMAP_THRESHOLD', 1000), mock.patch.object(hashing, 'MMAP_WINDOW', 4096):
+            self.assertEquals(hashing.md5sum(path, cache=False), hashlib.md5(content).hexdigest())
+
+    def test_unchanged_file_is_not_read_again(self):
+        path = self.write('foo.jar', 'content')
+        digest = hashing.md5sum(path, cache=self.cache)
+        with mock.patch.object(hashing, '_update_md5') as update_md5:
+            self.assertEquals(hashing.md5sum(path, cache=self.cache), digest)
+            self.assertFalse(update_md5.called)
+        self.assertEquals(self.cache.hits, 1)
+
+    def test_changed_file_is_hashed_again(self):
+        path = self.write('foo.jar', 'content')
+        hashing.md5sum(path, cache=self.cache)
+        self.write('foo.jar', 'changed', age=30)
+        self.assertEquals(hashing.md5sum(path, cache=self.cache), hashlib.md5('changed').hexdigest())
+
+    def test_recently_modified_file_is_not_cached(self):
+        path = self.write('foo.jar', 'content', age=0)
+        hashing.md5sum(path, cache=self.cache)
+        self.assertEquals(self.cache.get(path, os.stat(path)), None)
+
+    def test_cache_survives_process(self):
+        db = os.path.join(self.tmp, 'cache', 'digests.db')
+        path = self.write('foo.jar', 'content')
+        cache = DigestCache(db)
+        hashing.md5sum(path, cache=cache)
+        cache.close()
+        cache = DigestCache(db)
+        self.assertEquals(cache.get(path, os.stat(path)), hashlib.md5('content').hexdigest())
+        cache.close()
+
+    def test_md5sums(self):
+        paths = [self.write('file%i.jar' % number, 'content %i' % number) for number in range(5)]
+        missing = os.path.join(self.tmp, 'missing.jar')
+        digests, failed = hashing.md5sums(paths + [missing], workers=3, cache=self.cache)
+        self.assertEquals(digests, dict((path, hashlib.md5('content %i' % number).hexdigest())
+                                        for number, path in enumerate(paths)))
+        self.assertEquals(failed.keys(), [missing])
+        self.assertTrue(isinstance(failed[missing], IOError))
+
+
+if __name__ == '__main__':
+    unittest.main()
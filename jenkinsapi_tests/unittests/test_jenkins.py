@@ -29,6 +29,7 @@ class TestJenkins(unittest.TestCase):
         JJ = self.J._clone()
         self.assertNotEquals(id(JJ), id(self.J))
         self.assertEquals(JJ, self.J)
+        self.assertTrue(JJ.requester.session is self.J.requester.session)
 
     def test_stored_passwords(self):
         self.assertEquals(self.J.requester.password, 'foopassword')
@@ -281,6 +282,7 @@ class TestJenkins(unittest.TestCase):
 
         new_jenkins = J.get_jenkins_obj_from_url('http://localhost:8080/foo')
         self.assertNotEquals(new_jenkins, J)
+        self.assertTrue(new_jenkins.requester is J.requester)
 
     @mock.patch.object(JenkinsBase, '_poll')
     @mock.patch.object(Jenkins, '_poll')
@@ -171,5 +171,25 @@ class TestJob(unittest.TestCase):
         with self.assertRaises(NoBuildData):
             j.get_last_build()
 
+    def test_is_queued_fetches_queue_fields(self):
+        with mock.patch.object(JenkinsBase, 'get_data') as _get_data:
+            _get_data.return_value = {'inQueue': True, 'queueItem': {'id': 7}}
+            self.assertTrue(self.j.is_queued())
+            url, params = _get_data.call_args[0]
+            self.assertEquals(url, 'http://halob:8080/job/foo/%s' % config.JENKINS_API)
+            self.assertEquals(params, {'tree': Job.TREES['queue']})
+        # other fields are kept
+        self.assertEquals(self.j.get_description(), 'test job')
+
+    def test_lazy_job(self):
+        self.J.lazy = True
+        with mock.patch.object(JenkinsBase, 'get_data') as _get_data:
+            j = Job('http://halob:8080/job/foo/', 'foo', self.J)
+            self.assertFalse(_get_data.called)
+            _get_data.return_value = {'color': 'disabled'}
+            self.assertFalse(j.is_enabled())
+            _get_data.assert_called_once_with('http://halob:8080/job/foo/%s' % config.JENKINS_API,
+                                              {'tree': 'color'})
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,13 @@
+import re
+import time
 import mock
 import unittest
 
 from jenkinsapi import config
 from jenkinsapi.job import Job
+from jenkinsapi.jenkins import Jenkins
 from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
 
 
 class TestJobGetAllBuilds(unittest.TestCase):
@@ -126,11 +130,13 @@ class TestJobGetAllBuilds(unittest.TestCase):
 
     URL_DATA = {
         JOB1_API_URL: JOB1_DATA,
-        (JOB1_API_URL, str({'tree': 'allBuilds[number,url]'})): JOB1_ALL_BUILDS_DATA,
+        # the builds older than the one in JOB1_DATA
+        (JOB1_API_URL, str({'tree': 'allBuilds[number,url]{1,101}'})): {
+            "allBuilds": JOB1_ALL_BUILDS_DATA["allBuilds"][1:]},
         JOB2_API_URL: JOB2_DATA,
         JOB3_API_URL: JOB3_DATA,
         # this one below should never be used
-        (JOB3_API_URL, str({'tree': 'allBuilds[number,url]'})): JOB3_ALL_BUILDS_DATA,
+        (JOB3_API_URL, str({'tree': 'allBuilds[number,url]{1,101}'})): JOB3_ALL_BUILDS_DATA,
     }
 
     def fakeGetData(self, url, params=None):
@@ -152,6 +158,7 @@ class TestJobGetAllBuilds(unittest.TestCase):
         self.J = mock.MagicMock()  # Jenkins object
         self.j = Job('http://halob:8080/job/foo/', 'foo', self.J)
 
+    @mock.patch.object(JenkinsBase, 'get_data', fakeGetData)
     def test_get_build_dict(self):
         # The job data contains only one build, so we expect that the
         # remaining jobs will be fetched automatically
@@ -160,12 +167,17 @@ class TestJobGetAllBuilds(unittest.TestCase):
         self.assertEquals(len(ret), 4)
 
     @mock.patch.object(JenkinsBase, 'get_data', fakeGetData)
-    def test_incomplete_builds_list_will_call_jenkins_twice(self):
-        # The job data contains only one build, so we expect that the
-        # remaining jobs will be fetched automatically, and to have two calls to
-        # the Jenkins API
+    def test_incomplete_builds_list_is_paged_on_demand(self):
+        # The job data contains only one build, the remaining builds are
+        # fetched once they are needed, and only once
         TestJobGetAllBuilds.__get_data_call_count = 0
         self.j = Job('http://halob:8080/job/foo/', 'foo', self.J)
+        self.assertEquals(TestJobGetAllBuilds.__get_data_call_count, 1)
+        self.assertEquals(self.j._get_build_url(3), 'http://halob:8080/job/foo/3/')
+        self.assertEquals(TestJobGetAllBuilds.__get_data_call_count, 1)
+        self.assertEquals(self.j._get_build_url(2), 'http://halob:8080/job/foo/2/')
+        self.assertEquals(TestJobGetAllBuilds.__get_data_call_count, 2)
+        self.assertEquals(len(self.j.get_build_dict()), 4)
         self.assertEquals(TestJobGetAllBuilds.__get_data_call_count, 2)
 
     @mock.patch.object(JenkinsBase, 'get_data', fakeGetData)
@@ -183,6 +195,7 @@ class TestJobGetAllBuilds(unittest.TestCase):
         self.assertTrue(isinstance(ret, dict))
         self.assertEquals(len(ret), 0)
 
+    @mock.patch.object(JenkinsBase, 'get_data', fakeGetData)
     def test_get_build_ids(self):
         # The job data contains only one build, so we expect that the
         # remaining jobs will be fetched automatically
@@ -191,5 +204,90 @@ class TestJobGetAllBuilds(unittest.TestCase):
         self.assertEquals(len(ret), 4)
 
 
+class TestJobBuildPaging(unittest.TestCase):
+
+    JOB_API = '/job/big/api/json'
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        self.server.add_job('big', builds=250)
+        J = Jenkins(self.server.baseurl)
+        self.server.reset_requests()
+        self.j = Job(self.server.url('job/big'), 'big', J)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_pages_are_fetched_when_reached(self):
+        self.assertEquals(self.server.count(self.JOB_API), 1)
+        self.assertEquals(self.j.get_build(200).get_number(), 200)
+        self.assertEquals(self.server.count(self.JOB_API), 1)
+        self.assertEquals(self.j.get_build(120).get_number(), 120)
+        self.assertEquals(self.server.count(self.JOB_API), 2)
+        self.assertEquals(list(self.j.get_build_ids()), range(250, 0, -1))
+        self.assertEquals(self.server.count(self.JOB_API), 3)
+        self.assertEquals(len(self.j.get_build_dict()), 250)
+        self.assertEquals(self.server.count(self.JOB_API), 3)
+
+    def test_build_iter_stops_early(self):
+        for build in self.j.build_iter():
+            if build.get_number() == 160:
+                break
+        self.assertEquals(self.server.count(self.JOB_API), 1)
+
+    def test_poll_merges_new_builds(self):
+        self.j.get_build_dict()
+        job = self.server.get('job/big')
+        for number in (251, 252):
+            self.server.add_build('big', number)
+            ref = {'number': number, 'url': self.server.url('job/big/%i' % number)}
+            job['allBuilds'].insert(0, ref)
+            job['builds'] = job['allBuilds'][:100]
+            job['lastBuild'] = ref
+        self.j.poll()
+        self.assertEquals(len(self.j.get_build_dict()), 252)
+        self.assertEquals(self.j.get_build(252).get_number(), 252)
+
+    def test_new_builds_are_looked_up(self):
+        self.server.add_build('big', 251)
+        ref = {'number': 251, 'url': self.server.url('job/big/251')}
+        self.server.get('job/big')['allBuilds'].insert(0, ref)
+        self.assertEquals(self.j.get_build(251).get_number(), 251)
+
+
+class TestBuildIterPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins(latency=0.01).start()
+        self.server.add_job('big', builds=250)
+        self.j = Job(self.server.url('job/big'), 'big', Jenkins(self.server.baseurl))
+        self.server.reset_requests()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def build_requests(self):
+        return [path for _, path in self.server.requests if re.match(r'/job/big/\d+/api/json', path)]
+
+    def test_builds_are_yielded_in_order(self):
+        numbers = [build.get_number() for build in self.j.build_iter(prefetch=8)]
+        self.assertEquals(numbers, range(250, 0, -1))
+        self.assertEquals(len(self.build_requests()), 250)
+
+    def test_fields(self):
+        builds = list(self.j.build_iter(prefetch=4, fields='number,result'))
+        self.assertEquals(builds[-1].get_status(), 'SUCCESS')
+        self.assertTrue(all('tree=number%2Cresult' in path for path in self.build_requests()))
+        self.assertEquals(len(self.build_requests()), 250)
+
+    def test_early_termination(self):
+        for build in self.j.build_iter(prefetch=4):
+            if build.get_number() == 248:
+                break
+        # Let the fetches already sent finish
+        time.sleep(0.2)
+        self.assertTrue(len(self.build_requests()) <= 3 + 4)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,162 @@
+import json
+import time
+import threading
+import unittest
+
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.custom_exceptions import JenkinsAPIException, TimeOut
+from jenkinsapi.utils.executor import Executor, gather
+from jenkinsapi.utils.limiter import AdaptiveConcurrency, Limiter, TokenBucket, get_limiter
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, burst=2, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            bucket.acquire()
+        self.assertEquals([round(delay, 3) for delay in clock.sleeps], [0.1, 0.1])
+
+    def test_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, burst=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        clock.now += 1
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEquals(clock.sleeps, [])
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limit = AdaptiveConcurrency(initial=4, minimum=2, maximum=6, clock=self.clock)
+
+    def fill(self):
+        for _ in range(int(self.limit.limit)):
+            self.limit.acquire()
+
+    def test_bounds_requests_in_flight(self):
+        self.fill()
+        with self.assertRaises(TimeOut):
+            self.limit.acquire(timeout=0)
+
+    def test_grows_while_healthy(self):
+        for _ in range(20):
+            self.fill()
+            for _ in range(int(self.limit.limit)):
+                self.limit.release(0.1)
+        self.assertEquals(self.limit.limit, 6)
+
+    def test_shrinks_once_per_round_trip(self):
+        self.fill()
+        for _ in range(4):
+            self.limit.release(0.5, overloaded=True)
+        self.assertEquals(self.limit.limit, 4 * 0.7)
+        self.clock.now += 1
+        self.limit.acquire()
+        self.limit.release(0.5, overloaded=True)
+        self.clock.now += 1
+        self.limit.acquire()
+        self.limit.release(0.5, overloaded=True)
+        self.assertEquals(self.limit.limit, 2)
+
+    def test_shrinks_when_latency_rises(self):
+        for _ in range(20):
+            self.limit.acquire()
+            self.limit.release(0.1)
+        limit = self.limit.limit
+        for _ in range(5):
+            self.clock.now += 10
+            self.limit.acquire()
+            self.limit.release(1.0)
+        self.assertTrue(self.limit.limit < limit)
+
+    def test_latency_target(self):
+        self.limit.latency_target = 0.5
+        self.limit.acquire()
+        self.limit.release(2.0)
+        self.assertEquals(self.limit.decreases, 1)
+
+
+class TestLimitedRequester(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins(latency=0.05).start()
+        self.server.add_job('foo', builds=3)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_overload_shrinks_concurrency(self):
+        limiter = Limiter(initial=8, minimum=1)
+        J = Jenkins(self.server.baseurl, request_args={'limiter': limiter})
+        self.assertEquals(limiter.stats()['requests'], 1)
+        self.server.add_handler('GET', 'job/foo/api/json', lambda request, query: (503, '', {}))
+        with self.assertRaises(JenkinsAPIException):
+            J.get_job('foo')
+        self.assertEquals(limiter.stats()['limit'], 5)
+        self.assertEquals(limiter.stats()['in_flight'], 0)
+
+    def test_concurrency_is_bounded(self):
+        limiter = Limiter(initial=2, maximum=2)
+        J = Jenkins(self.server.baseurl, request_args={'limiter': limiter, 'coalesce': False})
+        job = J['foo']
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def handler(request, query):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return 200, json.dumps(self.server.get('job/foo')), {}
+        self.server.add_handler('GET', 'job/foo/api/json', handler)
+        with Executor(8) as executor:
+            gather([executor.submit(job.poll) for _ in range(8)])
+        self.assertEquals(in_flight[1], 2)
+        self.assertEquals(limiter.stats()['in_flight'], 0)
+
+    def test_streamed_body_keeps_its_slot(self):
+        self.server.add_file('job/foo/1/artifact/out.bin', 'x' * 1000)
+        limiter = Limiter(initial=1, maximum=1, timeout=0)
+        J = Jenkins(self.server.baseurl, request_args={'limiter': limiter})
+        url = self.server.url('job/foo/1/artifact/out.bin')
+        response = J.requester.get_url(url, stream=True)
+        self.assertEquals(limiter.stats()['in_flight'], 1)
+        with self.assertRaises(TimeOut):
+            J.requester.get_url(url, stream=True)
+        response.close()
+        response.close()
+        self.assertEquals(limiter.stats()['in_flight'], 0)
+        J.requester.get_url(url).close()
+        self.assertEquals(limiter.stats()['in_flight'], 0)
+
+    def test_shared_per_master(self):
+        limiter = get_limiter(self.server.baseurl)
+        self.assertTrue(get_limiter(self.server.url('job/foo')) is limiter)
+        self.assertFalse(get_limiter('http://elsewhere:8080') is limiter)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,8 @@ from jenkinsapi.jenkins import Jenkins
 from jenkinsapi.queue import Queue, QueueItem
 from jenkinsapi.jenkinsbase import JenkinsBase
 from jenkinsapi.job import Job
+from jenkinsapi.custom_exceptions import BadURL, NoBuildData, UnknownQueueItem, WillNotBuild
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
 
 
 class FourOhFourError(Exception):
@@ -143,5 +145,187 @@ class TestQueue(unittest.TestCase):
         j = item40.get_job()
         self.assertIsInstance(j, Job)
 
+    def test_getitem_unknown(self):
+        self.assertFalse(43 in self.q)
+        with self.assertRaises(UnknownQueueItem):
+            self.q[43]
+
+    def test_values(self):
+        self.assertEquals(sorted(item.id for item in self.q.values()), [40, 41, 42])
+
+    def test_get_queue_items_for_job(self):
+        items = self.q.get_queue_items_for_job('vluyhzzepl')
+        self.assertEquals([item.id for item in items], [41])
+        self.assertTrue(items[0].jenkins is self.J)
+        self.assertEquals(len(self.q.get_queue_items_for_job(None)), 3)
+        self.assertEquals(self.q.get_queue_items_for_job('nosuchjob'), [])
+
+
+class TestQueueIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        self.set_items([(1, 'foo', 'linux'), (2, 'bar', None), (3, 'foo', 'windows')])
+        self.J = Jenkins(self.server.baseurl)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def set_items(self, items):
+        self.server.set('queue', {'items': [{
+            'id': item_id,
+            'actions': [{'causes': [{'shortDescription': 'Started by user anonymous'}]}],
+            'blocked': False,
+            'buildable': True,
+            'stuck': False,
+            'why': 'Waiting for next available executor',
+            'task': {'name': name, 'url': self.server.url('job/%s' % name), 'color': 'blue'},
+            'assignedLabel': {'name': label} if label else None,
+        } for item_id, name, label in items]})
+
+    def test_lookups(self):
+        queue = self.J.get_queue()
+        self.assertEquals([item.id for item in queue.get_queue_items_for_job('foo')], [1, 3])
+        self.assertEquals([item.id for item in queue.get_queue_items_for_label('windows')], [3])
+        self.assertEquals([item.id for item in queue.get_queue_items_for_label(None)], [2])
+        self.assertEquals(sorted(queue.get_job_names()), ['bar', 'foo'])
+        self.assertEquals(str(queue[2]), 'bar #2')
+
+    def test_summary_fields(self):
+        self.server.reset_requests()
+        queue = self.J.get_queue(fields=Queue.SUMMARY_FIELDS)
+        self.assertEquals(self.server.requests[0][1].split('?')[0], '/queue/api/json')
+        self.assertFalse('actions' in queue._data['items'][0])
+        self.assertEquals([item.id for item in queue.get_queue_items_for_label('linux')], [1])
+
+    def test_poll_changes(self):
+        queue = self.J.get_queue()
+        self.set_items([(2, 'bar', None), (3, 'foo', 'windows'), (4, 'baz', None)])
+        added, removed = queue.poll_changes()
+        self.assertEquals([item.id for item in added], [4])
+        self.assertEquals([item.id for item in removed], [1])
+        self.assertEquals([item.id for item in queue.get_queue_items_for_job('baz')], [4])
+        self.assertEquals(queue.poll_changes(), ([], []))
+
+    def test_watch(self):
+        queue = self.J.get_queue()
+        self.set_items([(1, 'foo', 'linux')])
+        added, removed = next(queue.watch(interval=0.01))
+        self.assertEquals(added, [])
+        self.assertEquals(sorted(item.id for item in removed), [2, 3])
+
+class TestQueueItemResolution(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        self.server.add_job('foo', builds=3)
+        self.server.add_build('foo', 4)
+        self.server.set('queue/item/7', {'id': 7, 'url': 'queue/item/7/', 'why': 'Waiting',
+                                         'task': {'name': 'foo', 'url': self.server.url('job/foo')}})
+        self.server.add_handler('POST', 'job/foo/build', self.trigger)
+        self.J = Jenkins(self.server.baseurl)
+        self.job = self.J['foo']
+
+    def tearDown(self):
+        self.server.stop()
+
+    def trigger(self, request, query):
+        return 201, '', {'Location': self.server.url('queue/item/7')}
+
+    def start_build(self):
+        item = self.server.get('queue/item/7')
+        item['executable'] = {'number': 4, 'url': self.server.url('job/foo/4')}
+        item.pop('why')
+
+    def test_from_url(self):
+        item = QueueItem.from_url(self.J, self.server.url('queue/item/7'))
+        self.assertEquals(item.id, 7)
+        self.assertEquals(str(item), 'queue item #7')
+        self.assertEquals(item.poll().get_build_number(), None)
+        self.assertEquals(str(item), 'foo #7')
+        with self.assertRaises(BadURL):
+            QueueItem.from_url(self.J, self.server.url('job/foo'))
+
+    def test_wait_for_build(self):
+        item = QueueItem.from_url(self.J, self.server.url('queue/item/7'))
+        self.start_build()
+        self.server.reset_requests()
+        build = item.wait_for_build(timeout=5, delay=0.1)
+        self.assertEquals(build.buildno, 4)
+        self.assertEquals(self.server.requests[0][1].split('?')[0], '/queue/item/7/api/json')
+
+    def test_cancelled(self):
+        item = QueueItem.from_url(self.J, self.server.url('queue/item/7'))
+        self.server.get('queue/item/7')['cancelled'] = True
+        with self.assertRaises(WillNotBuild):
+            item.wait_for_build(timeout=5, delay=0.1)
+
+    def test_expired(self):
+        item = QueueItem.from_url(self.J, self.server.url('queue/item/8'))
+        with self.assertRaises(UnknownQueueItem):
+            item.poll()
+
+    def test_invoke_follows_location(self):
+        self.server.reset_requests()
+        invocation = self.job.invoke()
+        self.assertEquals(invocation.queue_item.id, 7)
+        self.assertFalse([path for method, path in self.server.requests if 'allBuilds' in path])
+        self.server.reset_requests()
+        self.assertTrue(invocation.is_queued())
+        self.start_build()
+        self.assertFalse(invocation.is_queued())
+        self.assertEquals(invocation.get_build_number(), 4)
+        # Only the queue item was polled
+        self.assertEquals(self.server.count(), 2)
+        self.assertEquals(self.server.count('/queue/item/7/api/json'), 2)
+        self.assertEquals(invocation.get_build().buildno, 4)
+        self.assertEquals(self.server.count('/job/foo/api/json'), 0)
+
+    def run_build(self, number, queue_id):
+        """
+        Make the job list a new build started for the queue item queue_id.
+        """
+        ref = {'number': number, 'url': self.server.url('job/foo/%i' % number), 'queueId': queue_id}
+        self.server.add_build('foo', number, queueId=queue_id)
+        job = self.server.get('job/foo')
+        job['allBuilds'].insert(0, ref)
+        job['builds'].insert(0, ref)
+        job['lastBuild'] = ref
+        job['nextBuildNumber'] = number + 1
+
+    def test_forgotten_item_is_found_in_the_builds(self):
+        invocation = self.job.invoke()
+        del self.server.documents['queue/item/7']
+        self.run_build(4, 7)
+        self.run_build(5, 9)
+        self.assertFalse(invocation.is_queued())
+        self.assertFalse(invocation.is_queued_or_running())
+        self.assertEquals(invocation.get_build_number(), 4)
+        self.assertEquals(invocation.get_build().buildno, 4)
+
+    def test_forgotten_item_still_queued(self):
+        invocation = self.job.invoke()
+        del self.server.documents['queue/item/7']
+        self.server.get('job/foo')['inQueue'] = True
+        self.assertTrue(invocation.is_queued())
+        with self.assertRaises(NoBuildData):
+            invocation.get_build_number()
+
+    def test_without_location(self):
+        def trigger(request, query):
+            # Jenkins before 1.519 neither says where the item went nor serves it
+            self.server.get('job/foo').update(inQueue=True, queueItem={'id': 7, 'url': 'queue/item/7/'})
+            return 201, '', {}
+        self.server.add_handler('POST', 'job/foo/build', trigger)
+        del self.server.documents['queue/item/7']
+        invocation = self.job.invoke(invoke_pre_check_delay=0)
+        self.assertEquals(invocation.queue_item.id, 7)
+        self.assertTrue(invocation.is_queued())
+        self.server.get('job/foo').update(inQueue=False, queueItem=None)
+        self.run_build(4, 7)
+        self.assertFalse(invocation.is_queued())
+        self.assertEquals(invocation.get_build_number(), 4)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,13 @@
 import mock
+import time
 import unittest
+import threading
+from StringIO import StringIO
 
 import requests
 from jenkinsapi.jenkins import Requester
 from jenkinsapi.custom_exceptions import JenkinsAPIException
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
 
 
 class TestQueue(unittest.TestCase):
@@ -94,7 +98,7 @@ class TestQueue(unittest.TestCase):
         self.assertTrue(isinstance(req_return, dict))
         self.assertFalse(req_return.get('data'))
 
-    @mock.patch.object(requests, 'get')
+    @mock.patch.object(requests.Session, 'get')
     def test_get_url_get(self, _get):
         _get.return_value = 'SUCCESS'
         req = Requester('foo', 'bar')
@@ -104,7 +108,7 @@ class TestQueue(unittest.TestCase):
             headers=None)
         self.assertEqual(response, 'SUCCESS')
 
-    @mock.patch.object(requests, 'post')
+    @mock.patch.object(requests.Session, 'post')
     def test_get_url_post(self, _post):
         _post.return_value = 'SUCCESS'
         req = Requester('foo', 'bar')
@@ -114,7 +118,7 @@ class TestQueue(unittest.TestCase):
             headers=None)
         self.assertEqual(response, 'SUCCESS')
 
-    @mock.patch.object(requests, 'post')
+    @mock.patch.object(requests.Session, 'post')
     def test_post_xml_and_confirm_status_empty_xml(self, _post):
         _post.return_value = 'SUCCESS'
         req = Requester('foo', 'bar')
@@ -128,7 +132,7 @@ class TestQueue(unittest.TestCase):
         self.assertEqual(ae.exception.message,
                          "Unexpected type of parameter 'data': <type 'NoneType'>. Expected (str, dict)")
 
-    @mock.patch.object(requests, 'post')
+    @mock.patch.object(requests.Session, 'post')
     def test_post_xml_and_confirm_status_some_xml(self, _post):
         response = requests.Response()
         response.status_code = 200
@@ -141,7 +145,7 @@ class TestQueue(unittest.TestCase):
         )
         self.assertTrue(isinstance(ret, requests.Response))
 
-    @mock.patch.object(requests, 'post')
+    @mock.patch.object(requests.Session, 'post')
     def test_post_and_confirm_status_empty_data(self, _post):
         _post.return_value = 'SUCCESS'
         req = Requester('foo', 'bar')
@@ -155,7 +159,7 @@ class TestQueue(unittest.TestCase):
         self.assertEqual(ae.exception.message,
                          "Unexpected type of parameter 'data': <type 'NoneType'>. Expected (str, dict)")
 
-    @mock.patch.object(requests, 'post')
+    @mock.patch.object(requests.Session, 'post')
     def test_post_and_confirm_status_some_data(self, _post):
         response = requests.Response()
         response.status_code = 200
@@ -168,7 +172,7 @@ class TestQueue(unittest.TestCase):
         )
         self.assertTrue(isinstance(ret, requests.Response))
 
-    @mock.patch.object(requests, 'post')
+    @mock.patch.object(requests.Session, 'post')
     def test_post_and_confirm_status_bad_result(self, _post):
         response = requests.Response()
         response.status_code = 500
@@ -186,7 +190,7 @@ class TestQueue(unittest.TestCase):
         self.assertEqual(ae.exception.message,
                          "Operation failed. url=None, data=some data, headers={'Content-Type': 'application/x-www-form-urlencoded'}, status=500, text=")
 
-    @mock.patch.object(requests, 'get')
+    @mock.patch.object(requests.Session, 'get')
     def test_get_and_confirm_status(self, _get):
         response = requests.Response()
         response.status_code = 200
@@ -198,7 +202,7 @@ class TestQueue(unittest.TestCase):
         )
         self.assertTrue(isinstance(ret, requests.Response))
 
-    @mock.patch.object(requests, 'get')
+    @mock.patch.object(requests.Session, 'get')
     def test_get_and_confirm_status_bad_result(self, _get):
         response = requests.Response()
         response.status_code = 500
@@ -215,6 +219,132 @@ class TestQueue(unittest.TestCase):
         self.assertEqual(ae.exception.message,
                          "Operation failed. url=None, headers=None, status=500, text=")
 
+    def test_session_is_pooled(self):
+        req = Requester('foo', 'bar', pool_connections=3, pool_maxsize=7)
+        self.assertTrue(isinstance(req.session, requests.Session))
+        adapter = req.session.get_adapter('http://dummy')
+        self.assertEqual(adapter._pool_connections, 3)
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertTrue(adapter is req.session.get_adapter('https://dummy'))
+
+    def test_session_without_keep_alive(self):
+        req = Requester('foo', 'bar', keep_alive=False)
+        self.assertEqual(req.session.headers['Connection'], 'close')
+
+    def test_session_retries_with_backoff(self):
+        req = Requester('foo', 'bar', max_retries=3, backoff_factor=0.5)
+        retries = req.session.get_adapter('http://dummy').max_retries
+        self.assertEqual(retries.total, 3)
+        self.assertEqual(retries.backoff_factor, 0.5)
+
+    @mock.patch.object(requests.Session, 'get')
+    def test_get_url_reuses_session(self, _get):
+        _get.return_value = 'SUCCESS'
+        req = Requester('foo', 'bar')
+        req.get_url('http://dummy')
+        req.get_url('http://dummy')
+        self.assertEqual(_get.call_count, 2)
+
+
+class TestCrumb(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        self.crumb = 'abc'
+        self.received = []
+        self.bodies = []
+        self.refusal_delay = 0
+        self.server.set('crumbIssuer', {'crumb': self.crumb, 'crumbRequestField': 'Jenkins-Crumb'})
+        self.server.add_handler('POST', 'job/foo/build', self.build)
+        self.req = Requester(baseurl=self.server.baseurl)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def build(self, request, query):
+        crumb = request.headers.get('Jenkins-Crumb')
+        self.received.append(crumb)
+        self.bodies.append(request.rfile.read(int(request.headers.get('Content-Length', 0))))
+        if 'crumbIssuer' in self.server.documents and crumb != self.server.get('crumbIssuer')['crumb']:
+            time.sleep(self.refusal_delay)
+            return 403, 'No valid crumb was included in the request', {}
+        return 201, '', {}
+
+    def post(self):
+        return self.req.post_and_confirm_status(self.server.url('job/foo/build'), data={}, valid=[201])
+
+    def test_crumb_is_fetched_once(self):
+        for _ in range(5):
+            self.post()
+        self.assertEquals(self.received, ['abc'] * 5)
+        self.assertEquals(self.server.count('/crumbIssuer/api/json'), 1)
+
+    def test_expired_crumb_is_refreshed(self):
+        self.post()
+        self.server.get('crumbIssuer')['crumb'] = 'def'
+        self.post()
+        self.post()
+        self.assertEquals(self.received, ['abc', 'abc', 'def', 'def'])
+        self.assertEquals(self.server.count('/crumbIssuer/api/json'), 2)
+
+    def test_upload_is_sent_again_whole(self):
+        self.post()
+        self.server.get('crumbIssuer')['crumb'] = 'def'
+        self.req.post_and_confirm_status(self.server.url('job/foo/build'), data={},
+                                         files={'file0': ('a.txt', StringIO('content'))}, valid=[201])
+        self.assertEquals(self.received, ['abc', 'abc', 'def'])
+        self.assertIn('content', self.bodies[1])
+        self.assertIn('content', self.bodies[2])
+
+    def test_upload_which_cannot_rewind_is_not_sent_again(self):
+        class Stream(object):
+            def read(self):
+                return 'content'
+        self.post()
+        self.server.get('crumbIssuer')['crumb'] = 'def'
+        with self.assertRaises(JenkinsAPIException):
+            self.req.post_and_confirm_status(self.server.url('job/foo/build'), data={},
+                                             files={'file0': Stream()}, valid=[201])
+        self.assertEquals(self.received, ['abc', 'abc'])
+        self.post()
+        self.assertEquals(self.received[-1], 'def')
+
+    def test_concurrent_refusals_fetch_one_crumb(self):
+        self.post()
+        self.server.get('crumbIssuer')['crumb'] = 'def'
+        self.refusal_delay = 0.1
+        threads = [threading.Thread(target=self.post) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(self.received.count('def'), 8)
+        self.assertEquals(self.server.count('/crumbIssuer/api/json'), 2)
+
+    def test_without_crumb_issuer(self):
+        del self.server.documents['crumbIssuer']
+        self.post()
+        self.post()
+        self.assertEquals(self.received, [None, None])
+        self.assertEquals(self.server.count('/crumbIssuer/api/json'), 1)
+
+    def test_failed_fetch_is_kept(self):
+        del self.server.documents['crumbIssuer']
+        for answer in [(403, 'Forbidden', {}), (200, '<html>Log in</html>', {})]:
+            self.req = Requester(baseurl=self.server.baseurl)
+            self.server.reset_requests()
+            self.server.add_handler('GET', 'crumbIssuer/api/json', lambda request, query: answer)
+            self.post()
+            self.post()
+            self.assertEquals(self.server.count('/crumbIssuer/api/json'), 1)
+        self.assertEquals(self.received, [None] * 4)
+
+    def test_disabled(self):
+        self.req = Requester(baseurl=self.server.baseurl, crumb=False)
+        del self.server.documents['crumbIssuer']
+        self.post()
+        self.assertEquals(self.server.count('/crumbIssuer/api/json'), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
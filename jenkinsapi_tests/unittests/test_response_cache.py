@@ -0,0 +1,128 @@
+import mock
+import unittest
+
+import requests
+from jenkinsapi.utils.requester import Requester
+from jenkinsapi.utils.response_cache import ResponseCache
+
+
+def make_response(content='{}', status_code=200, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+class TestResponseCache(unittest.TestCase):
+
+    JOB_URL = 'http://localhost:8080/job/foo/api/json'
+
+    def setUp(self):
+        self.cache = ResponseCache(default_ttl=10)
+        self.get = mock.MagicMock(return_value=make_response())
+
+    def test_hit_and_miss(self):
+        first = self.cache.fetch(self.JOB_URL, None, None, self.get)
+        second = self.cache.fetch(self.JOB_URL, None, None, self.get)
+        self.assertTrue(first is second)
+        self.assertEquals(self.get.call_count, 1)
+        self.assertEquals(self.cache.hits, 1)
+        self.assertEquals(self.cache.misses, 1)
+
+    def test_key_includes_tree(self):
+        self.cache.fetch(self.JOB_URL, {'tree': 'color'}, None, self.get)
+        self.cache.fetch(self.JOB_URL, {'tree': 'inQueue'}, None, self.get)
+        self.assertEquals(self.get.call_count, 2)
+
+    @mock.patch('jenkinsapi.utils.response_cache.time')
+    def test_expiry(self, _time):
+        _time.time.return_value = 1000
+        self.cache.fetch(self.JOB_URL, None, None, self.get)
+        _time.time.return_value = 1011
+        self.cache.fetch(self.JOB_URL, None, None, self.get)
+        self.assertEquals(self.get.call_count, 2)
+
+    def test_per_resource_ttl(self):
+        cache = ResponseCache(default_ttl=10, ttls=[(r'/queue/', 1)])
+        self.assertEquals(cache.ttl_for('http://localhost:8080/queue/api/json'), 1)
+        self.assertEquals(cache.ttl_for(self.JOB_URL), 10)
+
+    @mock.patch('jenkinsapi.utils.response_cache.time')
+    def test_conditional_revalidation(self, _time):
+        _time.time.return_value = 1000
+        self.get.return_value = make_response(headers={'ETag': '"abc"'})
+        first = self.cache.fetch(self.JOB_URL, None, None, self.get)
+        _time.time.return_value = 1011
+        self.get.return_value = make_response(content='', status_code=304)
+        second = self.cache.fetch(self.JOB_URL, None, None, self.get)
+        self.assertTrue(first is second)
+        self.get.assert_called_with({'If-None-Match': '"abc"'})
+        self.assertEquals(self.cache.revalidations, 1)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_bytes=10)
+        get = lambda headers: make_response(content='x' * 4)
+        for name in ('a', 'b', 'a', 'c'):
+            cache.fetch('http://localhost:8080/job/%s/api/json' % name, None, None, get)
+        # b was the least recently used entry
+        self.assertEquals([key[0] for key in cache._entries],
+                          ['http://localhost:8080/job/a/api/json',
+                           'http://localhost:8080/job/c/api/json'])
+        self.assertEquals(cache.evictions, 1)
+        self.assertEquals(cache.size, 8)
+
+    def test_errors_are_not_cached(self):
+        self.get.return_value = make_response(status_code=500)
+        self.cache.fetch(self.JOB_URL, None, None, self.get)
+        self.assertEquals(len(self.cache), 0)
+
+    def test_invalidate_related_resources(self):
+        urls = ['http://localhost:8080/api/json',
+                'http://localhost:8080/job/foo/api/json',
+                'http://localhost:8080/job/foo/1/api/json',
+                'http://localhost:8080/job/bar/api/json']
+        for url in urls:
+            self.cache.fetch(url, None, None, self.get)
+        self.cache.invalidate('http://localhost:8080/job/foo/')
+        self.assertEquals([key[0] for key in self.cache._entries], urls[3:])
+        self.cache.invalidate()
+        self.assertEquals(len(self.cache), 0)
+        self.assertEquals(self.cache.size, 0)
+
+
+class TestRequesterCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        self.req = Requester('foo', 'bar', cache=self.cache)
+
+    @mock.patch.object(requests.Session, 'get')
+    def test_only_api_urls_are_cached(self, _get):
+        _get.return_value = make_response()
+        self.req.get_url('http://localhost:8080/job/foo/1/consoleText')
+        self.req.get_url('http://localhost:8080/job/foo/1/consoleText')
+        self.req.get_url('http://localhost:8080/job/foo/api/json')
+        self.req.get_url('http://localhost:8080/job/foo/api/json')
+        self.assertEquals(_get.call_count, 3)
+        self.assertEquals(self.cache.stats()['hits'], 1)
+
+    @mock.patch.object(requests.Session, 'post')
+    @mock.patch.object(requests.Session, 'get')
+    def test_post_invalidates(self, _get, _post):
+        _get.return_value = make_response()
+        _post.return_value = make_response()
+        self.req.get_url('http://localhost:8080/job/foo/api/json')
+        self.req.post_and_confirm_status('http://localhost:8080/job/foo/build', data='')
+        self.req.get_url('http://localhost:8080/job/foo/api/json')
+        self.assertEquals(_get.call_count, 2)
+
+    def test_parent_url(self):
+        for url in ('http://localhost:8080/job/foo/build?token=a/b',
+                    'http://localhost:8080/job/foo/doDelete/',
+                    'http://localhost:8080/job/foo/config.xml'):
+            self.assertEquals(Requester._parent_url(url), 'http://localhost:8080/job/foo/')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+import json
+import time
+import mock
+import threading
+import requests
+import unittest
+
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.custom_exceptions import CircuitOpen, JenkinsAPIException
+from jenkinsapi.utils.executor import Executor, gather
+from jenkinsapi.utils.retry import CircuitBreaker, Hedger, RetryPolicy
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.url = 'http://localhost/'
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(retries=2, initial=1, maximum=10)
+        self.sleeps = []
+
+    def call(self, method, outcomes):
+        outcomes = list(outcomes)
+
+        def send():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return self.policy.call(method, send, sleep=self.sleeps.append)
+
+    def test_transient_status_is_retried(self):
+        response = self.call('GET', [FakeResponse(502), FakeResponse(503), FakeResponse(200)])
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(self.sleeps), 2)
+        self.assertTrue(self.sleeps[0] < self.sleeps[1])
+
+    def test_gives_up(self):
+        response = self.call('GET', [FakeResponse(503)] * 3)
+        self.assertEquals(response.status_code, 503)
+        with self.assertRaises(requests.ConnectionError):
+            self.call('GET', [requests.ConnectionError()] * 3)
+
+    def test_retry_after(self):
+        self.call('GET', [FakeResponse(503, {'Retry-After': '7'}), FakeResponse(200)])
+        self.assertEquals(self.sleeps, [7.0])
+        self.call('GET', [FakeResponse(429, {'Retry-After': '120'}), FakeResponse(200)])
+        self.assertEquals(self.sleeps[-1], 10)
+        date = FakeResponse(503, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEquals(RetryPolicy.retry_after(date), 0.0)
+
+    def test_only_transient_failures_are_retried(self):
+        self.assertEquals(self.call('GET', [FakeResponse(500)]).status_code, 500)
+        self.assertEquals(self.call('POST', [FakeResponse(503)]).status_code, 503)
+        with self.assertRaises(ValueError):
+            self.call('GET', [ValueError()])
+        self.assertEquals(self.sleeps, [])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.breaker = CircuitBreaker(failures=3, reset_timeout=30, clock=lambda: self.now)
+
+    def test_opens_and_recovers(self):
+        for _ in range(3):
+            self.breaker.call(lambda: FakeResponse(503))
+        self.assertEquals(self.breaker.state, CircuitBreaker.OPEN)
+        send = mock.Mock(return_value=FakeResponse(200))
+        with self.assertRaises(CircuitOpen):
+            self.breaker.call(send)
+        self.assertFalse(send.called)
+        self.now += 30
+        self.assertEquals(self.breaker.call(send).status_code, 200)
+        self.assertEquals(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_opens_again(self):
+        for _ in range(3):
+            with self.assertRaises(requests.ConnectionError):
+                self.breaker.call(mock.Mock(side_effect=requests.ConnectionError()))
+        self.now += 30
+        self.breaker.call(lambda: FakeResponse(502))
+        self.assertEquals(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.call(lambda: FakeResponse(200))
+
+    def test_interrupted_trial(self):
+        for _ in range(3):
+            self.breaker.call(lambda: FakeResponse(503))
+        self.now += 30
+        with self.assertRaises(KeyboardInterrupt):
+            self.breaker.call(mock.Mock(side_effect=KeyboardInterrupt()))
+        self.assertEquals(self.breaker.state, CircuitBreaker.OPEN)
+        # The next request is the trial
+        self.assertEquals(self.breaker.call(lambda: FakeResponse(200)).status_code, 200)
+        self.assertEquals(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_success_resets_the_count(self):
+        for status in (503, 503, 200, 503, 503):
+            self.breaker.call(lambda: FakeResponse(status))
+        self.assertEquals(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEquals(self.breaker.call(lambda: FakeResponse(500)).status_code, 500)
+        self.assertEquals(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestHedger(unittest.TestCase):
+
+    def setUp(self):
+        self.hedger = Hedger(0.05, max_workers=2)
+
+    def tearDown(self):
+        self.hedger.shutdown()
+
+    def sender(self, outcomes):
+        """
+        A send function answering with the (delay, outcome) pairs in turn,
+        recording the threads it ran on and the peak of sends running at
+        once on the pool.
+        """
+        self.threads = []
+        self.running = self.peak = 0
+        lock = threading.Lock()
+
+        def send():
+            with lock:
+                self.threads.append(threading.current_thread())
+                delay, outcome = outcomes.pop(0) if isinstance(outcomes, list) else outcomes
+                pooled = threading.current_thread().name.startswith('hedge')
+                self.running += pooled
+                self.peak = max(self.peak, self.running)
+            time.sleep(delay)
+            with lock:
+                self.running -= pooled
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return send
+
+    def settle(self):
+        """
+        Wait for the attempts still under way.
+        """
+        self.hedger._executor.shutdown(wait=True)
+
+    def test_fast_answer_is_not_hedged(self):
+        send = self.sender([(0, FakeResponse(200))])
+        self.assertEquals(self.hedger.call(send).status_code, 200)
+        self.assertEquals(self.hedger.hedged, 0)
+        self.assertEquals(len(self.threads), 1)
+
+    def test_faster_copy_wins(self):
+        first, second = FakeResponse(200), FakeResponse(200)
+        send = self.sender([(0.5, first), (0, second)])
+        self.assertTrue(self.hedger.call(send) is second)
+        self.assertEquals((self.hedger.hedged, self.hedger.wins), (1, 1))
+        self.assertFalse(second.closed)
+        self.settle()
+        self.assertTrue(first.closed)
+
+    def test_first_answer_wins_over_a_slower_copy(self):
+        first, second = FakeResponse(200), FakeResponse(200)
+        send = self.sender([(0.1, first), (0.5, second)])
+        self.assertTrue(self.hedger.call(send) is first)
+        self.assertEquals((self.hedger.hedged, self.hedger.wins), (1, 0))
+        self.settle()
+        self.assertTrue(second.closed)
+
+    def test_copy_stands_in_for_a_failure(self):
+        second = FakeResponse(200)
+        send = self.sender([(0.3, requests.ConnectionError()), (0.4, second)])
+        self.assertTrue(self.hedger.call(send) is second)
+        self.assertEquals((self.hedger.hedged, self.hedger.wins), (1, 1))
+
+    def test_failure_of_both_is_the_first(self):
+        failed = FakeResponse(503)
+        send = self.sender([(0.3, failed), (0, requests.ConnectionError())])
+        self.assertTrue(self.hedger.call(send) is failed)
+        send = self.sender([(0.3, requests.ConnectionError()), (0, FakeResponse(503))])
+        with self.assertRaises(requests.ConnectionError):
+            self.hedger.call(send)
+
+    def test_no_copy_without_a_free_thread(self):
+        for _ in range(2):
+            self.hedger._slots.acquire()
+        send = self.sender([(0.2, FakeResponse(200))])
+        self.assertEquals(self.hedger.call(send).status_code, 200)
+        self.assertEquals((self.hedger.hedged, self.hedger.skipped), (0, 1))
+        self.assertEquals(self.threads, [threading.current_thread()])
+
+    def test_concurrent_calls_do_not_queue(self):
+        send = self.sender((0.2, FakeResponse(200)))
+        with Executor(8) as executor:
+            gather([executor.submit(self.hedger.call, send) for _ in range(8)])
+        self.settle()
+        # The pool never has more attempts than threads, those which find
+        # none busy are sent at once on the callers' threads
+        self.assertTrue(self.peak <= 2, self.peak)
+        self.assertEquals(len(self.threads), 8 + self.hedger.hedged)
+        callers = [t for t in self.threads if not t.name.startswith('hedge')]
+        self.assertEquals(len(callers), self.hedger.skipped)
+
+
+class TestResilientRequester(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        self.server.add_job('foo', builds=3)
+        self.failures = 2
+
+    def tearDown(self):
+        self.server.stop()
+
+    def flaky(self, request, query):
+        if self.failures:
+            self.failures -= 1
+            return 502, 'Bad Gateway', {}
+        return 200, json.dumps(self.server.get('job/foo')), {}
+
+    def test_transient_errors_are_retried(self):
+        J = Jenkins(self.server.baseurl, request_args={'retry': RetryPolicy(initial=0.01)})
+        self.server.add_handler('GET', 'job/foo/api/json', self.flaky)
+        self.assertEquals(J['foo'].get_next_build_number(), 4)
+        self.assertEquals(self.server.count('/job/foo/api/json'), 3)
+        self.assertEquals(J.requester.retry.retried, 2)
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failures=2)
+        J = Jenkins(self.server.baseurl, request_args={'circuit_breaker': breaker})
+        self.server.add_handler('GET', 'job/foo/api/json', self.flaky)
+        for _ in range(2):
+            with self.assertRaises(JenkinsAPIException):
+                J.get_job('foo')
+        self.server.reset_requests()
+        with self.assertRaises(CircuitOpen):
+            J.get_job('foo')
+        self.assertEquals(self.server.count(), 0)
+
+    def test_close_stops_the_hedger(self):
+        J = Jenkins(self.server.baseurl, request_args={'hedge_after': 0.5})
+        J.requester.close()
+        self.assertTrue(J.requester.hedger._executor._shutdown)
+        # Still usable, without hedging
+        self.assertEquals(J['foo'].get_next_build_number(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
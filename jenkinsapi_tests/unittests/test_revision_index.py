@@ -0,0 +1,160 @@
+import os
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import unittest
+
+from jenkinsapi.job import Job
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.custom_exceptions import NotFound
+from jenkinsapi.utils.revision_index import RevisionIndex
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+GIT_CONFIG = '<project><scm class="hudson.plugins.git.GitSCM"/></project>'
+
+
+def sha(number):
+    return hashlib.sha1(str(number)).hexdigest()
+
+
+class TestRevisionIndex(unittest.TestCase):
+
+    JOB_API = '/job/foo/api/json'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'index', 'revisions.db')
+        self.server = FakeJenkins().start()
+        self.server.add_job('foo', builds=0)
+        self.server.add_file('job/foo/config.xml', GIT_CONFIG)
+        self.add_builds(1, 30)
+        self.index = RevisionIndex(self.path)
+        self.j = Job(self.server.url('job/foo'), 'foo', Jenkins(self.server.baseurl))
+
+    def tearDown(self):
+        self.index.close()
+        self.server.stop()
+        shutil.rmtree(self.tmp)
+
+    def add_builds(self, first, last, **fields):
+        job = self.server.get('job/foo')
+        for number in range(first, last + 1):
+            # Two builds for each revision
+            actions = [{'lastBuiltRevision': {'SHA1': sha(number // 2)}}]
+            build = self.server.add_build('foo', number, actions=actions, **fields)
+            job['allBuilds'].insert(0, build)
+            job['lastBuild'] = {'number': number, 'url': build['url']}
+
+    def test_lookup(self):
+        self.assertEquals(self.index.update(self.j), 30)
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(7)), [15, 14])
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(7)[:-1]), [])
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(7)[:12].upper(), prefix=True), [15, 14])
+        self.assertEquals(self.index.lookup(self.j.baseurl, 'abc'), [])
+
+    def test_incremental_update(self):
+        self.index.update(self.j)
+        self.add_builds(31, 35)
+        self.server.reset_requests()
+        self.assertEquals(self.index.update(self.j), 5)
+        # The last build, then the new builds only
+        self.assertEquals(self.server.count(self.JOB_API), 2)
+        self.assertEquals(self.index.last_indexed(self.j.baseurl), 35)
+        self.server.reset_requests()
+        self.assertEquals(self.index.update(self.j), 0)
+        self.assertEquals(self.server.count(self.JOB_API), 1)
+
+    def test_running_builds_are_indexed_later(self):
+        self.add_builds(31, 31, building=True, result=None)
+        self.add_builds(32, 32)
+        self.assertEquals(self.index.update(self.j), 31)
+        self.assertEquals(self.index.last_indexed(self.j.baseurl), 30)
+        self.server.get('job/foo/31').update(building=False, result='SUCCESS')
+        self.assertEquals(self.index.update(self.j), 2)
+        self.assertEquals(self.index.last_indexed(self.j.baseurl), 32)
+
+    def test_persists(self):
+        self.index.update(self.j)
+        self.index.close()
+        self.index = RevisionIndex(self.path)
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(3)), [7, 6])
+
+    def test_first_layout_is_migrated(self):
+        self.index.close()
+        os.remove(self.path)
+        db = sqlite3.connect(self.path)
+        db.executescript("""
+            CREATE TABLE jobs (url TEXT PRIMARY KEY, last_number INTEGER NOT NULL);
+            CREATE TABLE builds (url TEXT NOT NULL, number INTEGER NOT NULL, revision TEXT,
+                                 PRIMARY KEY (url, number));
+        """)
+        with db:
+            db.execute('INSERT INTO jobs VALUES (?, 30)', (self.j.baseurl,))
+            db.executemany('INSERT INTO builds VALUES (?, ?, ?)',
+                           [(self.j.baseurl, n, sha(n // 2)) for n in range(1, 31)])
+        db.close()
+        self.index = RevisionIndex(self.path)
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(3)), [7, 6])
+        self.server.reset_requests()
+        self.assertEquals(self.index.update(self.j), 0)
+        self.add_builds(31, 31)
+        self.assertEquals(self.index.update(self.j), 1)
+        tables = [row[0] for row in self.index._query("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        self.assertFalse('builds' in tables or 'jobs' in tables)
+
+    def test_jobs_without_timestamp_are_migrated(self):
+        self.index.update(self.j)
+        self.index.close()
+        db = sqlite3.connect(self.path)
+        with db:
+            db.executescript("""
+                ALTER TABLE revision_jobs RENAME TO old_jobs;
+                CREATE TABLE revision_jobs (url TEXT PRIMARY KEY, last_number INTEGER NOT NULL);
+                INSERT INTO revision_jobs SELECT url, last_number FROM old_jobs;
+                DROP TABLE old_jobs;
+            """)
+        db.close()
+        self.index = RevisionIndex(self.path)
+        self.add_builds(31, 32)
+        self.assertEquals(self.index.update(self.j), 2)
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(16)), [32])
+
+    def test_recreated_job(self):
+        self.index.update(self.j)
+        job = self.server.get('job/foo')
+        del job['allBuilds'][:]
+        # Started after every build of the job it replaced
+        self.add_builds(1, 2, timestamp=1390000000000)
+        self.index.update(self.j)
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(7)), [])
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(1)), [2])
+
+    def test_deleted_newest_builds(self):
+        self.index.update(self.j)
+        job = self.server.get('job/foo')
+        del job['allBuilds'][:2]
+        job['lastBuild'] = job['allBuilds'][0]
+        self.server.reset_requests()
+        self.assertEquals(self.index.update(self.j), 0)
+        # The last build, then the build it now is: no reindexing
+        self.assertEquals(self.server.count(self.JOB_API), 2)
+        self.assertEquals(self.index.last_indexed(self.j.baseurl), 28)
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(14)), [28])
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(15)), [])
+        self.assertEquals(self.index.lookup(self.j.baseurl, sha(7)), [15, 14])
+
+    def test_get_buildnumber_for_revision(self):
+        self.assertEquals(self.j.get_buildnumber_for_revision(sha(10)[:8], index=self.index), [21, 20])
+        self.add_builds(31, 32)
+        self.server.reset_requests()
+        # Found without asking Jenkins
+        self.assertEquals(self.j.get_buildnumber_for_revision(sha(10), index=self.index), [21, 20])
+        self.assertEquals(self.server.count(), 0)
+        # Not indexed yet: the index is updated
+        self.assertEquals(self.j.get_buildnumber_for_revision(sha(16), index=self.index), [32])
+        self.assertRaises(NotFound, self.j.get_buildnumber_for_revision, '0' * 40, index=self.index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import json
+import unittest
+import threading
+from StringIO import StringIO
+
+from requests.auth import HTTPBasicAuth
+
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.custom_exceptions import JenkinsAPIException
+from jenkinsapi.utils.requester import Requester
+from jenkinsapi.utils.session_auth import SessionAuth, ThreadLocalAuth
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class TestSessionAuth(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins(users={'foo': 'token'}).start()
+        self.server.add_job('foo', builds=3)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def jenkins(self, password='token', **request_args):
+        request_args.setdefault('reuse_session', True)
+        return Jenkins(self.server.baseurl, username='foo', password=password,
+                       request_args=request_args)
+
+    def test_credentials_are_checked_once(self):
+        J = self.jenkins()
+        for _ in range(5):
+            J['foo'].poll()
+        self.assertEquals(self.server.auth_checks, 1)
+        self.assertEquals(J.requester.session_auth.stats()['authenticated'], 1)
+
+    def test_without_reuse_every_request_authenticates(self):
+        J = self.jenkins(reuse_session=False)
+        self.assertTrue(J.requester.session_auth is None)
+        checks = self.server.auth_checks
+        self.server.reset_requests()
+        for _ in range(5):
+            J['foo'].poll()
+        self.assertEquals(self.server.auth_checks - checks, self.server.count())
+
+    def test_expired_session_is_renewed(self):
+        J = self.jenkins()
+        job = J['foo']
+        self.server.expire_sessions()
+        self.server.reset_requests()
+        self.assertEquals(job.get_next_build_number(refresh=True), 4)
+        self.assertEquals(self.server.count('/job/foo/api/json'), 2)
+        stats = J.requester.session_auth.stats()
+        self.assertEquals((stats['authenticated'], stats['renewed']), (2, 1))
+        job.poll()
+        self.assertEquals(self.server.auth_checks, 2)
+
+    def test_posts_are_sent_again(self):
+        posts = []
+
+        def build(request, query):
+            posts.append(request.headers.get('Authorization'))
+            return 201, '', {}
+        self.server.add_handler('POST', 'job/foo/build', build)
+        requester = self.jenkins(crumb=False).requester
+        self.server.expire_sessions()
+        requester.post_and_confirm_status(self.server.url('job/foo/build'), data='', valid=[201])
+        self.assertEquals(len(posts), 1)
+        self.assertTrue(posts[0].startswith('Basic '))
+
+    def test_answered_post_is_not_sent_again(self):
+        def build(request, query):
+            # A new session for a POST which did its work all the same
+            return 201, '', {'Set-Cookie': 'JSESSIONID.other=abc; Path=/'}
+        self.server.add_handler('POST', 'job/foo/build', build)
+        requester = self.jenkins(crumb=False).requester
+        requester.post_and_confirm_status(self.server.url('job/foo/build'), data='', valid=[201])
+        self.assertEquals(self.server.count('/job/foo/build', method='POST'), 1)
+        self.assertEquals(requester.session_auth.stats()['renewed'], 0)
+
+    def test_upload_is_not_sent_again(self):
+        self.server.add_handler('POST', 'job/foo/build', lambda request, query: (201, '', {}))
+        requester = self.jenkins(crumb=False).requester
+        self.server.expire_sessions()
+        with self.assertRaises(JenkinsAPIException):
+            requester.post_and_confirm_status(self.server.url('job/foo/build'),
+                                              data={}, files={'file0': StringIO('data')}, valid=[201])
+        self.assertEquals(self.server.count('/job/foo/build', method='POST'), 1)
+        # The next request renews the session
+        requester.post_and_confirm_status(self.server.url('job/foo/build'), data='', valid=[201])
+        self.assertEquals(requester.session_auth.stats()['renewed'], 1)
+
+    def test_crumb_refusal_is_left_to_the_requester(self):
+        self.server.set('crumbIssuer', {'crumbRequestField': 'Jenkins-Crumb', 'crumb': 'abc'})
+        self.server.add_handler('POST', 'job/foo/build',
+                                lambda request, query: (403, 'No valid crumb was included', {}))
+        J = self.jenkins()
+        with self.assertRaises(JenkinsAPIException):
+            J.requester.post_and_confirm_status(self.server.url('job/foo/build'), data='')
+        self.assertEquals(J.requester.session_auth.stats()['renewed'], 0)
+        self.assertEquals(self.server.count('/job/foo/build', method='POST'), 2)
+
+    def test_wrong_password(self):
+        with self.assertRaises(JenkinsAPIException):
+            self.jenkins(password='wrong')
+        self.assertEquals(self.server.auth_checks, 1)
+
+    def test_tuple_is_basic_auth(self):
+        auth = SessionAuth(('foo', 'token'))
+        requester = Requester(baseurl=self.server.baseurl)
+        response = requester.session.get(self.server.url('api/json'), auth=auth)
+        self.assertEquals(json.loads(response.content)['url'], self.server.baseurl + '/')
+
+
+class TestThreadLocalAuth(unittest.TestCase):
+
+    def test_one_auth_per_thread(self):
+        created = []
+
+        def factory():
+            auth = lambda request: request
+            created.append(auth)
+            return auth
+        auth = ThreadLocalAuth(factory)
+        mine = auth.get()
+        self.assertTrue(auth.get() is mine)
+        others = []
+        thread = threading.Thread(target=lambda: others.append(auth.get()))
+        thread.start()
+        thread.join()
+        self.assertEquals(len(created), 2)
+        self.assertFalse(others[0] is mine)
+
+    def test_concurrent_requests(self):
+        with FakeJenkins(users={'foo': 'token'}) as server:
+            auth = ThreadLocalAuth(lambda: HTTPBasicAuth('foo', 'token'))
+            requester = Requester(baseurl=server.baseurl)
+            statuses = []
+
+            def get():
+                statuses.append(requester.session.get(server.url('api/json'), auth=auth).status_code)
+            threads = [threading.Thread(target=get) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEquals(statuses, [200] * 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import threading
+import unittest
+
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.utils.executor import Executor, gather
+from jenkinsapi.utils.single_flight import SingleFlight
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.group = SingleFlight()
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def slow_call(self, result=42):
+        self.calls.append(result)
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def run_concurrently(self, count, result=42):
+        """
+        Start a call, then count - 1 identical ones while it is in flight.
+        """
+        with Executor(count) as executor:
+            first = executor.submit(self.group.do, 'key', lambda: self.slow_call(result))
+            self.started.wait(5)
+            others = [executor.submit(self.group.do, 'key', lambda: self.slow_call(result))
+                      for _ in range(count - 1)]
+            while self.group.stats()['coalesced'] < count - 1:
+                threading.Event().wait(0.01)
+            self.release.set()
+            return [first] + others
+
+    def test_concurrent_calls_share_one(self):
+        futures = self.run_concurrently(5)
+        self.assertEquals(gather(futures), [42] * 5)
+        self.assertEquals(self.calls, [42])
+        self.assertEquals(self.group.stats(), {'calls': 1, 'coalesced': 4, 'in_flight': 0})
+
+    def test_exception_is_shared(self):
+        futures = self.run_concurrently(3, ValueError('boom'))
+        for future in futures:
+            self.assertTrue(isinstance(future.exception(), ValueError))
+        self.assertEquals(len(self.calls), 1)
+
+    def test_interrupt_is_shared(self):
+        futures = self.run_concurrently(3, KeyboardInterrupt())
+        for future in futures:
+            self.assertTrue(isinstance(future.exception(), KeyboardInterrupt))
+
+    def test_sequential_calls_are_not_shared(self):
+        self.release.set()
+        self.group.do('key', self.slow_call)
+        self.group.do('key', self.slow_call)
+        self.assertEquals(len(self.calls), 2)
+        self.assertEquals(self.group.coalesced, 0)
+
+    def test_forget(self):
+        with Executor(2) as executor:
+            first = executor.submit(self.group.do, 'key', self.slow_call)
+            self.started.wait(5)
+            self.group.forget()
+            self.release.set()
+            self.assertEquals(self.group.do('key', lambda: 'fresh'), 'fresh')
+            self.assertEquals(first.result(), 42)
+
+
+class TestCoalescedPolls(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeJenkins(latency=0.2).start()
+        self.server.add_job('foo', builds=3)
+        self.J = Jenkins(self.server.baseurl)
+        self.job = self.J['foo']
+        self.server.reset_requests()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_identical_polls_share_a_request(self):
+        with Executor(10) as executor:
+            gather([executor.submit(self.job.poll) for _ in range(10)])
+        self.assertEquals(self.server.count('/job/foo/api/json'), 1)
+        self.assertEquals(self.J.requester.single_flight.coalesced, 9)
+        self.assertEquals(self.job.get_next_build_number(), 4)
+
+    def test_different_params_are_not_shared(self):
+        with Executor(2) as executor:
+            gather([executor.submit(self.job.poll), executor.submit(self.job.poll, 'color')])
+        self.assertEquals(self.server.count('/job/foo/api/json'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
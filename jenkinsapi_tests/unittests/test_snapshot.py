@@ -0,0 +1,74 @@
+import mock
+import unittest
+
+from jenkinsapi.job import Job
+from jenkinsapi.jenkins import Jenkins, JenkinsBase
+from jenkinsapi.snapshot import JobSnapshot
+from jenkinsapi.custom_exceptions import NoBuildData
+
+
+class TestJobsSnapshot(unittest.TestCase):
+
+    JOBS = {
+        'jobs': [
+            {'name': 'job_one', 'url': 'http://localhost:8080/job/job_one/',
+             'color': 'blue_anime', 'inQueue': False,
+             'lastBuild': {'number': 3, 'result': None, 'timestamp': 1380000000000,
+                           'duration': 0}},
+            {'name': 'job_two', 'url': 'http://localhost:8080/job/job_two/',
+             'color': 'disabled', 'inQueue': True, 'lastBuild': None},
+        ]
+    }
+
+    @mock.patch.object(Jenkins, '_poll')
+    # pylint: disable=W0221
+    def setUp(self, _poll):
+        _poll.return_value = {}
+        self.J = Jenkins('http://localhost:8080')
+
+    @mock.patch.object(JenkinsBase, 'get_data')
+    def test_single_request(self, _get_data):
+        _get_data.return_value = self.JOBS
+        jobs = self.J.get_jobs_snapshot()
+        _get_data.assert_called_once_with(
+            'http://localhost:8080/api/json',
+            {'tree': 'jobs[name,url,color,lastBuild[number,result,timestamp,duration],inQueue]'})
+        self.assertEquals([str(job) for job in jobs], ['job_one', 'job_two'])
+        self.assertTrue(jobs[0].is_running())
+        self.assertTrue(jobs[0].is_enabled())
+        self.assertFalse(jobs[1].is_enabled())
+        self.assertTrue(jobs[1].is_queued())
+        self.assertEquals(jobs[0].lastBuild.number, 3)
+        self.assertEquals(jobs[0].get_last_buildnumber(), 3)
+        with self.assertRaises(NoBuildData):
+            jobs[1].get_last_buildnumber()
+
+    @mock.patch.object(JenkinsBase, 'get_data')
+    def test_custom_fields(self, _get_data):
+        _get_data.return_value = {'jobs': [{'name': 'job_one'}]}
+        jobs = self.J.get_jobs_snapshot(fields='name')
+        _get_data.assert_called_once_with('http://localhost:8080/api/json',
+                                          {'tree': 'jobs[name]'})
+        self.assertEquals(jobs[0].as_dict(), {'name': 'job_one'})
+        with self.assertRaises(AttributeError):
+            jobs[0].color
+
+    def test_read_only(self):
+        job = JobSnapshot(self.JOBS['jobs'][0], self.J)
+        with self.assertRaises(AttributeError):
+            job.color = 'red'
+        with self.assertRaises(AttributeError):
+            job.lastBuild.number = 4
+
+    @mock.patch.object(Job, '_poll')
+    def test_upgrade(self, _poll):
+        _poll.return_value = {'name': 'job_one', 'builds': [], 'actions': []}
+        job = JobSnapshot(self.JOBS['jobs'][0], self.J).get_job()
+        self.assertTrue(isinstance(job, Job))
+        self.assertEquals(job.name, 'job_one')
+        self.assertEquals(job.baseurl, 'http://localhost:8080/job/job_one')
+        self.assertTrue(job.get_jenkins_obj() is self.J)
+
+
+if __name__ == '__main__':
+    unittest.main()
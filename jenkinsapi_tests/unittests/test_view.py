@@ -100,6 +100,7 @@ class TestView(unittest.TestCase):
     def test_getitem(self, _poll):
         _poll.return_value = self.JOB_DATA
         self.assertTrue(isinstance(self.v['foo'], Job))
+        self.assertTrue(isinstance(self.v[u'foo'], Job))
 
     def test_delete(self):
         self.v.delete()
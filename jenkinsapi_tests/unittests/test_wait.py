@@ -0,0 +1,190 @@
+import json
+import unittest
+
+from jenkinsapi.job import Job
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.custom_exceptions import NotFound, TimeOut
+from jenkinsapi.utils.wait import Backoff, WaitScheduler, wait_until, wait_for_builds
+from jenkinsapi_utils.fake_jenkins import FakeJenkins, filter_tree, parse_tree
+
+FAST = Backoff(initial=0.01, maximum=0.01)
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBackoff(unittest.TestCase):
+
+    def test_delays_grow_to_maximum(self):
+        backoff = Backoff(initial=1, maximum=5, factor=2, jitter=0)
+        self.assertEquals([backoff.next() for _ in range(5)], [1, 2, 4, 5, 5])
+        backoff.reset()
+        self.assertEquals(backoff.next(), 1)
+
+    def test_jitter(self):
+        backoff = Backoff(initial=10, maximum=10, jitter=0.2)
+        for _ in range(100):
+            self.assertTrue(8 <= backoff.next() <= 12)
+
+    def test_up_to(self):
+        self.assertEquals(Backoff.up_to(15).initial, 1)
+        self.assertEquals(Backoff.up_to(0.5).initial, 0.5)
+        self.assertEquals(Backoff.up_to(0).maximum, 0.1)
+
+
+class TestWaitScheduler(unittest.TestCase):
+
+    JOB_API = '/job/foo/api/json'
+
+    def setUp(self):
+        self.server = FakeJenkins().start()
+        job = self.server.add_job('foo', builds=0, nextBuildNumber=4)
+        # Like Jenkins, the job lists the builds themselves
+        self.builds = dict((n, self.server.add_build('foo', n, building=True, result=None))
+                           for n in (3, 2, 1))
+        job['builds'] = job['allBuilds'] = [self.builds[n] for n in (3, 2, 1)]
+        self.job = Job(self.server.url('job/foo'), 'foo', Jenkins(self.server.baseurl))
+        self.clock = FakeClock()
+        self.scheduler = WaitScheduler(FAST, clock=self.clock)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def finish(self, number, result='SUCCESS'):
+        self.builds[number].update(building=False, result=result)
+
+    def test_builds_of_a_job_are_checked_together(self):
+        futures = [self.scheduler.add_build(self.job.get_build(n)) for n in (1, 2, 3)]
+        self.server.reset_requests()
+        self.assertFalse(self.scheduler.check())
+        self.finish(1)
+        self.finish(3, 'FAILURE')
+        self.assertTrue(self.scheduler.check())
+        self.assertEquals(futures[0].result(0), 'SUCCESS')
+        self.assertEquals(futures[2].result(0), 'FAILURE')
+        self.assertFalse(futures[1].done())
+        self.assertEquals(self.scheduler.pending(), 1)
+        self.assertEquals(self.server.count(), 2)
+        self.assertEquals(self.server.count(self.JOB_API), 2)
+
+    def test_completed_state_is_merged_into_the_build(self):
+        build = self.job.get_build(2)
+        future = self.scheduler.add_build(build)
+        self.finish(2, 'UNSTABLE')
+        self.scheduler.check()
+        self.assertEquals(future.result(0), 'UNSTABLE')
+        self.server.reset_requests()
+        self.assertEquals(build.get_status(), 'UNSTABLE')
+        self.assertEquals(self.server.count(), 0)
+
+    def test_deadline(self):
+        slow = self.scheduler.add_build(self.job.get_build(1), timeout=10)
+        fast = self.scheduler.add_build(self.job.get_build(2))
+        self.clock.now += 11
+        self.finish(2)
+        self.scheduler.check()
+        self.assertRaises(TimeOut, slow.result, 0)
+        self.assertEquals(fast.result(0), 'SUCCESS')
+
+    def test_deleted_build(self):
+        future = self.scheduler.add_build(self.job.get_build(2))
+        job = self.server.get('job/foo')
+        job['builds'] = job['allBuilds'] = [self.builds[3], self.builds[1]]
+        self.scheduler.check()
+        self.assertRaises(NotFound, future.result, 0)
+
+    def test_window_grows_with_new_builds(self):
+        future = self.scheduler.add_build(self.job.get_build(1))
+        job = self.server.get('job/foo')
+        for number in range(4, 30):
+            job['builds'].insert(0, self.server.add_build('foo', number))
+        job['nextBuildNumber'] = 30
+        self.finish(1)
+        self.scheduler.check()
+        self.assertEquals(future.result(0), 'SUCCESS')
+
+    def test_jobs(self):
+        self.server.add_job('bar', builds=1, color='blue_anime')
+        self.server.add_job('baz', builds=1, inQueue=True)
+        J = Jenkins(self.server.baseurl)
+        futures = [self.scheduler.add_job(J[name]) for name in ('bar', 'baz')]
+        self.server.reset_requests()
+        self.scheduler.check()
+        self.assertFalse(any(future.done() for future in futures))
+        self.server.get('job/bar')['color'] = 'blue'
+        self.server.get('job/baz')['inQueue'] = False
+        self.scheduler.check()
+        self.assertEquals([future.result(0).name for future in futures], ['bar', 'baz'])
+        self.assertEquals(self.server.count(), 2)
+
+    def test_conditions(self):
+        calls = []
+
+        def third_time():
+            calls.append(1)
+            return len(calls) == 3 and 'ready'
+
+        def broken():
+            raise ValueError('broken')
+
+        good = self.scheduler.add_condition(third_time)
+        bad = self.scheduler.add_condition(broken)
+        self.scheduler.run()
+        self.assertEquals(good.result(0), 'ready')
+        self.assertRaises(ValueError, bad.result, 0)
+
+    def test_run_until_builds_complete(self):
+        polls = []
+
+        def job_api(request, query):
+            # The builds complete one after the other, one per check
+            polls.append(1)
+            if len(polls) <= 3:
+                self.finish(len(polls))
+            data = filter_tree(self.server.get('job/foo'), parse_tree(query['tree']))
+            return 200, json.dumps(data), {'Content-Type': 'application/json'}
+
+        self.server.add_handler('GET', 'job/foo/api/json', job_api)
+        builds = [self.job.get_build(n) for n in (1, 2, 3)]
+        self.assertEquals(wait_for_builds(builds, backoff=FAST), ['SUCCESS'] * 3)
+        self.assertEquals(len(polls), 3)
+
+    def test_background_scheduler(self):
+        self.scheduler.start()
+        try:
+            future = self.scheduler.add_build(self.job.get_build(3))
+            self.finish(3)
+            self.assertEquals(future.result(5), 'SUCCESS')
+            pending = self.scheduler.add_build(self.job.get_build(2))
+        finally:
+            self.scheduler.stop()
+        self.assertTrue(pending.cancelled())
+
+    def test_block_until_complete(self):
+        build = self.job.get_build(2)
+        self.finish(2)
+        self.assertEquals(build.block_until_complete(delay=0), 'SUCCESS')
+        self.assertFalse(build.is_running())
+
+    def test_block_until_complete_timeout(self):
+        self.assertRaises(TimeOut, self.job.get_build(2).block_until_complete, delay=0, timeout=0.05)
+
+
+class TestWaitUntil(unittest.TestCase):
+
+    def test_returns_value(self):
+        values = iter([None, 0, 'done'])
+        self.assertEquals(wait_until(lambda: next(values), backoff=FAST), 'done')
+
+    def test_timeout(self):
+        self.assertRaises(TimeOut, wait_until, lambda: False, timeout=0.05, backoff=FAST)
+
+
+if __name__ == '__main__':
+    unittest.main()
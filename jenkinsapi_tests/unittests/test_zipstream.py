@@ -0,0 +1,80 @@
+import os
+import zlib
+import struct
+import zipfile
+import unittest
+import StringIO
+
+from jenkinsapi.utils.zipstream import iter_zip
+
+
+def streamed_zip(files, zip64=False):
+    """
+    A zip as written by Java's ZipOutputStream: deflated entries whose sizes
+    and CRC follow them in a data descriptor.
+    """
+    parts = []
+    for name, data in files:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+        parts.append(struct.pack('<4sHHHHHIIIHH', 'PK\x03\x04', 20, 0x8, zipfile.ZIP_DEFLATED,
+                                 0, 0, 0, 0, 0, len(name), 0) + name + compressed)
+        sizes = struct.pack('<QQ' if zip64 else '<II', len(compressed), len(data))
+        parts.append('PK\x07\x08' + struct.pack('<I', zlib.crc32(data) & 0xFFFFFFFF) + sizes)
+    # The central directory is never read
+    parts.append('PK\x01\x02' + '\0' * 42)
+    return ''.join(parts)
+
+
+class TestZipStream(unittest.TestCase):
+
+    FILES = [
+        ('archive/a.txt', 'hello ' * 10000),
+        ('archive/dist/b.bin', os.urandom(100000)),
+        ('archive/empty', ''),
+    ]
+
+    def read_all(self, data, chunk_size=1000):
+        return [(entry.name, ''.join(entry.iter_content()))
+                for entry in iter_zip(StringIO.StringIO(data), chunk_size)]
+
+    def test_zipfile_archive(self):
+        buf = StringIO.StringIO()
+        archive = zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED)
+        for name, data in self.FILES:
+            archive.writestr(name, data)
+        info = zipfile.ZipInfo('archive/stored')
+        archive.writestr(info, 'not compressed')
+        archive.close()
+        self.assertEquals(self.read_all(buf.getvalue()),
+                          self.FILES + [('archive/stored', 'not compressed')])
+
+    def test_data_descriptors(self):
+        for chunk_size in (1, 7, 1000, 2 ** 20):
+            self.assertEquals(self.read_all(streamed_zip(self.FILES), chunk_size), self.FILES)
+
+    def test_zip64_data_descriptors(self):
+        self.assertEquals(self.read_all(streamed_zip(self.FILES, zip64=True)), self.FILES)
+
+    def test_skipped_entries(self):
+        names = []
+        for entry in iter_zip(StringIO.StringIO(streamed_zip(self.FILES)), 100):
+            if entry.name.endswith('.bin'):
+                self.assertEquals(''.join(entry.iter_content()), self.FILES[1][1])
+            names.append(entry.name)
+        self.assertEquals(names, [name for name, _ in self.FILES])
+
+    def test_bad_crc(self):
+        data = streamed_zip(self.FILES[:1])
+        crc_at = data.index('PK\x07\x08') + 4
+        data = data[:crc_at] + '\0\0\0\0' + data[crc_at + 4:]
+        with self.assertRaises(zipfile.BadZipfile):
+            self.read_all(data)
+
+    def test_truncated(self):
+        with self.assertRaises(zipfile.BadZipfile):
+            self.read_all(streamed_zip(self.FILES)[:5000])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,3 @@
+"""
+Micro-benchmarks for jenkinsapi. Each module can be run with python -m.
+"""
@@ -0,0 +1,122 @@
+"""
+Compare the decoders available to jenkinsapi on large job and build payloads.
+
+Reports the best parse time and the peak memory growth of every decoder, plus
+the old eval()-of-api/python approach as a baseline:
+
+    python -m jenkinsapi_utils.benchmarks.decoders [--builds N] [--repeat N]
+"""
+import gc
+import json
+import time
+import resource
+import argparse
+import multiprocessing
+
+from jenkinsapi.utils.decoders import DECODERS
+
+
+def make_job_payload(num_builds):
+    """
+    A job with a long allBuilds history, as returned by tree=allBuilds[...]
+    """
+    url = 'http://localhost:8080/job/benchmark/'
+    return {
+        'name': 'benchmark',
+        'url': url,
+        'color': 'blue',
+        'inQueue': False,
+        'allBuilds': [
+            {'number': n, 'url': '%s%i/' % (url, n), 'result': 'SUCCESS',
+             'building': False, 'timestamp': 1380000000000 + n, 'duration': 5782}
+            for n in xrange(num_builds, 0, -1)
+        ],
+    }
+
+
+def make_build_payload(num_artifacts):
+    """
+    A build at depth=2 with many artifacts and fingerprints.
+    """
+    url = 'http://localhost:8080/job/benchmark/1/'
+    return {
+        'number': 1,
+        'url': url,
+        'result': 'SUCCESS',
+        'building': False,
+        'fullDisplayName': 'benchmark #1',
+        'actions': [{'causes': [{'shortDescription': 'Started by user anonymous',
+                                 'userId': None, 'userName': 'anonymous'}]},
+                    {'lastBuiltRevision': {'SHA1': '8b4f4e6f6d0af609bb77f95d8fb82ff1ee2bba0d'}}],
+        'artifacts': [
+            {'fileName': 'file%i.bin' % n, 'relativePath': 'dist/file%i.bin' % n,
+             'displayPath': 'file%i.bin' % n}
+            for n in xrange(num_artifacts)
+        ],
+        'fingerprint': [
+            {'fileName': 'file%i.bin' % n, 'hash': '%032x' % n,
+             'original': {'name': 'benchmark', 'number': 1},
+             'timestamp': 1380270162488,
+             'usage': [{'name': 'benchmark', 'ranges': {'ranges': [{'start': 1, 'end': 2}]}}]}
+            for n in xrange(num_artifacts)
+        ],
+    }
+
+
+def _measure(loads, text, repeat, results):
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    best = None
+    for _ in xrange(repeat):
+        start = time.time()
+        data = loads(text)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del data
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((best, rss_after - rss_before))
+
+
+def measure(loads, text, repeat):
+    """
+    Time loads(text) in a child process so that peak memory is not shared
+    between decoders. Returns (best seconds, peak RSS growth in KiB).
+    """
+    results = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_measure, args=(loads, text, repeat, results))
+    child.start()
+    outcome = results.get()
+    child.join()
+    return outcome
+
+
+def python_api_eval(text):
+    return eval(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--builds', type=int, default=50000,
+                        help='number of builds in the job payload')
+    parser.add_argument('--artifacts', type=int, default=10000,
+                        help='number of artifacts in the build payload')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = [
+        ('job', make_job_payload(args.builds)),
+        ('build', make_build_payload(args.artifacts)),
+    ]
+    for title, payload in payloads:
+        json_text = json.dumps(payload)
+        python_text = repr(payload)
+        print '%s payload: %.1f MB JSON' % (title, len(json_text) / 1024.0 / 1024.0)
+        candidates = [('eval (api/python)', python_api_eval, python_text)]
+        candidates += [(name, loads, json_text) for name, loads in sorted(DECODERS.items())]
+        for name, loads, text in candidates:
+            seconds, peak_kb = measure(loads, text, args.repeat)
+            print '  %-20s %8.1f ms %10i KiB peak' % (name, seconds * 1000, peak_kb)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Compare listing the state of every job with Jenkins.get_jobs() (one request
+per job) and Jenkins.get_jobs_snapshot() (one request in total), against a
+fake Jenkins with a simulated network latency:
+
+    python -m jenkinsapi_utils.benchmarks.job_snapshot [--jobs N] [--latency S]
+"""
+import time
+import argparse
+
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+def with_get_jobs(J):
+    return [(name, job.get_last_buildnumber(), job.is_enabled())
+            for name, job in J.get_jobs()]
+
+
+def with_snapshot(J):
+    return [(job.name, job.get_last_buildnumber(), job.is_enabled())
+            for job in J.get_jobs_snapshot()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--jobs', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds the fake server waits before each answer')
+    args = parser.parse_args()
+
+    with FakeJenkins(latency=args.latency) as server:
+        for n in xrange(args.jobs):
+            server.add_job('job%i' % n, builds=1 + n % 5)
+        print '%i jobs, %.1f ms latency' % (args.jobs, args.latency * 1000)
+        results = []
+        for title, list_jobs in [('get_jobs', with_get_jobs),
+                                 ('get_jobs_snapshot', with_snapshot)]:
+            J = Jenkins(server.baseurl)
+            server.reset_requests()
+            start = time.time()
+            results.append(list_jobs(J))
+            elapsed = time.time() - start
+            print '  %-20s %8.1f ms %6i requests' % (title, elapsed * 1000, server.count())
+        assert results[0] == results[1], 'Both approaches should agree'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare polling jobs with credentials sent on every request and with the web
+session reused (request_args={'reuse_session': True}), against a fake Jenkins
+whose check of a password takes a while, as hashing one does on a real master:
+
+    python -m jenkinsapi_utils.benchmarks.session_auth [--polls N] [--latency S] [--auth-cost S]
+"""
+import time
+import argparse
+
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi_utils.fake_jenkins import FakeJenkins
+
+
+def poll_jobs(J, polls):
+    job = J['job0']
+    for _ in xrange(polls):
+        job.poll()
+    return job.get_next_build_number()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--polls', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='seconds the fake server waits before each answer')
+    parser.add_argument('--auth-cost', type=float, default=0.01,
+                        help='seconds the fake server spends checking a password')
+    args = parser.parse_args()
+
+    with FakeJenkins(latency=args.latency, users={'user': 'secret'}, auth_cost=args.auth_cost) as server:
+        server.add_job('job0', builds=3)
+        print '%i polls, %.1f ms latency, %.1f ms per password check' % (
+            args.polls, args.latency * 1000, args.auth_cost * 1000)
+        results = []
+        for title, reuse in [('credentials', False), ('reuse_session', True)]:
+            J = Jenkins(server.baseurl, username='user', password='secret',
+                        request_args={'reuse_session': reuse})
+            server.reset_requests()
+            checks = server.auth_checks
+            start = time.time()
+            results.append(poll_jobs(J, args.polls))
+            elapsed = time.time() - start
+            print '  %-20s %8.1f ms %6i requests %6i password checks' % (
+                title, elapsed * 1000, server.count(), server.auth_checks - checks)
+        assert results[0] == results[1], 'Both approaches should agree'
+
+
+if __name__ == '__main__':
+    main()
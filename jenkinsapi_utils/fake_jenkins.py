@@ -0,0 +1,371 @@
+"""
+A fake Jenkins master serving canned JSON over HTTP on localhost, for tests and
+benchmarks which should run without a real Jenkins.
+
+    server = FakeJenkins()
+    server.add_job('foo', builds=3)
+    server.start()
+    J = Jenkins(server.baseurl)
+    ...
+    server.stop()
+
+Documents are registered by path. The ``tree`` query parameter is honoured,
+including ``{start,end}`` ranges, so tree-filtered requests can be checked.
+
+Given users, the server demands authentication like a secured Jenkins: basic
+authentication, whose check costs auth_cost seconds, opens a session which
+later requests may carry the JSESSIONID cookie of instead.
+"""
+import json
+import time
+import uuid
+import base64
+import hashlib
+import email.utils
+import Cookie
+import urlparse
+import threading
+import BaseHTTPServer
+import SocketServer
+
+
+def parse_tree(tree):
+    """
+    Parse a Jenkins tree expression into a list of (field, subtree, range)
+    where subtree is a parsed tree or None, and range a (start, end) pair or None.
+    """
+    fields, _ = _parse_fields(tree, 0)
+    return fields
+
+
+def _parse_fields(tree, pos):
+    fields = []
+    while pos < len(tree):
+        name = ''
+        while pos < len(tree) and tree[pos] not in ',[]{':
+            name += tree[pos]
+            pos += 1
+        subtree = None
+        range_ = None
+        if pos < len(tree) and tree[pos] == '[':
+            subtree, pos = _parse_fields(tree, pos + 1)
+            pos += 1  # closing bracket
+        if pos < len(tree) and tree[pos] == '{':
+            end = tree.index('}', pos)
+            range_ = _parse_range(tree[pos + 1:end])
+            pos = end + 1
+        fields.append((name, subtree, range_))
+        if pos < len(tree) and tree[pos] == ']':
+            return fields, pos
+        pos += 1  # comma
+    return fields, pos
+
+
+def _parse_range(text):
+    if ',' not in text:
+        start = int(text)
+        return start, start + 1
+    start, end = text.split(',')
+    return int(start or 0), int(end) if end else None
+
+
+def filter_tree(data, fields):
+    """
+    Reduce data to the fields selected by a parsed tree.
+    """
+    if isinstance(data, list):
+        return [filter_tree(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for name, subtree, range_ in fields:
+        if name not in data:
+            continue
+        value = data[name]
+        if range_ and isinstance(value, list):
+            value = value[range_[0]:range_[1]]
+        if subtree is not None:
+            value = filter_tree(value, subtree)
+        elif isinstance(value, dict):
+            # Jenkins leaves out the content of objects not named in the tree
+            value = {}
+        elif isinstance(value, list):
+            value = [{} if isinstance(item, dict) else item for item in value]
+        result[name] = value
+    return result
+
+
+class FakeJenkinsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.fake.handle(self, 'GET')
+
+    def do_POST(self):
+        self.server.fake.handle(self, 'POST')
+
+    def do_HEAD(self):
+        self.server.fake.handle(self, 'HEAD')
+
+    def send(self, status, body='', headers=None):
+        self.send_response(status)
+        headers = dict(headers or {})
+        headers.update(getattr(self, 'session_headers', {}))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+
+class FakeJenkinsServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # Concurrent clients would otherwise wait for SYN retransmits
+    request_queue_size = 128
+
+
+class FakeJenkins(object):
+    """
+    Serves registered documents and records every request it receives.
+    """
+
+    API = 'api/json'
+    SESSION_COOKIE = 'JSESSIONID.fake'
+
+    def __init__(self, latency=0, users=None, auth_cost=0):
+        """
+        :param latency: seconds to wait before answering each request, float
+        :param users: passwords or API tokens by username, every request must
+                      authenticate if set, dict
+        :param auth_cost: seconds each check of a password takes, float
+        """
+        self.latency = latency
+        self.users = users
+        self.auth_cost = auth_cost
+        self.auth_checks = 0
+        self.sessions = {}
+        self.documents = {}
+        self.files = {}
+        self.last_modified = {}
+        self.handlers = {}
+        self.requests = []
+        # Requests being answered, and the most there were at once
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = FakeJenkinsServer(('127.0.0.1', 0), FakeJenkinsHandler)
+        self._server.fake = self
+        self._thread = None
+        self.baseurl = 'http://127.0.0.1:%i' % self._server.server_address[1]
+        self.set('', {'jobs': [], 'views': [], 'url': self.baseurl + '/'})
+        self.set('queue', {'items': []})
+        self.set('computer', {'computer': []})
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, type_, value, traceback):
+        self.stop()
+
+    def url(self, path):
+        return '%s/%s' % (self.baseurl, path.strip('/') + '/' if path.strip('/') else '')
+
+    def set(self, path, document):
+        """
+        Serve document as the api/json of the resource at path.
+        """
+        self.documents[path.strip('/')] = document
+
+    def get(self, path):
+        return self.documents[path.strip('/')]
+
+    def add_file(self, path, data, last_modified=None):
+        """
+        Serve data at path, honouring Range and If-Range requests.
+
+        :param last_modified: seconds since the epoch, sent as Last-Modified, float
+        """
+        self.files[path.strip('/')] = data
+        if last_modified is not None:
+            self.last_modified[path.strip('/')] = email.utils.formatdate(last_modified, usegmt=True)
+
+    def add_handler(self, method, path, handler):
+        """
+        Answer requests for path with handler(request, query), which returns
+        (status, body, headers).
+        """
+        self.handlers[(method, path.strip('/'))] = handler
+
+    def add_job(self, name, builds=0, **fields):
+        """
+        Register a job with a number of completed builds.
+        """
+        job_url = self.url('job/%s' % name)
+        build_refs = [{'number': n, 'url': '%s%i/' % (job_url, n)} for n in range(builds, 0, -1)]
+        job = {
+            'name': name,
+            'url': job_url,
+            'color': 'blue',
+            'description': '',
+            'inQueue': False,
+            'queueItem': None,
+            'nextBuildNumber': builds + 1,
+            'actions': [],
+            'builds': build_refs[:100],
+            'allBuilds': build_refs,
+            'downstreamProjects': [],
+            'upstreamProjects': [],
+        }
+        for buildtype in ('firstBuild', 'lastBuild', 'lastCompletedBuild',
+                          'lastSuccessfulBuild', 'lastFailedBuild'):
+            job[buildtype] = None
+        if build_refs:
+            job['firstBuild'] = build_refs[-1]
+            job['lastBuild'] = job['lastCompletedBuild'] = job['lastSuccessfulBuild'] = build_refs[0]
+        job.update(fields)
+        self.set('job/%s' % name, job)
+        # The same document, so that tree queries on the root see every field
+        self.get('')['jobs'].append(job)
+        for ref in build_refs:
+            self.add_build(name, ref['number'])
+        return job
+
+    def add_build(self, job_name, number, **fields):
+        build_url = self.url('job/%s/%i' % (job_name, number))
+        build = {
+            'number': number,
+            'url': build_url,
+            'fullDisplayName': '%s #%i' % (job_name, number),
+            'result': 'SUCCESS',
+            'building': False,
+            'timestamp': 1380000000000 + number * 1000,
+            'duration': 1000,
+            'actions': [],
+            'artifacts': [],
+            'fingerprint': [],
+            'changeSet': {'items': [], 'kind': None},
+        }
+        build.update(fields)
+        self.set('job/%s/%i' % (job_name, number), build)
+        return build
+
+    def handle(self, request, method):
+        with self._lock:
+            self.requests.append((method, request.path))
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            self._answer(request, method)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _answer(self, request, method):
+        if self.latency:
+            time.sleep(self.latency)
+        split = urlparse.urlsplit(request.path)
+        query = dict(urlparse.parse_qsl(split.query))
+        path = split.path.strip('/')
+
+        request.session_headers = {}
+        if self.users is not None:
+            status = self._authenticate(request)
+            if status is not None:
+                return request.send(status, 'Authentication required')
+
+        handler = self.handlers.get((method, path))
+        if handler is not None:
+            status, body, headers = handler(request, query)
+            return request.send(status, body, headers)
+
+        if method in ('GET', 'HEAD') and path in self.files:
+            return self._send_file(request, self.files[path], self.last_modified.get(path))
+
+        if method == 'GET' and (path == self.API or path.endswith('/' + self.API)):
+            resource = path[:-len(self.API)].strip('/')
+            if resource in self.documents:
+                data = self.documents[resource]
+                if 'tree' in query:
+                    data = filter_tree(data, parse_tree(query['tree']))
+                return request.send(200, json.dumps(data),
+                                    {'Content-Type': 'application/json'})
+        request.send(404, 'Not found: %s' % request.path)
+
+    def _authenticate(self, request):
+        """
+        Return None if the request may proceed, else the status refusing it.
+        """
+        cookies = Cookie.SimpleCookie(request.headers.get('Cookie', ''))
+        with self._lock:
+            in_session = (self.SESSION_COOKIE in cookies and
+                          cookies[self.SESSION_COOKIE].value in self.sessions)
+        authorization = request.headers.get('Authorization', '')
+        if not authorization.startswith('Basic '):
+            return None if in_session else 403
+        # Like Jenkins, check credentials whenever they are sent
+        username, _, password = base64.b64decode(authorization[len('Basic '):]).partition(':')
+        with self._lock:
+            self.auth_checks += 1
+        if self.auth_cost:
+            time.sleep(self.auth_cost)
+        if self.users.get(username) != password:
+            return 401
+        if in_session:
+            return None
+        session = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session] = username
+        request.session_headers['Set-Cookie'] = '%s=%s; Path=/; HttpOnly' % (self.SESSION_COOKIE, session)
+        return None
+
+    def expire_sessions(self):
+        """
+        Forget every session, as a restarted Jenkins or a session timeout does.
+        """
+        with self._lock:
+            self.sessions = {}
+
+    @staticmethod
+    def _send_file(request, data, last_modified=None):
+        etag = '"%s"' % hashlib.md5(data).hexdigest()
+        range_ = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        if not range_ or (if_range is not None and if_range != etag):
+            headers = {'ETag': etag}
+            if last_modified is not None:
+                headers['Last-Modified'] = last_modified
+            return request.send(200, data, headers)
+        start, end = range_.split('=', 1)[1].split('-')
+        start = int(start)
+        end = int(end) + 1 if end else len(data)
+        if start >= len(data):
+            return request.send(416, '', {'Content-Range': 'bytes */%i' % len(data)})
+        return request.send(206, data[start:end],
+                            {'Content-Range': 'bytes %i-%i/%i' % (start, end - 1, len(data)), 'ETag': etag})
+
+    def count(self, path=None, method='GET'):
+        """
+        Number of requests received, optionally only those whose path starts with path.
+        """
+        with self._lock:
+            return len([r for r in self.requests
+                        if r[0] == method and (path is None or r[1].startswith(path))])
+
+    def reset_requests(self):
+        with self._lock:
+            self.requests = []
+            self.peak_in_flight = self.in_flight
@@ -46,11 +46,13 @@ setup(
     version=REVISION,
     author=PROJECT_AUTHORS,
     author_email=PROJECT_EMAILS,
-    packages=['jenkinsapi', 'jenkinsapi.utils', 'jenkinsapi.command_line', 'jenkinsapi_tests'],
+    packages=['jenkinsapi', 'jenkinsapi.aio', 'jenkinsapi.utils', 'jenkinsapi.command_line',
+              'jenkinsapi_tests'],
     zip_safe=True,
     include_package_data=False,
     setup_requires=['nose'],
     install_requires=['requests>=1.2.3', 'pytz>=2013b'],
+    extras_require={'speedups': ['ujson']},
     test_suite='jenkinsapi_tests',
     tests_require=['mock', 'coverage'],
     entry_points=GLOBAL_ENTRY_POINTS,